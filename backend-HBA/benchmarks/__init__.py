@@ -0,0 +1 @@
+"""Synthetic MRBS dataset generator and performance benchmark suite (see benchmarks/run.py)."""
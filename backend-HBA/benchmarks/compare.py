@@ -0,0 +1,40 @@
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare benchmarks/results/abc123-100k.json benchmarks/results/def456-100k.json
+"""
+import argparse
+import json
+from pathlib import Path
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "queries_mean", "peak_memory_kb"]
+
+
+def change(old, new) -> str:
+    if old in (None, 0) or new is None:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+    baseline = json.loads(Path(args.baseline).read_text())
+    candidate = json.loads(Path(args.candidate).read_text())
+
+    if baseline["dataset"] != candidate["dataset"]:
+        print("Warning: the runs used different datasets; numbers are not directly comparable")
+    print(f"{baseline['commit']} -> {candidate['commit']}")
+    print(f"{'scenario':<20}{'metric':<16}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for name in sorted(set(baseline["scenarios"]) | set(candidate["scenarios"])):
+        old, new = baseline["scenarios"].get(name, {}), candidate["scenarios"].get(name, {})
+        for metric in METRICS:
+            before, after = old.get(metric), new.get(metric)
+            print(f"{name:<20}{metric:<16}{before if before is not None else '-':>12}"
+                  f"{after if after is not None else '-':>12}{change(before, after):>10}")
+
+
+if __name__ == "__main__":
+    main()
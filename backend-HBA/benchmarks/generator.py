@@ -0,0 +1,259 @@
+"""
+Seedable generator of a synthetic MRBS database in SQLite.
+
+The same seed, scale and anchor date always produce the same rows. Bookings
+span WINDOW_DAYS_BEFORE days before the anchor date to WINDOW_DAYS_AFTER days
+after it, so both history-based and upcoming-booking code paths have data.
+"""
+import argparse
+import json
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000, "5m": 5_000_000}
+
+WINDOW_DAYS_BEFORE = 270
+WINDOW_DAYS_AFTER = 95
+BOOKINGS_PER_ROOM_DAY = 3
+# Share of bookings that belong to weekly series (mrbs_repeat)
+SERIES_SHARE = 0.15
+SERIES_WEEKS = 12
+
+PURPOSES = ["Lecture", "Tutorial", "Lab session", "Team meeting", "Seminar", "Exam", "Workshop", "Viva",
+            "Project review", "Interview"]
+ROOM_DESCRIPTIONS = ["Lecture hall with projector and wifi", "Seminar room with whiteboard",
+                     "Meeting room with TV screen and video conference", "Computer lab with projector and AC",
+                     "Small discussion room", "Board room with zoom and phone", "Auditorium with projector",
+                     "Studio with natural light windows"]
+ROOM_CAPACITIES = [(8, 0.15), (12, 0.15), (20, 0.15), (30, 0.15), (50, 0.15), (80, 0.1), (120, 0.08),
+                   (250, 0.05), (400, 0.02)]
+START_HOUR_WEIGHTS = {7: 1, 8: 6, 9: 10, 10: 10, 11: 8, 12: 5, 13: 8, 14: 9, 15: 8, 16: 6, 17: 3, 18: 2, 19: 1}
+DURATION_MINUTES = [(30, 0.15), (60, 0.4), (90, 0.15), (120, 0.2), (180, 0.1)]
+
+# Secondary indexes of the upstream MRBS schema that the ORM models do not declare
+MRBS_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idxStartTime ON mrbs_entry (start_time)",
+    "CREATE INDEX IF NOT EXISTS idxEndTime ON mrbs_entry (end_time)",
+    "CREATE INDEX IF NOT EXISTS idxRoomStartEnd ON mrbs_entry (room_id, start_time, end_time)",
+    "CREATE INDEX IF NOT EXISTS idxRepeatId ON mrbs_entry (repeat_id)",
+]
+
+
+def parse_scale(scale: str) -> int:
+    """Number of entries for a named scale ("100k") or a plain integer."""
+    return SCALES.get(str(scale).lower()) or int(str(scale).replace("_", ""))
+
+
+def dimensions(entries: int) -> Dict[str, int]:
+    """Rooms, areas, users and modules sized so rooms see about BOOKINGS_PER_ROOM_DAY bookings a day."""
+    days = WINDOW_DAYS_BEFORE + WINDOW_DAYS_AFTER
+    rooms = int(np.clip(entries // (days * BOOKINGS_PER_ROOM_DAY), 10, 5000))
+    return {
+        "entries": entries,
+        "rooms": rooms,
+        "areas": max(1, rooms // 20),
+        "users": max(20, entries // 250),
+        "modules": rooms * 5,
+    }
+
+
+def _weighted(rng: np.random.Generator, choices, size: int) -> np.ndarray:
+    values = np.array([value for value, _ in choices])
+    weights = np.array([weight for _, weight in choices], dtype=np.float64)
+    return rng.choice(values, size=size, p=weights / weights.sum())
+
+
+def _create_schema(path: str):
+    # src.database builds its engine from DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from sqlalchemy import create_engine
+    from src.database import Base
+    from src import models  # noqa: F401  (registers the tables)
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+
+def _booking_rows(rng: np.random.Generator, dims: Dict[str, int], anchor: date):
+    """Exactly dims["entries"] non-overlapping bookings (fewer only if rooms are saturated)."""
+    oversample = 2.0
+    while True:
+        room, start, end, series = _candidate_rows(rng, dims, anchor, oversample)
+        if len(start) >= dims["entries"] or oversample >= 8:
+            break
+        oversample *= 1.5
+    if len(start) > dims["entries"]:
+        chosen = np.sort(rng.choice(len(start), dims["entries"], replace=False))
+        room, start, end, series = room[chosen], start[chosen], end[chosen], series[chosen]
+    return room, start, end, series
+
+
+def _candidate_rows(rng: np.random.Generator, dims: Dict[str, int], anchor: date, oversample: float):
+    """Non-overlapping bookings as column arrays, including weekly series occurrences."""
+    entries = dims["entries"]
+    first_day = datetime.combine(anchor - timedelta(days=WINDOW_DAYS_BEFORE), datetime.min.time())
+    days = WINDOW_DAYS_BEFORE + WINDOW_DAYS_AFTER
+    hours = list(START_HOUR_WEIGHTS.items())
+
+    # Oversample: bookings overlapping an earlier one in the same room are dropped
+    candidates = int(entries * oversample) + 100
+    series_count = max(1, int(candidates * SERIES_SHARE) // SERIES_WEEKS)
+    single_count = candidates - series_count * SERIES_WEEKS
+
+    series_room = rng.integers(1, dims["rooms"] + 1, series_count)
+    series_day = rng.integers(0, max(1, days - 7 * SERIES_WEEKS), series_count)
+    series_start = _weighted(rng, hours, series_count) * 3600 + rng.choice([0, 1800], series_count)
+    series_minutes = _weighted(rng, DURATION_MINUTES, series_count)
+    week = np.tile(np.arange(SERIES_WEEKS), series_count)
+
+    room = np.concatenate([rng.integers(1, dims["rooms"] + 1, single_count), np.repeat(series_room, SERIES_WEEKS)])
+    day = np.concatenate([rng.integers(0, days, single_count), np.repeat(series_day, SERIES_WEEKS) + 7 * week])
+    offset = np.concatenate([
+        _weighted(rng, hours, single_count) * 3600 + rng.choice([0, 1800], single_count),
+        np.repeat(series_start, SERIES_WEEKS),
+    ])
+    minutes = np.concatenate([_weighted(rng, DURATION_MINUTES, single_count), np.repeat(series_minutes, SERIES_WEEKS)])
+    series = np.concatenate([np.zeros(single_count, dtype=np.int64), np.repeat(np.arange(1, series_count + 1), SERIES_WEEKS)])
+
+    day_starts = np.array([int((first_day + timedelta(days=d)).timestamp()) for d in range(days + 7)], dtype=np.int64)
+    start = day_starts[day] + offset
+    end = start + minutes * 60
+
+    # Keep a booking only if it starts after every earlier booking of its room has ended
+    order = np.lexsort((start, room))
+    room, start, end, series = room[order], start[order], end[order], series[order]
+    shift = room.astype(np.int64) * (10 ** 11)
+    previous_end = np.concatenate([[0], np.maximum.accumulate(end + shift)[:-1]])
+    keep = start + shift >= previous_end
+    return room[keep], start[keep], end[keep], series[keep]
+
+
+def generate(path: str, scale="10k", seed: int = 42, anchor: Optional[date] = None) -> Dict[str, object]:
+    """Create (or replace) the SQLite database at `path` and return its metadata."""
+    anchor = anchor or date.today()
+    entries = parse_scale(scale)
+    dims = dimensions(entries)
+    rng = np.random.default_rng(seed)
+
+    if os.path.exists(path):
+        os.remove(path)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    _create_schema(path)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    now = datetime.combine(anchor, datetime.min.time()).strftime("%Y-%m-%d %H:%M:%S")
+
+    conn.executemany(
+        "INSERT INTO mrbs_area (id, area_name, disabled, morningstarts, eveningends) VALUES (?, ?, 0, 7, 19)",
+        [(a, f"Building {a}") for a in range(1, dims["areas"] + 1)],
+    )
+    capacities = _weighted(rng, ROOM_CAPACITIES, dims["rooms"]).tolist()
+    descriptions = rng.integers(0, len(ROOM_DESCRIPTIONS), dims["rooms"]).tolist()
+    conn.executemany(
+        "INSERT INTO mrbs_room (id, disabled, area_id, room_name, sort_key, description, capacity) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (r, int(r % 50 == 0), (r - 1) % dims["areas"] + 1, f"Room {r:04d}", f"{r:04d}",
+             ROOM_DESCRIPTIONS[descriptions[r - 1]], capacities[r - 1])
+            for r in range(1, dims["rooms"] + 1)
+        ],
+    )
+    lecturers = max(1, dims["users"] // 10)
+    conn.executemany(
+        "INSERT INTO mrbs_users (id, email, name) VALUES (?, ?, ?)",
+        [(u, f"user{u:05d}@example.com", f"User {u:05d}") for u in range(1, lecturers + 1)],
+    )
+    students = np.clip(rng.lognormal(3.6, 0.8, dims["modules"]).astype(int), 5, 450).tolist()
+    conn.executemany(
+        "INSERT INTO mrbs_module (id, module_code, number_of_students, lecture_id) VALUES (?, ?, ?, ?)",
+        [(m, f"MOD{m:05d}", students[m - 1], (m - 1) % lecturers + 1) for m in range(1, dims["modules"] + 1)],
+    )
+
+    room, start, end, series = _booking_rows(rng, dims, anchor)
+    # Few users book most rooms: Zipf-like user activity
+    user_weights = 1.0 / np.arange(1, dims["users"] + 1) ** 0.8
+    users = rng.choice(dims["users"], size=len(start), p=user_weights / user_weights.sum()) + 1
+    purposes = rng.integers(0, len(PURPOSES), len(start))
+    statuses = (rng.random(len(start)) < 0.05).astype(int)
+
+    # One mrbs_repeat row per series that kept at least one occurrence
+    series_ids = np.unique(series[series > 0])
+    repeat_of = {int(s): i + 1 for i, s in enumerate(series_ids.tolist())}
+    first = {}
+    for s, st, en, u, p in zip(series.tolist(), start.tolist(), end.tolist(), users.tolist(), purposes.tolist()):
+        if s and s not in first:
+            first[s] = (st, en, u, p)
+    conn.executemany(
+        "INSERT INTO mrbs_repeat (id, start_time, end_time, entry_type, timestamp, create_by, modified_by, name, "
+        "type, description, status, ical_uid, ical_sequence) VALUES (?, ?, ?, 0, ?, ?, ?, ?, 'E', ?, 0, ?, 0)",
+        [
+            (repeat_of[s], st, en, now, f"user{u:05d}", f"user{u:05d}", PURPOSES[p], "Weekly series",
+             f"series_{repeat_of[s]}")
+            for s, (st, en, u, p) in first.items()
+        ],
+    )
+
+    def entry_rows():
+        for i, (r, st, en, s, u, p, status) in enumerate(zip(
+                room.tolist(), start.tolist(), end.tolist(), series.tolist(), users.tolist(),
+                purposes.tolist(), statuses.tolist())):
+            repeat_id = repeat_of.get(s)
+            yield (i + 1, st, en, 1 if repeat_id else 0, repeat_id, r, now, f"user{u:05d}", f"user{u:05d}",
+                   PURPOSES[p], f"{PURPOSES[p]} booking", status, f"entry_{i + 1}")
+
+    conn.executemany(
+        "INSERT INTO mrbs_entry (id, start_time, end_time, entry_type, repeat_id, room_id, timestamp, create_by, "
+        "modified_by, name, type, description, status, ical_uid, ical_sequence) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'E', ?, ?, ?, 0)",
+        entry_rows(),
+    )
+    for statement in MRBS_INDEXES:
+        conn.execute(statement)
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+    meta = {
+        "scale": str(scale),
+        "seed": seed,
+        "anchor": anchor.isoformat(),
+        **dims,
+        "entries": int(len(start)),
+        "repeats": len(repeat_of),
+    }
+    Path(f"{path}.json").write_text(json.dumps(meta, indent=2))
+    return meta
+
+
+def load_or_generate(path: str, scale="10k", seed: int = 42, anchor: Optional[date] = None) -> Dict[str, object]:
+    """Reuse the database at `path` if it was generated with the same parameters."""
+    anchor = anchor or date.today()
+    meta_file = Path(f"{path}.json")
+    if os.path.exists(path) and meta_file.exists():
+        meta = json.loads(meta_file.read_text())
+        if (meta.get("scale"), meta.get("seed"), meta.get("anchor")) == (str(scale), seed, anchor.isoformat()):
+            return meta
+    return generate(path, scale, seed, anchor)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic MRBS SQLite database")
+    parser.add_argument("--scale", default="10k", help=f"One of {', '.join(SCALES)} or a number of entries")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", type=date.fromisoformat, default=None, help="Date bookings are centred on (default today)")
+    parser.add_argument("--out", default="benchmarks/data/mrbs_bench.db")
+    args = parser.parse_args()
+    meta = generate(args.out, args.scale, args.seed, args.anchor)
+    print(json.dumps(meta, indent=2))
+
+
+if __name__ == "__main__":
+    main()
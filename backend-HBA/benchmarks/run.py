@@ -0,0 +1,232 @@
+"""
+Run the benchmark scenarios against a generated SQLite database.
+
+    python -m benchmarks.run --scale 100k --seed 42
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Latency percentiles and query counts come from untraced iterations; peak
+memory is measured in a separate tracemalloc pass so tracing overhead does
+not distort the timings. LLM calls are answered by a stub.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.generator import load_or_generate
+
+BENCHMARK_DIR = Path(__file__).parent
+LLM_STUB_RESPONSE = json.dumps({
+    "room_recommendations": [],
+    "time_recommendations": [],
+    "patterns_observed": ["benchmark stub"],
+})
+
+
+class QueryCounter:
+    """Counts statements sent to any SQLAlchemy engine."""
+
+    def __init__(self):
+        self.count = 0
+
+    def install(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        event.listen(Engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def stub_llm(latency_ms: float = 0.0):
+    """Answer every chat-completion call locally instead of over HTTP."""
+    import asyncio
+    from src.llm_client import llm_client
+
+    def complete(provider, url, headers, payload):
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        return LLM_STUB_RESPONSE
+
+    async def acomplete(provider, url, headers, payload):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return LLM_STUB_RESPONSE
+
+    llm_client.complete = complete
+    llm_client.acomplete = acomplete
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARK_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def percentiles(samples_ms):
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    if not samples.size:
+        return {}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(samples.mean()), 3),
+        "min_ms": round(float(samples.min()), 3),
+        "max_ms": round(float(samples.max()), 3),
+    }
+
+
+def run_scenario(scenario, ctx, counter: QueryCounter, iterations: int, warmup: int, memory_iterations: int,
+                 seed: int, quiet: bool):
+    rng = random.Random(f"{seed}:{scenario.name}")
+    sink = open(os.devnull, "w") if quiet else None
+    latencies, queries, errors = [], [], []
+
+    def call(params):
+        try:
+            return scenario.run(ctx, params), None
+        except Exception as e:
+            ctx.db.rollback()
+            return None, f"{type(e).__name__}: {e}"
+
+    with contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+        try:
+            scenario.setup(ctx)
+        except Exception as e:
+            # e.g. an optional dependency of the engine under test is missing
+            return {"iterations": 0, "skipped": f"{type(e).__name__}: {e}"}
+        for i in range(warmup + iterations):
+            params = scenario.next_input(ctx, rng)
+            before = counter.count
+            started = time.perf_counter()
+            result, error = call(params)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            executed = counter.count - before
+            scenario.after(ctx, params, result)
+            if i < warmup:
+                continue
+            latencies.append(elapsed_ms)
+            queries.append(executed)
+            if error:
+                errors.append(error)
+
+        peak_kb = []
+        for _ in range(memory_iterations):
+            params = scenario.next_input(ctx, rng)
+            tracemalloc.start()
+            result, _ = call(params)
+            peak_kb.append(tracemalloc.get_traced_memory()[1] / 1024)
+            tracemalloc.stop()
+            scenario.after(ctx, params, result)
+    if sink:
+        sink.close()
+
+    return {
+        "iterations": iterations,
+        **percentiles(latencies),
+        "queries_mean": round(float(np.mean(queries)), 2) if queries else 0,
+        "queries_p95": float(np.percentile(queries, 95)) if queries else 0,
+        "peak_memory_kb": round(max(peak_kb), 1) if peak_kb else None,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the MRBS performance benchmark suite")
+    parser.add_argument("--scale", default="10k", help="Dataset size: 1k, 10k, 100k, 1m, 5m or a number of entries")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", type=date.fromisoformat, default=None, help="Date bookings are centred on (default today)")
+    parser.add_argument("--db", default=None, help="SQLite file to (re)use; generated if missing or stale")
+    parser.add_argument("--scenarios", default=None, help="Comma-separated subset of scenarios")
+    parser.add_argument("--iterations", type=int, default=None, help="Override every scenario's iteration count")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--memory-iterations", type=int, default=3)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated latency of the stubbed LLM")
+    parser.add_argument("--output", default=None, help="Results JSON (default benchmarks/results/<commit>-<scale>.json)")
+    parser.add_argument("--verbose", action="store_true", help="Keep the application's prints and logs")
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db or BENCHMARK_DIR / "data" / f"mrbs_{args.scale}_{args.seed}.db")
+    # Everything the application connects to must point at the benchmark files
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["CACHE_DB_PATH"] = str(Path(db_path).with_suffix(".cache.db"))
+    os.environ.setdefault("WARMUP_ON_STARTUP", "false")
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+
+    started = time.perf_counter()
+    meta = load_or_generate(db_path, args.scale, args.seed, args.anchor)
+    print(f"Dataset: {meta['entries']} entries, {meta['rooms']} rooms, {meta['users']} users "
+          f"({time.perf_counter() - started:.1f} s)")
+
+    from recommendtion.config.recommendation_config import RecommendationConfig
+    from src import models
+    from src.database import SessionLocal
+    from benchmarks import scenarios as scenario_module
+
+    RecommendationConfig.CACHE_DB_PATH = os.environ["CACHE_DB_PATH"]
+    stub_llm(args.llm_latency_ms)
+    counter = QueryCounter()
+    counter.install()
+
+    db = SessionLocal()
+    rooms = db.query(models.MRBSRoom.id, models.MRBSRoom.room_name).filter(models.MRBSRoom.disabled == False).all()  # noqa: E712
+    ctx = scenario_module.BenchmarkContext(
+        db=db,
+        anchor=date.fromisoformat(meta["anchor"]),
+        room_names=[name for _, name in rooms],
+        room_ids=[room_id for room_id, _ in rooms],
+        users=[f"user{u:05d}" for u in range(1, meta["users"] + 1)],
+        config=RecommendationConfig(),
+    )
+
+    results = {}
+    selected = args.scenarios.split(",") if args.scenarios else None
+    for scenario in scenario_module.build(selected):
+        iterations = args.iterations or scenario.default_iterations
+        print(f"Running {scenario.name} ({iterations} iterations)...", file=sys.stderr)
+        results[scenario.name] = run_scenario(scenario, ctx, counter, iterations, args.warmup,
+                                              args.memory_iterations, args.seed, quiet=not args.verbose)
+        summary = results[scenario.name]
+        if "skipped" in summary:
+            print(f"{scenario.name:<20} skipped: {summary['skipped']}")
+            continue
+        print(f"{scenario.name:<20} p50 {summary.get('p50_ms', 0):>9.2f} ms  p95 {summary.get('p95_ms', 0):>9.2f} ms  "
+              f"p99 {summary.get('p99_ms', 0):>9.2f} ms  queries {summary['queries_mean']:>7.1f}  "
+              f"peak {summary['peak_memory_kb'] or 0:>9.1f} KB  errors {summary['errors']}")
+    db.close()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": meta,
+        "settings": {"warmup": args.warmup, "memory_iterations": args.memory_iterations,
+                     "llm_latency_ms": args.llm_latency_ms},
+        "scenarios": results,
+    }
+    output = Path(args.output or BENCHMARK_DIR / "results" / f"{commit}-{args.scale}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Timed benchmark scenarios.
+
+Each scenario draws its inputs from the shared seeded RNG outside the timed
+region, then calls the same function a request handler would. setup() builds
+engines once; after() undoes writes so every iteration sees the same data.
+"""
+import os
+import random
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+
+@dataclass
+class BenchmarkContext:
+    db: Session
+    anchor: date
+    room_names: List[str]
+    room_ids: List[int]
+    users: List[str]
+    config: Any = None
+    shared: Dict[str, Any] = field(default_factory=dict)
+
+    def recommendation_engine(self):
+        """One RecommendationEngine shared by the scenarios that need it, built untimed."""
+        if "recommendation_engine" not in self.shared:
+            from recommendtion.recommendations.core.recommendation_engine import RecommendationEngine
+            self.shared["recommendation_engine"] = RecommendationEngine(db=self.db, config=self.config)
+        return self.shared["recommendation_engine"]
+
+
+class Scenario(ABC):
+    name = ""
+    default_iterations = 200
+
+    def setup(self, ctx: BenchmarkContext):
+        pass
+
+    @abstractmethod
+    def next_input(self, ctx: BenchmarkContext, rng: random.Random) -> Any:
+        ...
+
+    @abstractmethod
+    def run(self, ctx: BenchmarkContext, params: Any) -> Any:
+        ...
+
+    def after(self, ctx: BenchmarkContext, params: Any, result: Any):
+        pass
+
+
+def _slot(ctx: BenchmarkContext, rng: random.Random, days_before: int = 30, days_after: int = 30):
+    """Random room, date within the window around the anchor and a one-or-two-hour business slot."""
+    day = ctx.anchor + timedelta(days=rng.randint(-days_before, days_after))
+    hour = rng.randint(8, 17)
+    minutes = rng.choice([60, 120])
+    start = datetime.combine(day, datetime.min.time()) + timedelta(hours=hour)
+    return rng.choice(ctx.room_names), start, start + timedelta(minutes=minutes)
+
+
+class AvailabilityCheck(Scenario):
+    """check_availability for a room and slot; busy slots go through the recommendation engine."""
+    name = "availability_check"
+
+    def next_input(self, ctx, rng):
+        room, start, end = _slot(ctx, rng)
+        return room, start.strftime("%Y-%m-%d"), start.strftime("%H:%M"), end.strftime("%H:%M")
+
+    def run(self, ctx, params):
+        from src.availability_logic import check_availability
+        return check_availability(*params, ctx.db)
+
+
+class DaySlots(Scenario):
+    """Free slots of one room over a whole day."""
+    name = "day_slots"
+
+    def next_input(self, ctx, rng):
+        room, start, _ = _slot(ctx, rng)
+        return room, start.strftime("%Y-%m-%d")
+
+    def run(self, ctx, params):
+        from src.availability_logic import check_available_slotes
+        room, day = params
+        return check_available_slotes(room, day, "00:00", "23:59", ctx.db)
+
+
+def _recommendation_request(ctx, rng):
+    room, start, end = _slot(ctx, rng)
+    return {
+        "user_id": rng.choice(ctx.users),
+        "room_id": room,
+        "start_time": start.isoformat(),
+        "end_time": end.isoformat(),
+        "purpose": "meeting",
+        "capacity": rng.choice([1, 5, 10, 20]),
+    }
+
+
+class AlternativeTime(Scenario):
+    """Same-day and next-day alternative times for a room."""
+    name = "alternative_time"
+
+    def setup(self, ctx):
+        ctx.recommendation_engine()
+
+    def next_input(self, ctx, rng):
+        return _recommendation_request(ctx, rng)
+
+    def run(self, ctx, params):
+        return ctx.recommendation_engine()._get_alternative_time_recommendations_from_db(params)
+
+
+class AlternativeRoom(Scenario):
+    """Free rooms of similar capacity at the requested time."""
+    name = "alternative_room"
+
+    def setup(self, ctx):
+        ctx.recommendation_engine()
+
+    def next_input(self, ctx, rng):
+        return _recommendation_request(ctx, rng)
+
+    def run(self, ctx, params):
+        return ctx.recommendation_engine()._get_alternative_room_recommendations_from_db(params)
+
+
+class RecurringBooking(Scenario):
+    """Conflict check and creation of a ten-week weekly series; created rows are removed untimed."""
+    name = "recurring_booking"
+
+    def next_input(self, ctx, rng):
+        from src.recurrence.recurrence_service import expand_occurrences
+        room, start, end = _slot(ctx, rng, days_before=-1, days_after=60)
+        last = start.date() + timedelta(weeks=10)
+        occurrences = expand_occurrences("FREQ=WEEKLY", start.strftime("%Y-%m-%d"), last.strftime("%Y-%m-%d"),
+                                         start.strftime("%H:%M"), end.strftime("%H:%M"))
+        return room, occurrences
+
+    def run(self, ctx, params):
+        from src.recurrence.recurrence_service import create_recurring_booking
+        room, occurrences = params
+        return create_recurring_booking(room, "Benchmark series", occurrences, "benchmark", ctx.db)
+
+    def after(self, ctx, params, result):
+        if not isinstance(result, dict) or result.get("status") != "success":
+            return
+        from src import models
+        from src.booking_index import booking_index
+        from src.demand_histogram import demand_histogram
+
+        entries = ctx.db.query(models.MRBSEntry).filter(models.MRBSEntry.repeat_id == result["repeat_id"]).all()
+        for entry in entries:
+            booking_index.remove(entry.room_id, entry.id)
+            demand_histogram.forget(entry.room_id, entry.start_time, entry.end_time, entry.create_by, entry.name)
+            ctx.db.delete(entry)
+        ctx.db.query(models.MRBSRepeat).filter(models.MRBSRepeat.id == result["repeat_id"]).delete()
+        ctx.db.commit()
+
+
+class SimilarityMatrix(Scenario):
+    """Cold room similarity matrix: room profiles aggregated from bookings, then all pairs scored."""
+    name = "similarity_matrix"
+    default_iterations = 10
+    max_rooms = 200
+
+    def setup(self, ctx):
+        from recommendtion.recommendations.core.similarity_engine import SimilarityEngine
+        from recommendtion.recommendations.data.cache_manager import CacheConfig, CacheManager
+        cache_path = os.path.join(tempfile.mkdtemp(prefix="hba_bench_"), "similarity_cache.db")
+        self.engine = SimilarityEngine(ctx.db, CacheManager(CacheConfig(database_path=cache_path)))
+        self.engine.clear_similarity_cache()
+
+    def next_input(self, ctx, rng):
+        return sorted(rng.sample(ctx.room_ids, min(self.max_rooms, len(ctx.room_ids))))
+
+    def run(self, ctx, params):
+        return self.engine.get_room_similarity_array(params)
+
+    def after(self, ctx, params, result):
+        self.engine.clear_similarity_cache()
+
+
+SCENARIOS = {scenario.name: scenario for scenario in [
+    AvailabilityCheck, DaySlots, AlternativeTime, AlternativeRoom, RecurringBooking, SimilarityMatrix,
+]}
+
+
+def build(names: Optional[List[str]] = None) -> List[Scenario]:
+    names = names or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+    return [SCENARIOS[name]() for name in names]
@@ -6,11 +6,20 @@ import logging
 from pathlib import Path
 import sqlite3
 import hashlib
+import os
+from .mmap_store import MmapEmbeddingStore
 
 logger = logging.getLogger(__name__)
 
+# "mmap" keeps vectors in append-only memory-mapped matrices (one per entity
+# type) and only metadata in the per-entity pickle files; "pickle" keeps the
+# original one-file-per-embedding layout.
+EMBEDDING_STORE_BACKEND = os.getenv("EMBEDDING_STORE_BACKEND", "mmap")
+
+ENTITY_TABLES = {"rooms": "room_id", "users": "user_id", "bookings": "booking_id"}
+
 class EmbeddingManager:
-    def __init__(self, base_path: str = "data/embeddings"):
+    def __init__(self, base_path: str = "data/embeddings", backend: str = EMBEDDING_STORE_BACKEND):
         self.base_path = Path(base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
         
@@ -38,6 +47,32 @@ class EmbeddingManager:
                 version_id TEXT PRIMARY KEY, model_name TEXT, created_at TIMESTAMP, description TEXT);
         """)
         self.conn.commit()
+        
+        self.backend = backend
+        self.stores: Dict[str, MmapEmbeddingStore] = {}
+        if backend == "mmap":
+            for table, id_field in ENTITY_TABLES.items():
+                self.stores[table] = MmapEmbeddingStore(str(getattr(self, f"{table}_path") / "matrix"))
+                self._import_pickled_embeddings(table, id_field)
+    
+    def _import_pickled_embeddings(self, table: str, id_field: str):
+        """Move vectors from pickle files written by the old layout into the memory-mapped store."""
+        store = self.stores[table]
+        ids, vectors = [], []
+        for entity_id, file_path in self.conn.execute(f"SELECT {id_field}, file_path FROM {table[:-1]}_embeddings").fetchall():
+            if entity_id in store:
+                continue
+            try:
+                with open(file_path, 'rb') as f:
+                    embedding = pickle.load(f).get('embedding')
+                if embedding is not None and (store.dim is None or len(embedding) == store.dim):
+                    ids.append(entity_id)
+                    vectors.append(np.asarray(embedding, dtype=np.float32))
+            except Exception as e:
+                logger.warning(f"Could not import embedding for {id_field} {entity_id}: {e}")
+        if ids and len({len(v) for v in vectors}) == 1:
+            store.append_many(ids, np.stack(vectors))
+            logger.info(f"Imported {len(ids)} {table[:-1]} embeddings into the memory-mapped store")
     
     def _save_embedding(self, table: str, id_field: str, id_val: int, embedding: np.ndarray, 
                        data: Dict[str, Any], version: str = "v1.0") -> bool:
@@ -45,12 +80,17 @@ class EmbeddingManager:
             hash_val = hashlib.md5(embedding.tobytes()).hexdigest()
             file_path = getattr(self, f"{table}_path") / f"{table[:-1]}_{id_val}_{hash_val}.pkl"
             
+            record = {**data, id_field: id_val, 'created_at': datetime.now().isoformat()}
+            if table in self.stores:
+                self.stores[table].append(id_val, embedding)
+            else:
+                record['embedding'] = embedding
             with open(file_path, 'wb') as f:
-                pickle.dump({**data, 'embedding': embedding, id_field: id_val, 'created_at': datetime.now().isoformat()}, f)
+                pickle.dump(record, f)
             
             now = datetime.now()
             self.conn.execute(f"""
-                INSERT OR REPLACE INTO {table}_embeddings 
+                INSERT OR REPLACE INTO {table[:-1]}_embeddings 
                 ({id_field}, embedding_hash, created_at, updated_at, feature_version, dimensions, file_path)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             """, (id_val, hash_val, now, now, version, len(embedding), str(file_path)))
@@ -64,7 +104,7 @@ class EmbeddingManager:
     
     def _load_embedding(self, table: str, id_field: str, id_val: int) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
         try:
-            cursor = self.conn.execute(f"SELECT file_path FROM {table}_embeddings WHERE {id_field} = ?", (id_val,))
+            cursor = self.conn.execute(f"SELECT file_path FROM {table[:-1]}_embeddings WHERE {id_field} = ?", (id_val,))
             result = cursor.fetchone()
             
             if not result or not Path(result[0]).exists():
@@ -72,7 +112,10 @@ class EmbeddingManager:
             
             with open(result[0], 'rb') as f:
                 data = pickle.load(f)
-                return data['embedding'], {k: v for k, v in data.items() if k not in ['embedding', id_field, 'created_at']}
+            embedding = self.stores[table].get(id_val) if table in self.stores else data.get('embedding')
+            if embedding is None:
+                return None
+            return embedding, {k: v for k, v in data.items() if k not in ['embedding', id_field, 'created_at']}
         except Exception as e:
             logger.error(f"Error loading {table[:-1]} embedding: {e}")
             return None
@@ -98,10 +141,23 @@ class EmbeddingManager:
     def get_all_user_embeddings(self) -> Dict[int, np.ndarray]:
         return self._get_all_embeddings("users", "user_id")
     
+    def get_room_embedding_matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(room_ids, matrix) straight from the memory map, without per-row copies."""
+        return self.stores["rooms"].matrix()
+    
+    def get_user_embedding_matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(user_ids, matrix) straight from the memory map, without per-row copies."""
+        return self.stores["users"].matrix()
+    
     def _get_all_embeddings(self, table: str, id_field: str) -> Dict[int, np.ndarray]:
+        if table in self.stores:
+            ids, matrix = self.stores[table].matrix()
+            # Rows are views into the memory-mapped matrix
+            return {entity_id: matrix[row] for row, entity_id in enumerate(ids.tolist())}
+        
         embeddings = {}
         try:
-            cursor = self.conn.execute(f"SELECT {id_field}, file_path FROM {table}_embeddings")
+            cursor = self.conn.execute(f"SELECT {id_field}, file_path FROM {table[:-1]}_embeddings")
             
             for entity_id, file_path in cursor.fetchall():
                 try:
@@ -130,8 +186,12 @@ class EmbeddingManager:
             for (file_path,) in old_files:
                 Path(file_path).unlink(missing_ok=True)
             
-            for table in ["room_embeddings", "user_embeddings", "booking_embeddings"]:
-                self.conn.execute(f"DELETE FROM {table} WHERE created_at < ?", (cutoff_date,))
+            for table, id_field in ENTITY_TABLES.items():
+                if table in self.stores:
+                    old_ids = [row[0] for row in self.conn.execute(
+                        f"SELECT {id_field} FROM {table[:-1]}_embeddings WHERE created_at < ?", (cutoff_date,))]
+                    self.stores[table].delete(old_ids)
+                self.conn.execute(f"DELETE FROM {table[:-1]}_embeddings WHERE created_at < ?", (cutoff_date,))
             
             self.conn.commit()
             logger.info(f"Cleaned up {len(old_files)} old embedding files")
@@ -149,12 +209,20 @@ class EmbeddingManager:
             total_size = sum(f.stat().st_size for path in [self.rooms_path, self.users_path, self.bookings_path] 
                            for f in path.rglob("*.pkl"))
             
+            total_size += sum(store.disk_usage_bytes() for store in self.stores.values())
+            
             stats['total_disk_usage_mb'] = total_size / (1024 * 1024)
+            stats['backend'] = self.backend
+            stats['dead_rows'] = {table: store.dead_rows() for table, store in self.stores.items()}
             return stats
         except Exception as e:
             logger.error(f"Error getting embedding stats: {e}")
             return {}
     
+    def compact(self) -> Dict[str, int]:
+        """Drop tombstoned rows from the memory-mapped stores; returns rows reclaimed per entity type."""
+        return {table: store.compact() for table, store in self.stores.items()}
+    
     def close(self):
         if hasattr(self, 'conn'):
             self.conn.close()
\ No newline at end of file
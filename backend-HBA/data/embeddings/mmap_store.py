@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GENERATION_FILE_PATTERN = re.compile(r"^(vectors|tombstones|ids)(?:\.(\d+))?\.(npy|txt)$")
+
+
+class MmapEmbeddingStore:
+    """
+    Append-only memory-mapped embedding matrix for one entity type.
+
+    Layout under `path` (generation 0 files have no .<gen> suffix):
+      vectors.<gen>.npy     float32 (capacity, dim) matrix, grown by doubling
+      tombstones.<gen>.npy  bool (capacity,) deleted/superseded rows
+      ids.<gen>.txt         one entity id per row, appended as rows are written
+      meta.json             dim, number of used rows and current generation
+
+    Updating an entity appends a new row and tombstones the old one, so
+    writes never move existing data. compact() writes live rows to the next
+    generation's files; rewriting meta.json is the single commit point.
+    """
+
+    INITIAL_CAPACITY = 256
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self.dim: Optional[int] = None
+        self.rows = 0
+        self.generation = 0
+        self._ids: List[int] = []
+        self._index: Dict[int, int] = {}
+        self._vectors = None
+        self._tombstones = None
+        self._open()
+
+    # ------------------------------------------------------------------ files
+
+    def _file(self, name: str, extension: str, generation: Optional[int] = None) -> Path:
+        generation = self.generation if generation is None else generation
+        return self.path / (f"{name}.{generation}.{extension}" if generation else f"{name}.{extension}")
+
+    @property
+    def _vectors_file(self) -> Path:
+        return self._file("vectors", "npy")
+
+    @property
+    def _tombstones_file(self) -> Path:
+        return self._file("tombstones", "npy")
+
+    @property
+    def _ids_file(self) -> Path:
+        return self._file("ids", "txt")
+
+    @property
+    def _meta_file(self) -> Path:
+        return self.path / "meta.json"
+
+    def _open(self):
+        if not self._meta_file.exists():
+            return
+        meta = json.loads(self._meta_file.read_text())
+        self.dim = meta.get("dim")
+        self.rows = meta.get("rows", 0)
+        self.generation = meta.get("generation", 0)
+        self._remove_other_generations()
+        if self.dim is None or not self._vectors_file.exists():
+            return
+        self._vectors = np.load(self._vectors_file, mmap_mode="r+")
+        self._tombstones = np.load(self._tombstones_file, mmap_mode="r+")
+        with open(self._ids_file) as f:
+            ids = [int(line) for line in f.read().split()]
+        if len(ids) > self.rows:
+            # Rows appended after the last meta.json write were never committed
+            self._ids_file.write_text("".join(f"{entity_id}\n" for entity_id in ids[:self.rows]))
+        self._ids = ids[:self.rows]
+        self._index = {}
+        for row, entity_id in enumerate(self._ids):
+            if not self._tombstones[row]:
+                previous = self._index.get(entity_id)
+                if previous is not None:
+                    # Superseded row whose tombstone never made it to disk
+                    self._tombstones[previous] = True
+                self._index[entity_id] = row
+
+    def _write_meta(self):
+        tmp = self._meta_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"dim": self.dim, "rows": self.rows, "generation": self.generation}))
+        os.replace(tmp, self._meta_file)
+
+    def _remove_other_generations(self):
+        """Delete files of superseded or never-committed generations."""
+        for file in self.path.iterdir():
+            match = GENERATION_FILE_PATTERN.match(file.name)
+            if match and int(match.group(2) or 0) != self.generation:
+                file.unlink()
+
+    def _allocate(self, capacity: int):
+        """Create (or grow into) files with room for `capacity` rows."""
+        vectors_tmp = self.path / "vectors.tmp.npy"
+        tombstones_tmp = self.path / "tombstones.tmp.npy"
+        vectors = np.lib.format.open_memmap(vectors_tmp, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+        tombstones = np.lib.format.open_memmap(tombstones_tmp, mode="w+", dtype=bool, shape=(capacity,))
+        if self._vectors is not None and self.rows:
+            vectors[:self.rows] = self._vectors[:self.rows]
+            tombstones[:self.rows] = self._tombstones[:self.rows]
+        vectors.flush()
+        tombstones.flush()
+        del vectors, tombstones
+        self._vectors = None
+        self._tombstones = None
+        os.replace(vectors_tmp, self._vectors_file)
+        os.replace(tombstones_tmp, self._tombstones_file)
+        self._vectors = np.load(self._vectors_file, mmap_mode="r+")
+        self._tombstones = np.load(self._tombstones_file, mmap_mode="r+")
+
+    def _ensure_capacity(self, needed: int):
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(self.INITIAL_CAPACITY, capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+        self._allocate(new_capacity)
+
+    # -------------------------------------------------------------------- api
+
+    def append_many(self, entity_ids: Iterable[int], vectors: np.ndarray):
+        """Append rows for many entities; existing rows of those entities are tombstoned."""
+        entity_ids = [int(entity_id) for entity_id in entity_ids]
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(entity_ids), -1)
+        if not entity_ids:
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match store dimension {self.dim}")
+            start = self.rows
+            self._ensure_capacity(start + len(entity_ids))
+            self._vectors[start:start + len(entity_ids)] = vectors
+            self._tombstones[start:start + len(entity_ids)] = False
+            self._vectors.flush()
+            with open(self._ids_file, "a") as f:
+                f.write("".join(f"{entity_id}\n" for entity_id in entity_ids))
+            self._ids.extend(entity_ids)
+            self.rows = start + len(entity_ids)
+            # meta.json is the commit point; superseded rows are only
+            # tombstoned once the new rows are durable
+            self._write_meta()
+            for offset, entity_id in enumerate(entity_ids):
+                previous = self._index.get(entity_id)
+                if previous is not None:
+                    self._tombstones[previous] = True
+                self._index[entity_id] = start + offset
+            self._tombstones.flush()
+
+    def append(self, entity_id: int, vector: np.ndarray):
+        self.append_many([entity_id], np.asarray(vector).reshape(1, -1))
+
+    def get(self, entity_id: int) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._index.get(int(entity_id))
+            return None if row is None else np.array(self._vectors[row])
+
+    def delete(self, entity_ids: Iterable[int]) -> int:
+        """Tombstone entities; returns how many were live."""
+        deleted = 0
+        with self._lock:
+            for entity_id in entity_ids:
+                row = self._index.pop(int(entity_id), None)
+                if row is not None:
+                    self._tombstones[row] = True
+                    deleted += 1
+            if deleted:
+                self._tombstones.flush()
+        return deleted
+
+    def __contains__(self, entity_id: int) -> bool:
+        return int(entity_id) in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (ids, vectors) of all live rows.
+
+        Without tombstones this is a zero-copy view of the memory map;
+        otherwise live rows are gathered (run compact() to restore zero-copy).
+        """
+        with self._lock:
+            if self._vectors is None or self.rows == 0:
+                return np.zeros(0, dtype=np.int64), np.zeros((0, self.dim or 0), dtype=np.float32)
+            ids = np.asarray(self._ids, dtype=np.int64)
+            live = ~np.asarray(self._tombstones[:self.rows])
+            if live.all():
+                return ids, self._vectors[:self.rows]
+            return ids[live], self._vectors[:self.rows][live]
+
+    def dead_rows(self) -> int:
+        return self.rows - len(self._index)
+
+    def compact(self) -> int:
+        """Rewrite the files with live rows only; returns the number of rows reclaimed."""
+        with self._lock:
+            reclaimed = self.dead_rows()
+            if reclaimed == 0:
+                return 0
+            ids, vectors = self.matrix()
+            generation = self.generation + 1
+            capacity = self.INITIAL_CAPACITY
+            while capacity < len(ids):
+                capacity *= 2
+            new_files = [self._file(name, extension, generation)
+                         for name, extension in (("vectors", "npy"), ("tombstones", "npy"), ("ids", "txt"))]
+            try:
+                new_vectors = np.lib.format.open_memmap(new_files[0], mode="w+", dtype=np.float32,
+                                                        shape=(capacity, self.dim))
+                new_vectors[:len(ids)] = vectors
+                new_vectors.flush()
+                new_tombstones = np.lib.format.open_memmap(new_files[1], mode="w+", dtype=bool, shape=(capacity,))
+                new_tombstones.flush()
+                new_files[2].write_text("".join(f"{entity_id}\n" for entity_id in ids.tolist()))
+                del new_vectors, new_tombstones, vectors
+            except Exception:
+                for file in new_files:
+                    file.unlink(missing_ok=True)
+                raise
+
+            self._vectors = None
+            self._tombstones = None
+            self.generation = generation
+            self.rows = len(ids)
+            self._write_meta()
+            self._ids = ids.tolist()
+            self._index = {entity_id: row for row, entity_id in enumerate(self._ids)}
+            self._vectors = np.load(self._vectors_file, mmap_mode="r+")
+            self._tombstones = np.load(self._tombstones_file, mmap_mode="r+")
+            self._remove_other_generations()
+            logger.info(f"Compacted {self.path}: reclaimed {reclaimed} rows")
+            return reclaimed
+
+    def disk_usage_bytes(self) -> int:
+        return sum(f.stat().st_size for f in self.path.iterdir() if f.is_file())
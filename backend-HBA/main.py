@@ -1,5 +1,5 @@
 from datetime import datetime, date, time
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 from src.models import MRBSEntry, MRBSRoom
 from src.database import get_db
@@ -8,7 +8,7 @@ import os
 from langchain_core.language_models import BaseLLM
 from langchain_core.outputs import LLMResult, Generation
 import requests
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from typing import Optional, List, Any
 from src.api import router 
@@ -33,6 +33,62 @@ app.add_middleware(
 
 app.include_router(router)
 
+# With STAGE_TIMING_ENABLED, pipeline stages are timed per request and feed
+# the histograms at /admin/stage_timings; callers sending the admin token in
+# X-Admin-Token also get them back in a Server-Timing header.
+@app.middleware("http")
+async def add_server_timing(request, call_next):
+    from src.stage_timing import is_trusted_caller, trace_request
+    with trace_request() as trace:
+        response = await call_next(request)
+    if trace is not None and is_trusted_caller(request.headers.get("X-Admin-Token")):
+        response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+# Heavy components (recommendation engines, spaCy) load lazily. By default
+# they are warmed on a background thread at startup so the worker binds
+# immediately and /health/ready reports when they are done.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+@app.on_event("startup")
+async def warm_components():
+    if WARMUP_ON_STARTUP:
+        from src.warmup import warmup_in_background
+        warmup_in_background()
+
+@app.get("/health/live")
+def liveness():
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness_check():
+    from fastapi.responses import JSONResponse
+    from src.warmup import readiness
+    status = readiness()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.post("/health/warmup")
+def warmup_components():
+    from src.warmup import warmup
+    return warmup()
+
+@app.get("/admin/stage_timings")
+def stage_timings(reset: bool = False, x_admin_token: Optional[str] = Header(default=None)):
+    from src.stage_timing import STAGE_TIMING_ADMIN_TOKEN, is_trusted_caller, stage_histograms
+    if not STAGE_TIMING_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_trusted_caller(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    stages = stage_histograms.snapshot()
+    if reset:
+        stage_histograms.reset()
+    return {"buckets_ms": stage_histograms.bounds_ms, "stages": stages}
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    from src.llm_client import llm_client
+    await llm_client.aclose()
+
 # Configure logging
 # logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 # logger = logging.getLogger(__name__)
@@ -180,6 +236,17 @@ def available_slots_endpoint(
     from src.availability_logic import check_available_slotes
     return check_available_slotes(room_name, date, "00:00", "23:59", db)
 
+@app.get("/booking/available_slots_bulk")
+def available_slots_bulk_endpoint(
+    start_date: str,
+    days: int = 7,
+    room_names: Optional[List[str]] = Query(None),
+    duration_minutes: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    from src.availability_logic import fetch_available_slots_bulk
+    return fetch_available_slots_bulk(room_names, start_date, days, db, duration_minutes)
+
 @app.delete("/booking/delete")
 def delete_booking(booking_id: int, db: Session = Depends(get_db)):
     from src.availability_logic import delete_booking
@@ -241,4 +308,34 @@ def fetch_all_halls(db: Session = Depends(get_db)):
 def fetch_halls_by_moduleCode(module_code: str, db: Session = Depends(get_db)):
     from src.availability_logic import fetch_halls_by_module_code as fetch_halls_logic
 
-    return fetch_halls_logic(module_code, db)
\ No newline at end of file
+    return fetch_halls_logic(module_code, db)
+
+
+class TimetableSessionRequest(BaseModel):
+    module_code: str
+    weekday: int
+    start_time: str = Field(pattern=r"^([01]?\d|2[0-3]):[0-5]\d$")  # HH:MM
+    duration_minutes: int
+    recurrence: str = "FREQ=WEEKLY"
+    name: Optional[str] = None
+
+class AllocateTimetableRequest(BaseModel):
+    semester_start: date
+    semester_end: date
+    sessions: List[TimetableSessionRequest]
+    created_by: str = "system"
+    dry_run: bool = False
+
+@app.post("/booking/allocate_timetable")
+def allocate_timetable_endpoint(request: AllocateTimetableRequest, db: Session = Depends(get_db)):
+    from src.timetable_allocator import TimetableSession, allocate_timetable
+
+    sessions = [TimetableSession(**session.model_dump()) for session in request.sessions]
+    return allocate_timetable(
+        sessions,
+        request.semester_start.isoformat(),
+        request.semester_end.isoformat(),
+        request.created_by,
+        db,
+        dry_run=request.dry_run,
+    )
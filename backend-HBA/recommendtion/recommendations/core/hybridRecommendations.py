@@ -1,6 +1,8 @@
 from .recommendation_engine import RecommendationEngine
 from ..models.enhanced_embedding_model import EnhancedEmbeddingModel
 from ..models.deepseek_integration import DeepSeekRecommendationProcessor
+from src.llm_client import llm_client
+from src.stage_timing import span
 from typing import Dict, List, Any, Optional
 import logging
 import asyncio
@@ -78,7 +80,7 @@ class hybridRecommendationsEngine(RecommendationEngine):
     def get_recommendations(self, request_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Main method to get enhanced recommendations with proper duration handling"""
         user_id = str(request_data.get('user_id', 'unknown'))
-        print(f"\n--- Getting Recommendations for User: {user_id} ---")
+        logger.debug("Getting recommendations for user %s", user_id)
         
         # Parse and validate user's requested time range
         try:
@@ -86,11 +88,10 @@ class hybridRecommendationsEngine(RecommendationEngine):
             original_end = self._parse_datetime(request_data.get('end_time', ''))
             user_duration_minutes = self._calculate_duration_minutes(original_start, original_end)
             
-            print(f"📅 Requested Time: {original_start.strftime('%Y-%m-%d %H:%M')} - {original_end.strftime('%Y-%m-%d %H:%M')}")
-            print(f"⏱️  Duration: {user_duration_minutes} minutes ({user_duration_minutes/60:.1f} hours)")
+            logger.debug("Requested time %s - %s (%s minutes)", original_start, original_end, user_duration_minutes)
             
         except Exception as e:
-            print(f"❌ Time parsing error: {e}")
+            logger.warning(f"Time parsing error: {e}")
             original_start = datetime.now()
             original_end = original_start + timedelta(hours=4)
             user_duration_minutes = 240
@@ -99,12 +100,10 @@ class hybridRecommendationsEngine(RecommendationEngine):
             # Check if there's already an event loop running
             try:
                 loop = asyncio.get_running_loop()
-                print("🔄 Using existing event loop")
                 # If there's already a loop, run the coroutine synchronously
                 recommendations = self._get_enhanced_recommendations_sync(request_data)
             except RuntimeError:
                 # No loop running, create a new one
-                print("🔄 Creating new event loop")
                 loop = asyncio.new_event_loop()
                 asyncio.set_event_loop(loop)
                 try:
@@ -112,21 +111,25 @@ class hybridRecommendationsEngine(RecommendationEngine):
                         self._get_enhanced_recommendations_async(request_data)
                     )
                 finally:
+                    # The LLM client's pool for this loop would leak once it is closed
+                    loop.run_until_complete(llm_client.aclose_loop())
                     loop.close()
             
             # Validate all recommendations have correct duration
-            validated_recommendations = self._validate_and_fix_durations(
-                recommendations, user_duration_minutes, request_data
-            )
+            with span("duration_validation"):
+                validated_recommendations = self._validate_and_fix_durations(
+                    recommendations, user_duration_minutes, request_data
+                )
             
-            self._print_final_scores(validated_recommendations)
+            if logger.isEnabledFor(logging.DEBUG):
+                self._print_final_scores(validated_recommendations)
             return validated_recommendations
             
         except Exception as e:
-            print(f"❌ Enhanced recommendation error: {e}")
-            print("🔄 Falling back to base recommendations")
+            logger.warning(f"Enhanced recommendation error, falling back to base recommendations: {e}")
             base_recs = self._get_base_recommendations(request_data)
-            return self._validate_and_fix_durations(base_recs, user_duration_minutes, request_data)
+            with span("duration_validation"):
+                return self._validate_and_fix_durations(base_recs, user_duration_minutes, request_data)
     
     def _validate_and_fix_durations(self, recommendations: List[Dict[str, Any]], 
                                   expected_duration_minutes: int, 
@@ -151,79 +154,78 @@ class hybridRecommendationsEngine(RecommendationEngine):
                     rec['start_time'] = suggestion['start_time']
                     rec['end_time'] = suggestion['end_time']
                     
-                    print(f"✓ Fixed {suggestion.get('room_name', 'Unknown')}: {start_time.strftime('%H:%M')} - {corrected_end_time.strftime('%H:%M')} ({expected_duration_minutes}min)")
+                    logger.debug("Fixed %s: %s - %s (%smin)", suggestion.get('room_name', 'Unknown'),
+                                 start_time, corrected_end_time, expected_duration_minutes)
                 
                 validated_recs.append(rec)
                 
             except Exception as e:
-                print(f"⚠️  Error fixing duration for recommendation: {e}")
+                logger.warning(f"Error fixing duration for recommendation: {e}")
                 validated_recs.append(rec)  # Keep the recommendation even if validation fails
         
         return validated_recs
     
     def _get_enhanced_recommendations_sync(self, request_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Synchronous version for when event loop already exists"""
-        print("🔄 Running synchronous enhanced recommendations")
-        
         # Get base recommendations from the updated engine
         base_recs = self._get_base_recommendations(request_data)
-        print(f"✅ Base Recommendations: {len(base_recs)}")
         
         # Prepare user context (synchronous version)
-        user_context = self._prepare_user_context_sync(request_data)
+        with span("user_context"):
+            user_context = self._prepare_user_context_sync(request_data)
         
         # Run ML and LLM analysis (synchronous versions) - minimal impact
         ml_scores = {}
         llm_scores = {}
         
         if self.ml_available:
-            ml_scores = self._run_ml_analysis_sync(base_recs, user_context)
+            with span("ml_analysis"):
+                ml_scores = self._run_ml_analysis_sync(base_recs, user_context)
         
         if self.llm_available:
-            llm_scores = self._run_llm_analysis_sync(base_recs, user_context)
-        
-        # Calculate final scores
-        enhanced_recs = self._calculate_final_scores(base_recs, ml_scores, llm_scores)
+            with span("llm_analysis"):
+                llm_scores = self._run_llm_analysis_sync(base_recs, user_context)
         
-        # Sort by priority order instead of just score
-        return self._sort_recommendations_by_priority(enhanced_recs)[:8]
+        # Calculate final scores and sort by priority order instead of just score
+        with span("scoring"):
+            enhanced_recs = self._calculate_final_scores(base_recs, ml_scores, llm_scores)
+            return self._sort_recommendations_by_priority(enhanced_recs)[:8]
     
     async def _get_enhanced_recommendations_async(self, request_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Async method for enhanced recommendations"""
-        print("🔄 Running asynchronous enhanced recommendations")
-        
         # Get base recommendations from the updated engine
         base_recs = self._get_base_recommendations(request_data)
-        print(f"✅ Base Recommendations: {len(base_recs)}")
         
         # Prepare user context
-        user_context = await self._prepare_user_context(request_data)
+        with span("user_context"):
+            user_context = await self._prepare_user_context(request_data)
         
         # Run ML and LLM analysis - minimal impact
         ml_scores = {}
         llm_scores = {}
         
         if self.ml_available:
-            ml_scores = await self._run_ml_analysis(base_recs, user_context)
+            with span("ml_analysis"):
+                ml_scores = await self._run_ml_analysis(base_recs, user_context)
         
         if self.llm_available:
-            llm_scores = await self._run_llm_analysis(base_recs, user_context)
-        
-        # Calculate final scores
-        enhanced_recs = self._calculate_final_scores(base_recs, ml_scores, llm_scores)
+            with span("llm_analysis"):
+                llm_scores = await self._run_llm_analysis(base_recs, user_context)
         
-        # Sort by priority order instead of just score
-        return self._sort_recommendations_by_priority(enhanced_recs)[:8]
+        # Calculate final scores and sort by priority order instead of just score
+        with span("scoring"):
+            enhanced_recs = self._calculate_final_scores(base_recs, ml_scores, llm_scores)
+            return self._sort_recommendations_by_priority(enhanced_recs)[:8]
     
     def _get_base_recommendations(self, request_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Get base system recommendations using the updated engine"""
         try:
-            print("🏢 Getting base recommendations...")
-            recs = super().get_recommendations(request_data)
+            with span("base_recommendations"):
+                recs = super().get_recommendations(request_data)
             
             # Handle case where no recommendations are returned
             if not recs:
-                print("⚠️  No base recommendations found")
+                logger.info("No base recommendations found")
                 return []
             
             # Ensure all required fields exist
@@ -242,11 +244,11 @@ class hybridRecommendationsEngine(RecommendationEngine):
                 if 'suggestion' not in rec:
                     rec['suggestion'] = {'room_name': rec['room_name'], 'capacity': 10}
             
-            print(f"✅ Found {len(recs)} base recommendations")
+            logger.debug("Found %d base recommendations", len(recs))
             return recs
             
         except Exception as e:
-            print(f"❌ Base recommendation error: {e}")
+            logger.error(f"Base recommendation error: {e}")
             return []
     
     def _prepare_user_context_sync(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -266,7 +268,6 @@ class hybridRecommendationsEngine(RecommendationEngine):
     def _run_ml_analysis_sync(self, recommendations: List[Dict], user_context: Dict) -> Dict[str, float]:
         """Run ML analysis synchronously - minimal impact"""
         ml_scores = {}
-        print("🔍 Running ML Analysis (Sync)...")
         
         try:
             if not self.enhanced_embeddings or not self.ml_available:
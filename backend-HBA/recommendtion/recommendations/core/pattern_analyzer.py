@@ -5,6 +5,10 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from collections import Counter, defaultdict
 
+import numpy as np
+
+from src.demand_histogram import demand_histogram
+
 logger = logging.getLogger(__name__)
 
 class PatternAnalyzer:
@@ -204,9 +208,28 @@ class PatternAnalyzer:
             'peak_season': season_counts.most_common(1)[0][0] if season_counts else 'spring'
         }
     
+    def _get_popular_slots(self) -> Dict[str, List[int]]:
+        """Busiest hours and days across all rooms, from the demand histogram"""
+        if not self.db_session:
+            return {}
+        try:
+            totals = demand_histogram.totals(self.db_session)
+            if not totals.any():
+                return {}
+            hours, days = totals.sum(axis=0), totals.sum(axis=1)
+            return {
+                'preferred_hours': [int(h) for h in np.argsort(-hours, kind='stable')[:4] if hours[h] > 0],
+                'preferred_days': [int(d) for d in np.argsort(-days, kind='stable')[:5] if days[d] > 0]
+            }
+        except Exception as e:
+            logger.error(f"Error reading demand histogram: {e}")
+            return {}
+    
     def _get_default_patterns(self) -> Dict[str, Any]:
+        popular = self._get_popular_slots()
         return {
-            'preferred_hours': [9, 10, 14, 15], 'preferred_days': [0, 1, 2, 3, 4],
+            'preferred_hours': popular.get('preferred_hours', [9, 10, 14, 15]),
+            'preferred_days': popular.get('preferred_days', [0, 1, 2, 3, 4]),
             'meeting_duration_patterns': {'average_duration': 60, 'common_durations': [30, 60, 90]},
             'room_preferences': {'preferred_rooms': [], 'average_capacity': 6},
             'booking_frequency': {'bookings_per_week': 2, 'booking_trend': 'stable'},
@@ -1,10 +1,11 @@
 import json
 import logging
+import math
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from collections import defaultdict, Counter
 import numpy as np
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
@@ -27,11 +28,14 @@ except ImportError:
         pass
 
 try:
-    from ..data.cache_manager import CacheManager
+    from ..data.cache_manager import CacheManager, CacheKeyType
 except ImportError:
+    class CacheKeyType:
+        USER_PREFERENCES = "user_pref"
+    
     class CacheManager:
-        def get(self, key): return None
-        def set(self, key, value, ttl=None): pass
+        def get(self, key_type, default=None, *args): return default
+        def set(self, key_type, value, ttl=None, *args): pass
 
 try:
     from src.models import MRBSEntry, MRBSRoom, MRBSRepeat
@@ -56,6 +60,8 @@ except ImportError:
         def __init__(self):
             self.id = None
 
+from src.room_catalog import ROOM_FEATURE_KEYWORDS, parse_room_features
+
 logger = logging.getLogger(__name__)
 
 class PreferenceType(Enum):
@@ -81,6 +87,37 @@ class PreferenceScore:
     last_updated: datetime
     source: str
 
+CAPACITY_RANGES = {"small": (0, 10), "medium": (11, 25), "large": (26, 50), "extra_large": (51, float('inf'))}
+
+@dataclass
+class PreferenceState:
+    """
+    Decayed running counters behind a UserProfile's preferences.
+    
+    An event at time t is counted with weight exp((t - reference_time) / tau),
+    so recent bookings weigh more without touching older counters. Scores are
+    ratios of these weights, so the common scale cancels out.
+    """
+    reference_time: float
+    strategy: str = "hybrid"
+    bookings: int = 0
+    last_entry_id: int = 0
+    total: float = 0.0
+    hours: Dict[int, float] = field(default_factory=dict)
+    days: Dict[int, float] = field(default_factory=dict)
+    rooms: Dict[int, float] = field(default_factory=dict)
+    room_types: Dict[str, float] = field(default_factory=dict)
+    durations: Dict[float, float] = field(default_factory=dict)
+    duration_weight: float = 0.0
+    duration_sum: float = 0.0
+    capacity_ranges: Dict[str, float] = field(default_factory=dict)
+    capacity_weight: float = 0.0
+    capacity_sum: float = 0.0
+    features: Dict[str, float] = field(default_factory=dict)
+    recurring: float = 0.0
+    feedback: Dict[Tuple[str, str, Any], float] = field(default_factory=dict)
+    rebuilt_at: datetime = field(default_factory=datetime.now)
+
 @dataclass
 class UserProfile:
     user_id: str
@@ -89,6 +126,7 @@ class UserProfile:
     interaction_history: List[Dict[str, Any]]
     created_at: datetime
     updated_at: datetime
+    learning_state: Optional[PreferenceState] = None
 
 class PreferenceLearner:
     from ..models.embedding_model import EmbeddingModel
@@ -101,6 +139,11 @@ class PreferenceLearner:
         self.decay_factor = 0.95
         self.min_interactions = 5
         self.confidence_threshold = 0.6
+        # Booking weight halves every preference_half_life_days
+        self.preference_half_life_days = 90
+        # Stale profiles are caught up from new bookings; the full history is
+        # only re-read this often
+        self.full_rebuild_interval = timedelta(hours=24)
         self.tables_exist = self._check_tables_exist()
         
     def _check_tables_exist(self) -> bool:
@@ -114,18 +157,26 @@ class PreferenceLearner:
     def learn_user_preferences(self, user_id: str, strategy: LearningStrategy = LearningStrategy.HYBRID) -> UserProfile:
         try:
             cached_profile = self._get_cached_profile(user_id)
-            if cached_profile and self._is_profile_fresh(cached_profile):
-                return cached_profile
             
             if not self.tables_exist:
+                if cached_profile and self._is_profile_fresh(cached_profile):
+                    return cached_profile
                 return self._get_mock_profile(user_id)
             
+            # A cached state only needs the bookings created since it was saved
+            if cached_profile and self._can_update_incrementally(cached_profile, strategy):
+                return self._catch_up_profile(cached_profile)
+            
+            if cached_profile and cached_profile.learning_state is None and self._is_profile_fresh(cached_profile):
+                return cached_profile
+            
+            bookings = self._recent_bookings(user_id)
             if strategy == LearningStrategy.IMPLICIT:
-                preferences = self._learn_implicit_preferences(user_id)
+                preferences = self._learn_implicit_preferences(user_id, bookings)
             elif strategy == LearningStrategy.EXPLICIT:
                 preferences = self._learn_explicit_preferences(user_id)
             else:
-                implicit_prefs = self._learn_implicit_preferences(user_id)
+                implicit_prefs = self._learn_implicit_preferences(user_id, bookings)
                 explicit_prefs = self._learn_explicit_preferences(user_id)
                 preferences = self._merge_preferences(implicit_prefs, explicit_prefs)
             
@@ -133,7 +184,9 @@ class PreferenceLearner:
             interactions = self._get_interaction_history(user_id)
             
             profile = UserProfile(user_id=user_id, preferences=preferences, booking_patterns=patterns,
-                                interaction_history=interactions, created_at=datetime.now(), updated_at=datetime.now())
+                                interaction_history=interactions, created_at=datetime.now(), updated_at=datetime.now(),
+                                learning_state=self._build_state(user_id, strategy, bookings))
+            self._check_state_consistency(profile, cached_profile)
             
             self._cache_profile(profile)
             self._update_user_preferences_db(profile)
@@ -163,14 +216,19 @@ class PreferenceLearner:
         return UserProfile(user_id=user_id, preferences=mock_preferences, booking_patterns=mock_patterns,
                          interaction_history=[], created_at=datetime.now(), updated_at=datetime.now())
     
-    def _learn_implicit_preferences(self, user_id: str) -> Dict[PreferenceType, List[PreferenceScore]]:
+    def _recent_bookings(self, user_id: str) -> List[MRBSEntry]:
+        """The user's 500 most recent bookings, newest first"""
+        return self.db.query(MRBSEntry).filter(MRBSEntry.create_by == user_id).order_by(MRBSEntry.timestamp.desc()).limit(500).all()
+    
+    def _learn_implicit_preferences(self, user_id: str, bookings: Optional[List[MRBSEntry]] = None) -> Dict[PreferenceType, List[PreferenceScore]]:
         preferences = defaultdict(list)
         
         if not self.tables_exist:
             return dict(preferences)
         
         try:
-            bookings = self.db.query(MRBSEntry).filter(MRBSEntry.create_by == user_id).order_by(MRBSEntry.timestamp.desc()).limit(500).all()
+            if bookings is None:
+                bookings = self._recent_bookings(user_id)
             
             if len(bookings) < self.min_interactions:
                 logger.info(f"Insufficient booking history for user {user_id}")
@@ -307,14 +365,12 @@ class PreferenceLearner:
             return
         
         avg_capacity = np.mean(capacities)
-        capacity_ranges = {"small": (0, 10), "medium": (11, 25), "large": (26, 50), "extra_large": (51, float('inf'))}
         
         range_counts = defaultdict(int)
         for capacity in capacities:
-            for range_name, (min_cap, max_cap) in capacity_ranges.items():
-                if min_cap <= capacity <= max_cap:
-                    range_counts[range_name] += 1
-                    break
+            range_name = self._capacity_range(capacity)
+            if range_name:
+                range_counts[range_name] += 1
         
         total_bookings = len(capacities)
         
@@ -335,19 +391,7 @@ class PreferenceLearner:
         for booking in bookings:
             try:
                 if booking.room and hasattr(booking.room, 'description') and booking.room.description:
-                    description = booking.room.description.lower()
-                    features = []
-                    
-                    feature_keywords = {
-                        'projector': ['projector', 'projection'], 'whiteboard': ['whiteboard', 'board'],
-                        'tv': ['tv', 'television', 'screen'], 'ac': ['ac', 'air conditioning', 'aircon'],
-                        'wifi': ['wifi', 'wireless'], 'video_conference': ['video', 'conference', 'zoom', 'teams'],
-                        'phone': ['phone', 'telephone']
-                    }
-                    
-                    for feature, keywords in feature_keywords.items():
-                        if any(keyword in description for keyword in keywords):
-                            features.append(feature)
+                    features = self._room_features(booking.room.description)
                     
                     if features:
                         room_features[booking.room_id] = features
@@ -421,11 +465,19 @@ class PreferenceLearner:
             profile = self.learn_user_preferences(user_id)
             new_preferences = self._process_new_feedback(feedback)
             
-            for pref_type, new_scores in new_preferences.items():
-                if pref_type in profile.preferences:
-                    profile.preferences[pref_type].extend(new_scores)
-                else:
-                    profile.preferences[pref_type] = new_scores
+            if profile.learning_state is not None:
+                now = datetime.now().timestamp()
+                for pref_type, new_scores in new_preferences.items():
+                    for score in new_scores:
+                        key = (pref_type.value, score.attribute, score.value)
+                        self._add_weight(profile.learning_state, 'feedback', key, now)
+                profile.preferences = self._preferences_from_state(profile.learning_state)
+            else:
+                for pref_type, new_scores in new_preferences.items():
+                    if pref_type in profile.preferences:
+                        profile.preferences[pref_type].extend(new_scores)
+                    else:
+                        profile.preferences[pref_type] = new_scores
             
             profile.updated_at = datetime.now()
             self._cache_profile(profile)
@@ -452,6 +504,197 @@ class PreferenceLearner:
             logger.error(f"Error getting preference strength: {str(e)}")
             return 0.0
     
+    # ------------------------------------------------------------------
+    # Incremental learning
+    # ------------------------------------------------------------------
+    
+    def observe_booking(self, user_id: str, booking: MRBSEntry):
+        """Fold one new booking into the cached profile in O(1); no-op if none is cached."""
+        try:
+            profile = self._get_cached_profile(user_id)
+            if not profile or profile.learning_state is None:
+                return
+            if booking.id is not None and booking.id <= profile.learning_state.last_entry_id:
+                return
+            self._fold_booking(profile.learning_state, booking)
+            self._refresh_from_state(profile)
+        except Exception as e:
+            logger.warning(f"Error folding booking into preferences for user {user_id}: {e}")
+    
+    def _can_update_incrementally(self, profile: UserProfile, strategy: LearningStrategy) -> bool:
+        state = profile.learning_state
+        return (state is not None and state.strategy == strategy.value
+                and datetime.now() - state.rebuilt_at < self.full_rebuild_interval)
+    
+    def _catch_up_profile(self, profile: UserProfile) -> UserProfile:
+        """Fold in only the bookings created since the profile's state was last updated"""
+        state = profile.learning_state
+        new_bookings = self.db.query(MRBSEntry).filter(
+            MRBSEntry.create_by == profile.user_id, MRBSEntry.id > state.last_entry_id
+        ).order_by(MRBSEntry.id).all()
+        for booking in new_bookings:
+            self._fold_booking(state, booking)
+        self._refresh_from_state(profile)
+        logger.debug(f"Caught up preferences for user {profile.user_id} with {len(new_bookings)} bookings")
+        return profile
+    
+    def _refresh_from_state(self, profile: UserProfile):
+        state = profile.learning_state
+        profile.preferences = self._preferences_from_state(state)
+        profile.booking_patterns = dict(profile.booking_patterns or {})
+        profile.booking_patterns['total_bookings'] = state.bookings
+        profile.booking_patterns['peak_usage_times'] = {
+            'peak_hours': self._top_keys(state.hours, 3),
+            'peak_days': self._top_keys(state.days, 3)
+        }
+        profile.updated_at = datetime.now()
+        self._cache_profile(profile)
+    
+    def _build_state(self, user_id: str, strategy: LearningStrategy,
+                     bookings: Optional[List[MRBSEntry]] = None) -> PreferenceState:
+        """Fresh state from the same history the full rebuild reads"""
+        state = PreferenceState(reference_time=datetime.now().timestamp(), strategy=strategy.value)
+        if bookings is None:
+            bookings = self._recent_bookings(user_id)
+        for booking in reversed(bookings):
+            self._fold_booking(state, booking)
+        if len(bookings) >= 500:
+            # Anything older than the 500 most recent bookings is deliberately
+            # left out; make sure catch-up does not fold it in later either
+            newest = self.db.query(func.max(MRBSEntry.id)).filter(MRBSEntry.create_by == user_id).scalar()
+            state.last_entry_id = max(state.last_entry_id, newest or 0)
+        return state
+    
+    def _check_state_consistency(self, profile: UserProfile, previous: Optional[UserProfile]):
+        """Log how far the incrementally maintained state drifted from the rebuilt one"""
+        if not previous or previous.learning_state is None or profile.learning_state is None:
+            return
+        old_state, new_state = previous.learning_state, profile.learning_state
+        old_hours, new_hours = self._top_keys(old_state.hours, 3), self._top_keys(new_state.hours, 3)
+        if old_state.bookings != new_state.bookings or old_hours != new_hours:
+            logger.info(f"Preference rebuild for user {profile.user_id}: incremental state had "
+                        f"{old_state.bookings} bookings (peak hours {old_hours}), rebuilt has "
+                        f"{new_state.bookings} (peak hours {new_hours})")
+    
+    def _event_weight(self, state: PreferenceState, event_time: float) -> float:
+        tau = self.preference_half_life_days * 86400 / math.log(2)
+        exponent = (event_time - state.reference_time) / tau
+        if exponent > 50:
+            # Rebase so weights stay in float range; this touches every counter but is rare
+            self._rescale_state(state, math.exp(-exponent))
+            state.reference_time = event_time
+            exponent = 0.0
+        return math.exp(exponent)
+    
+    def _rescale_state(self, state: PreferenceState, factor: float):
+        for name in ('hours', 'days', 'rooms', 'room_types', 'durations', 'capacity_ranges', 'features', 'feedback'):
+            counters = getattr(state, name)
+            for key in counters:
+                counters[key] *= factor
+        for name in ('total', 'duration_weight', 'duration_sum', 'capacity_weight', 'capacity_sum', 'recurring'):
+            setattr(state, name, getattr(state, name) * factor)
+    
+    def _add_weight(self, state: PreferenceState, counter: str, key: Any, event_time: float):
+        weight = self._event_weight(state, event_time)
+        counters = getattr(state, counter)
+        counters[key] = counters.get(key, 0.0) + weight
+    
+    def _fold_booking(self, state: PreferenceState, booking: MRBSEntry):
+        created = booking.timestamp if isinstance(booking.timestamp, datetime) else datetime.now()
+        weight = self._event_weight(state, created.timestamp())
+        
+        def bump(counters: Dict, key: Any):
+            counters[key] = counters.get(key, 0.0) + weight
+        
+        state.bookings += 1
+        state.total += weight
+        if booking.id is not None:
+            state.last_entry_id = max(state.last_entry_id, booking.id)
+        
+        start_time = datetime.fromtimestamp(booking.start_time)
+        bump(state.hours, start_time.hour)
+        bump(state.days, start_time.weekday())
+        
+        duration = (booking.end_time - booking.start_time) / 3600
+        if duration > 0:
+            bump(state.durations, round(duration * 2) / 2)
+            state.duration_weight += weight
+            state.duration_sum += weight * duration
+        
+        room = getattr(booking, 'room', None)
+        if room:
+            bump(state.rooms, room.id)
+            capacity = getattr(room, 'capacity', 10)
+            bump(state.room_types, "small" if capacity <= 5 else "medium" if capacity <= 15 else "large")
+            if capacity:
+                range_name = self._capacity_range(capacity)
+                if range_name:
+                    bump(state.capacity_ranges, range_name)
+                state.capacity_weight += weight
+                state.capacity_sum += weight * capacity
+            for feature in self._room_features(getattr(room, 'description', None)):
+                bump(state.features, feature)
+        
+        if getattr(booking, 'repeat_id', None) is not None:
+            state.recurring += weight
+    
+    def _preferences_from_state(self, state: PreferenceState) -> Dict[PreferenceType, List[PreferenceScore]]:
+        """Same scores and thresholds as the full learners, read from the decayed counters"""
+        preferences = defaultdict(list)
+        now = datetime.now()
+        
+        def add(pref_type, attribute, counters, denominator, threshold, confidence_factor):
+            for value, weight in sorted(counters.items(), key=lambda item: item[1], reverse=True):
+                score = weight / denominator
+                if score > threshold:
+                    preferences[pref_type].append(
+                        PreferenceScore(attribute, value, score, min(score * confidence_factor, 1.0), now, "booking"))
+        
+        if state.bookings >= self.min_interactions and state.total > 0:
+            add(PreferenceType.TIME_SLOT, "preferred_hour", state.hours, state.total, 0.1, 2)
+            add(PreferenceType.TIME_SLOT, "preferred_day_of_week", state.days, state.total, 0.1, 2)
+            add(PreferenceType.ROOM_TYPE, "room_size_category", state.room_types, state.total, 0.15, 1.5)
+            add(PreferenceType.ROOM_TYPE, "preferred_room_id", state.rooms, state.total, 0.2, 3)
+            if state.duration_weight > 0:
+                add(PreferenceType.DURATION, "preferred_duration", state.durations, state.duration_weight, 0.1, 2)
+                preferences[PreferenceType.DURATION].append(PreferenceScore(
+                    "average_duration", state.duration_sum / state.duration_weight, 1.0, 0.8, now, "booking"))
+            if state.capacity_weight > 0:
+                add(PreferenceType.CAPACITY, "capacity_range", state.capacity_ranges, state.capacity_weight, 0.15, 1.5)
+                preferences[PreferenceType.CAPACITY].append(PreferenceScore(
+                    "average_capacity", state.capacity_sum / state.capacity_weight, 1.0, 0.7, now, "booking"))
+            add(PreferenceType.FEATURES, "room_feature", state.features, state.total, 0.1, 1.5)
+            add(PreferenceType.RECURRENCE, "booking_type",
+                {"recurring": state.recurring, "one_time": state.total - state.recurring}, state.total, 0.1, 2)
+        
+        implicit = dict(preferences)
+        if state.strategy == LearningStrategy.IMPLICIT.value:
+            merged = implicit
+        elif state.strategy == LearningStrategy.EXPLICIT.value:
+            merged = {}
+        else:
+            merged = self._merge_preferences(implicit, {})
+        
+        # Feedback keeps the fixed scores it was given, once per distinct value
+        for (pref_type, attribute, value) in state.feedback:
+            score, confidence = (0.9, 0.8) if attribute == "room_feature" else (0.8, 0.7)
+            merged.setdefault(PreferenceType(pref_type), []).append(
+                PreferenceScore(attribute, value, score, confidence, now, "feedback"))
+        return merged
+    
+    def _top_keys(self, counters: Dict[Any, float], n: int) -> List[Any]:
+        return [key for key, _ in sorted(counters.items(), key=lambda item: item[1], reverse=True)[:n]]
+    
+    def _room_features(self, description: Optional[str]) -> List[str]:
+        features = parse_room_features(description)
+        return [feature for feature in ROOM_FEATURE_KEYWORDS if feature in features]
+    
+    def _capacity_range(self, capacity: int) -> Optional[str]:
+        for range_name, (min_cap, max_cap) in CAPACITY_RANGES.items():
+            if min_cap <= capacity <= max_cap:
+                return range_name
+        return None
+    
     def _extract_booking_patterns(self, user_id: str) -> Dict[str, Any]:
         if not self.tables_exist:
             return {
@@ -572,14 +815,17 @@ class PreferenceLearner:
     
     def _get_cached_profile(self, user_id: str) -> Optional[UserProfile]:
         try:
-            return self.cache_manager.get(f"user_profile:{user_id}")
+            profile = self.cache_manager.get(CacheKeyType.USER_PREFERENCES, None, user_id)
+            return profile if isinstance(profile, UserProfile) else None
         except Exception as e:
             logger.warning(f"Error getting cached profile: {e}")
             return None
     
     def _cache_profile(self, profile: UserProfile):
         try:
-            self.cache_manager.set(f"user_profile:{profile.user_id}", profile, ttl=3600)
+            # Profiles carry their learning state, so keep them until the next full rebuild is due
+            self.cache_manager.set(CacheKeyType.USER_PREFERENCES, profile,
+                                   int(self.full_rebuild_interval.total_seconds()), profile.user_id)
         except Exception as e:
             logger.warning(f"Error caching profile: {e}")
     
@@ -1,5 +1,5 @@
 # recommendations/core/recommendation_engine.py
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import text, and_, or_, func
@@ -34,6 +34,9 @@ from ..utils.metrics import RecommendationMetrics
 from .preference_learner import PreferenceLearner
 from ...config.recommendation_config import RecommendationConfig, DatabaseManager
 from src.models import MRBSRoom, MRBSEntry, MRBSRepeat
+from src.booking_index import booking_index, free_rooms_in_window
+from src.room_catalog import room_catalog
+from src.stage_timing import span
 
 logger = logging.getLogger(__name__)
 
@@ -102,10 +105,11 @@ class RecommendationEngine:
         # Initialize PreferenceLearner with required db parameter
         try:
             if self.db:
+                # The learner keeps profiles in its own keyed cache
+                # (data.cache_manager); self.cache is the async string-keyed one
                 self.preference_learner = PreferenceLearner(
                     db=self.db,
                     embedding_model=None,  
-                    cache_manager=self.cache
                 )
             else:
                 logger.warning("No database session available for PreferenceLearner")
@@ -179,8 +183,9 @@ class RecommendationEngine:
                 self.embeddings = None
                 return
                 
+            from ..models.model_registry import get_embeddings
             embedding_model = getattr(self.config, 'EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
-            self.embeddings = HuggingFaceEmbeddings(model_name=embedding_model)
+            self.embeddings = get_embeddings(embedding_model)
             logger.info(f"Initialized embeddings with model: {embedding_model}")
             
             if self.preference_learner and hasattr(self.preference_learner, 'embedding_model'):
@@ -206,32 +211,37 @@ class RecommendationEngine:
             recommendations = []
             
             try:
-                alt_time_recs = self._get_alternative_time_recommendations_from_db(request_data)
+                with span("strategy.alternative_time"):
+                    alt_time_recs = self._get_alternative_time_recommendations_from_db(request_data)
                 recommendations.extend(alt_time_recs)
             except Exception as e:
                 logger.warning(f"Alternative time recommendations failed: {e}")
             
             try:
-                alt_room_recs = self._get_alternative_room_recommendations_from_db(request_data)
+                with span("strategy.alternative_room"):
+                    alt_room_recs = self._get_alternative_room_recommendations_from_db(request_data)
                 recommendations.extend(alt_room_recs)
             except Exception as e:
                 logger.warning(f"Alternative room recommendations failed: {e}")
             
             try:
-                proactive_recs = self._get_proactive_recommendations_from_db(request_data)
+                with span("strategy.proactive"):
+                    proactive_recs = self._get_proactive_recommendations_from_db(request_data)
                 recommendations.extend(proactive_recs)
             except Exception as e:
                 logger.warning(f"Proactive recommendations failed: {e}")
             
             try:
-                smart_recs = self._get_smart_scheduling_recommendations_from_db(request_data)
+                with span("strategy.smart_scheduling"):
+                    smart_recs = self._get_smart_scheduling_recommendations_from_db(request_data)
                 recommendations.extend(smart_recs)
             except Exception as e:
                 logger.warning(f"Smart scheduling recommendations failed: {e}")
             
             if not recommendations:
                 logger.info("No recommendations generated, creating fallback recommendations")
-                recommendations = self._create_fallback_recommendations(request_data)
+                with span("strategy.fallback"):
+                    recommendations = self._create_fallback_recommendations(request_data)
             
             logger.info(f"Generated {len(recommendations)} recommendations for user {user_id}")
             return recommendations
@@ -264,20 +274,24 @@ class RecommendationEngine:
             
             duration = end_time - start_time
             
-            room = self.db.query(MRBSRoom).filter(
-                MRBSRoom.room_name == room_name,
-                MRBSRoom.disabled == False
-            ).first()
+            room = room_catalog.by_name(room_name, self.db)
             
             if not room:
                 logger.warning(f"Room {room_name} not found or disabled")
                 return []
             
             recommendations = []
+            max_days = 5
+            
+            # Load the room's bookings for the requested day plus the next-day
+            # search window once; every candidate is scored against this set.
+            window_start = datetime.combine(start_time.date(), datetime.min.time())
+            window_end = window_start + timedelta(days=max_days + 1) + duration
+            busy = self._load_busy_intervals(room.id, window_start, window_end)
             
             logger.info(f" Checking same-day alternatives for {start_time.strftime('%Y-%m-%d')}")
             same_day_alternatives = self._get_same_day_alternatives(
-                room, start_time, end_time, duration, room_name
+                room, start_time, end_time, duration, room_name, busy=busy
             )
             recommendations.extend(same_day_alternatives)
         
@@ -285,7 +299,7 @@ class RecommendationEngine:
                 logger.info("Checking next available days")
                 next_day_alternatives = self._get_next_day_alternatives(
                     room, start_time, end_time, duration, room_name, 
-                    max_days=5  
+                    max_days=max_days, busy=busy
                 )
                 recommendations.extend(next_day_alternatives)
             
@@ -304,10 +318,15 @@ class RecommendationEngine:
             return []
         
     def _get_same_day_alternatives(self, room, requested_start: datetime, requested_end: datetime, 
-                                  duration: timedelta, room_name: str) -> List[Dict[str, Any]]:
+                                  duration: timedelta, room_name: str,
+                                  busy: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> List[Dict[str, Any]]:
         same_day_alternatives = []
         requested_date = requested_start.date()
         
+        if busy is None:
+            day_start = datetime.combine(requested_date, datetime.min.time())
+            busy = self._load_busy_intervals(room.id, day_start, day_start + timedelta(days=1) + duration)
+        
         time_slots_to_check = [
             (requested_start - timedelta(minutes=30), "30 minutes earlier"),
             (requested_start + timedelta(minutes=30), "30 minutes later"),
@@ -329,6 +348,7 @@ class RecommendationEngine:
             (datetime.combine(requested_date, datetime.min.time().replace(hour=15, minute=30)), "3:30 PM"),
         ]
         
+        candidates = []
         for alt_start, description in time_slots_to_check:
             if alt_start.date() != requested_date:
                 continue
@@ -344,7 +364,12 @@ class RecommendationEngine:
             if alt_end.date() != requested_date or alt_end.hour > 20:
                 continue
             
-            if self._is_time_slot_available(room.id, alt_start, alt_end):
+            candidates.append((alt_start, alt_end, description))
+        
+        available = self._free_candidates_mask(busy, [(c[0], c[1]) for c in candidates])
+        
+        for (alt_start, alt_end, description), is_free in zip(candidates, available):
+            if is_free:
                 score = self._calculate_same_day_score(alt_start, requested_start, description)
                 
                 same_day_alternatives.append({
@@ -372,18 +397,46 @@ class RecommendationEngine:
 
 
     def _get_next_day_alternatives(self, room, requested_start: datetime, requested_end: datetime,
-                                  duration: timedelta, room_name: str, max_days: int = 5) -> List[Dict[str, Any]]:
+                                  duration: timedelta, room_name: str, max_days: int = 5,
+                                  busy: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> List[Dict[str, Any]]:
         next_day_alternatives = []
         
         base_date = requested_start.date()
         
+        # Common meeting times tried on each next day
+        common_times = [
+            (9, 0, "9:00 AM"),
+            (10, 0, "10:00 AM"),
+            (11, 0, "11:00 AM"),
+            (14, 0, "2:00 PM"),
+            (15, 0, "3:00 PM"),
+        ]
+        
+        if busy is None:
+            window_start = datetime.combine(base_date + timedelta(days=1), datetime.min.time())
+            busy = self._load_busy_intervals(room.id, window_start, window_start + timedelta(days=max_days) + duration)
+        
+        # Score every candidate of every day in one pass; the per-day selection
+        # below then only reads from this table.
+        candidate_slots = []
         for day_offset in range(1, max_days + 1):
             next_date = base_date + timedelta(days=day_offset)
+            same_time_next_day = datetime.combine(next_date, requested_start.time())
+            candidate_slots.append((same_time_next_day, same_time_next_day + duration))
+            for hour, minute, _ in common_times:
+                alt_start = datetime.combine(next_date, datetime.min.time().replace(hour=hour, minute=minute))
+                candidate_slots.append((alt_start, alt_start + duration))
+        available = self._free_candidates_mask(busy, candidate_slots)
+        per_day = len(common_times) + 1
+        
+        for day_offset in range(1, max_days + 1):
+            next_date = base_date + timedelta(days=day_offset)
+            day_available = available[(day_offset - 1) * per_day:day_offset * per_day]
           
             same_time_next_day = datetime.combine(next_date, requested_start.time())
             same_time_end = same_time_next_day + duration
             
-            if self._is_time_slot_available(room.id, same_time_next_day, same_time_end):
+            if day_available[0]:
                 day_name = next_date.strftime('%A, %B %d')
                 score = 0.7 - (day_offset * 0.1)  # Decrease score for further days
                 
@@ -409,23 +462,14 @@ class RecommendationEngine:
                     'is_same_day': False
                 })
             
-            # Also try common meeting times on next days
-            common_times = [
-                (9, 0, "9:00 AM"),
-                (10, 0, "10:00 AM"),
-                (11, 0, "11:00 AM"),
-                (14, 0, "2:00 PM"),
-                (15, 0, "3:00 PM"),
-            ]
-            
-            for hour, minute, time_desc in common_times:
+            for (hour, minute, time_desc), is_free in zip(common_times, day_available[1:]):
                 alt_start = datetime.combine(next_date, datetime.min.time().replace(hour=hour, minute=minute))
                 alt_end = alt_start + duration
                 
                 if alt_start == same_time_next_day:
                     continue
                 
-                if self._is_time_slot_available(room.id, alt_start, alt_end):
+                if is_free:
                     day_name = next_date.strftime('%A, %B %d')
                     score = 0.6 - (day_offset * 0.1)  # Slightly lower score than same time
                     
@@ -460,20 +504,38 @@ class RecommendationEngine:
         
         return next_day_alternatives
 
+    def _load_busy_intervals(self, room_id: int, window_start: datetime,
+                             window_end: datetime) -> Tuple[np.ndarray, np.ndarray]:
+        """Start/end timestamp arrays of the room's active bookings overlapping the window"""
+        intervals = booking_index.conflicts(
+            room_id, int(window_start.timestamp()), int(window_end.timestamp()), self.db, active_only=True
+        )
+        starts = np.fromiter((interval[0] for interval in intervals), dtype=np.int64, count=len(intervals))
+        ends = np.fromiter((interval[1] for interval in intervals), dtype=np.int64, count=len(intervals))
+        return starts, ends
+
+    @staticmethod
+    def _free_candidates_mask(busy: Tuple[np.ndarray, np.ndarray],
+                              candidates: List[Tuple[datetime, datetime]]) -> np.ndarray:
+        """Boolean array, True where a candidate (start, end) overlaps none of the busy intervals"""
+        if not candidates:
+            return np.zeros(0, dtype=bool)
+        busy_starts, busy_ends = busy
+        candidate_starts = np.array([int(start.timestamp()) for start, _ in candidates], dtype=np.int64)
+        candidate_ends = np.array([int(end.timestamp()) for _, end in candidates], dtype=np.int64)
+        if busy_starts.size == 0:
+            return np.ones(len(candidates), dtype=bool)
+        overlaps = (busy_starts[None, :] < candidate_ends[:, None]) & (busy_ends[None, :] > candidate_starts[:, None])
+        return ~overlaps.any(axis=1)
+
     def _is_time_slot_available(self, room_id: int, start_time: datetime, end_time: datetime) -> bool:
         """Check if a specific time slot is available for the room"""
         try:
             start_timestamp = int(start_time.timestamp())
             end_timestamp = int(end_time.timestamp())
             
-            conflicts = self.db.query(MRBSEntry).filter(
-                MRBSEntry.room_id == room_id,
-                MRBSEntry.start_time < end_timestamp,
-                MRBSEntry.end_time > start_timestamp,
-                MRBSEntry.status == 0  # Assuming 0 is active status
-            ).count()
-            
-            return conflicts == 0
+            # Assuming status 0 is active status
+            return booking_index.is_free(room_id, start_timestamp, end_timestamp, self.db, active_only=True)
             
         except Exception as e:
             logger.error(f"Error checking time slot availability: {e}")
@@ -580,40 +642,30 @@ class RecommendationEngine:
             end_timestamp = int(end_time.timestamp())
             
             # Get the original room for comparison
-            original_room = self.db.query(MRBSRoom).filter(
-                MRBSRoom.room_name == room_name,
-                MRBSRoom.disabled == False
-            ).first()
-            
-            # Find alternative rooms with similar or better capacity
-            alternative_rooms_query = self.db.query(MRBSRoom).filter(
-                MRBSRoom.disabled == False,
-                MRBSRoom.room_name != room_name,
-                MRBSRoom.capacity >= capacity_required
-            )
+            original_room = room_catalog.by_name(room_name, self.db)
             
-            # If we have the original room, prioritize rooms with similar capacity
+            # Find alternative rooms with similar or better capacity; if we have
+            # the original room, prioritize rooms with similar capacity
             if original_room:
-                alternative_rooms_query = alternative_rooms_query.order_by(
-                    func.abs(MRBSRoom.capacity - original_room.capacity)
+                alternative_rooms = room_catalog.nearest_capacity(
+                    original_room.capacity, 10, self.db, min_seats=capacity_required, exclude=[original_room.id]
                 )
             else:
-                alternative_rooms_query = alternative_rooms_query.order_by(MRBSRoom.capacity)
-            
-            alternative_rooms = alternative_rooms_query.limit(10).all()
+                alternative_rooms = [
+                    room for room in room_catalog.at_least(capacity_required, self.db) if room.room_name != room_name
+                ][:10]
+            
+            # Free/busy status of every candidate in one grouped query (status 0 is active)
+            room_is_free = free_rooms_in_window(
+                self.db, start_timestamp, end_timestamp, active_only=True,
+                room_ids=[room.id for room in alternative_rooms]
+            )
             
             recommendations = []
             
             for room in alternative_rooms:
                 # Check if this room is available at the requested time
-                conflicts = self.db.query(MRBSEntry).filter(
-                    MRBSEntry.room_id == room.id,
-                    MRBSEntry.start_time < end_timestamp,
-                    MRBSEntry.end_time > start_timestamp,
-                    MRBSEntry.status == 0  # Assuming 0 is active status
-                ).count()
-                
-                if conflicts == 0:
+                if room_is_free.get(room.id, False):
                     # Calculate score based on room similarity
                     score = 0.75
                     if original_room:
@@ -705,19 +757,13 @@ class RecommendationEngine:
             ).limit(5).all()
             
             recommendations = []
+            room_is_free = free_rooms_in_window(self.db, start_timestamp, end_timestamp, active_only=True)
             
             for booking in user_bookings:
                 room_id, room_name, capacity, description, booking_count = booking
                 
                 # Check if this room is available at the requested time
-                conflicts = self.db.query(MRBSEntry).filter(
-                    MRBSEntry.room_id == room_id,
-                    MRBSEntry.start_time < end_timestamp,
-                    MRBSEntry.end_time > start_timestamp,
-                    MRBSEntry.status == 0
-                ).count()
-                
-                if conflicts == 0:
+                if room_is_free.get(room_id, False):
                     # Calculate score based on booking frequency
                     base_score = 0.7
                     frequency_bonus = min(booking_count * 0.05, 0.2)  # Max 0.2 bonus
@@ -768,14 +814,7 @@ class RecommendationEngine:
                         continue
                     
                     # Check availability
-                    conflicts = self.db.query(MRBSEntry).filter(
-                        MRBSEntry.room_id == room_id,
-                        MRBSEntry.start_time < end_timestamp,
-                        MRBSEntry.end_time > start_timestamp,
-                        MRBSEntry.status == 0
-                    ).count()
-                    
-                    if conflicts == 0:
+                    if room_is_free.get(room_id, False):
                         score = 0.6 + min(usage_count * 0.02, 0.15)
                         
                         recommendations.append({
@@ -859,21 +898,18 @@ class RecommendationEngine:
                 func.count(MRBSEntry.id).asc()  # Rooms with lowest utilization first
             ).limit(10).all()
             
+            # Check if rooms are available at requested time
+            start_timestamp = int(start_time.timestamp())
+            end_timestamp = int(end_time.timestamp())
+            room_is_free = free_rooms_in_window(
+                self.db, start_timestamp, end_timestamp, active_only=True,
+                room_ids=[room_data[0] for room_data in room_utilization]
+            )
+            
             for room_data in room_utilization:
                 room_id, room_name, capacity, description, bookings_count = room_data
                 
-                # Check if room is available at requested time
-                start_timestamp = int(start_time.timestamp())
-                end_timestamp = int(end_time.timestamp())
-                
-                conflicts = self.db.query(MRBSEntry).filter(
-                    MRBSEntry.room_id == room_id,
-                    MRBSEntry.start_time < end_timestamp,
-                    MRBSEntry.end_time > start_timestamp,
-                    MRBSEntry.status == 0
-                ).count()
-                
-                if conflicts == 0:
+                if room_is_free.get(room_id, False):
                     # Calculate score based on low utilization (more available = higher score)
                     utilization_rate = bookings_count / 30  # bookings per day over 30 days
                     availability_score = max(0.5, 1.0 - (utilization_rate * 0.1))
@@ -1009,14 +1045,11 @@ class RecommendationEngine:
             return []
             
         try:
-            query = self.db.query(MRBSRoom).filter(MRBSRoom.disabled == False)
-            
             if room_name:
-                query = query.filter(MRBSRoom.room_name == room_name)
+                room = room_catalog.by_name(room_name, self.db)
+                rooms = [room] if room else []
             else:
-                query = query.order_by(MRBSRoom.room_name)
-            
-            rooms = query.all()
+                rooms = sorted(room_catalog.rooms(self.db), key=lambda room: room.room_name)
             
             room_data = []
             for room in rooms:
@@ -1048,10 +1081,7 @@ class RecommendationEngine:
             
         try:
             # Find the room
-            room = self.db.query(MRBSRoom).filter(
-                MRBSRoom.room_name == room_name,
-                MRBSRoom.disabled == False
-            ).first()
+            room = room_catalog.by_name(room_name, self.db)
             
             if not room:
                 logger.warning(f"Room {room_name} not found")
@@ -1061,15 +1091,8 @@ class RecommendationEngine:
             start_timestamp = int(start_time.timestamp())
             end_timestamp = int(end_time.timestamp())
             
-            # Check for conflicts
-            conflicts = self.db.query(MRBSEntry).filter(
-                MRBSEntry.room_id == room.id,
-                MRBSEntry.start_time < end_timestamp,
-                MRBSEntry.end_time > start_timestamp,
-                MRBSEntry.status == 0  # Assuming 0 is active status
-            ).count()
-            
-            is_available = conflicts == 0
+            # Check for conflicts (assuming status 0 is active status)
+            is_available = booking_index.is_free(room.id, start_timestamp, end_timestamp, self.db, active_only=True)
             logger.debug(f"Room {room_name} availability check: {'Available' if is_available else 'Occupied'}")
             
             return is_available
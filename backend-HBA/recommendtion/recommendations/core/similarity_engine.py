@@ -1,18 +1,22 @@
 import logging
 import math
+import time
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any, Set
 from collections import defaultdict, Counter
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
 
 from ..utils.time_utils import TimeUtils
-from ..data.cache_manager import CacheManager
-from src.models import MRBSEntry, MRBSRoom,  MRBSRepeat
+from ..data.cache_manager import CacheKeyType, CacheManager
+from src.models import MRBSEntry, MRBSRoom, MRBSArea
+from src.demand_histogram import demand_histogram
+from src.room_catalog import ROOM_FEATURE_KEYWORDS, parse_room_features
+from .user_similarity_index import user_similarity_index
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +63,16 @@ class RoomProfile:
     usage_vector: List[float]
 
 
+@dataclass
+class RoomUsageStats:
+    """Booking aggregates for one room over the profile window"""
+    booking_count: int = 0
+    total_seconds: int = 0
+    hour_counts: List[int] = field(default_factory=lambda: [0] * 24)
+    users: Set[str] = field(default_factory=set)
+    purposes: Counter = field(default_factory=Counter)
+
+
 @dataclass
 class TimeSlotProfile:
     """Profile of a time slot with usage patterns"""
@@ -74,6 +88,125 @@ class TimeSlotProfile:
     seasonal_usage: Dict[str, float]
 
 
+class RoomSimilarityMatrix:
+    """
+    Dense N×N room similarity, computed with NumPy from stacked room profiles.
+
+    Each factor of calculate_room_similarity has a vectorized counterpart:
+    capacity ratio, area equality, feature/usage cosine and user Jaccard.
+    Profiles are fingerprinted so refresh() only recomputes the rows (and
+    mirrored columns) of rooms whose profile changed.
+    """
+
+    def __init__(self, weights: Dict[str, float]):
+        self.weights = weights
+        self.room_ids: List[int] = []
+        self.index: Dict[int, int] = {}
+        self.scores = np.zeros((0, 0), dtype=np.float64)
+        self._profiles: Dict[int, RoomProfile] = {}
+        self._fingerprints: Dict[int, int] = {}
+        self._user_index: Dict[str, int] = {}
+
+    @staticmethod
+    def _fingerprint(profile: RoomProfile) -> int:
+        return hash((
+            profile.capacity, profile.area_id,
+            tuple(profile.feature_vector), tuple(profile.usage_vector),
+            frozenset(profile.common_users)
+        ))
+
+    @staticmethod
+    def _stack_normalized(vectors: List[List[float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Row-normalized matrix plus a mask of rows that had a vector at all."""
+        width = max((len(v) for v in vectors), default=0)
+        matrix = np.zeros((len(vectors), width), dtype=np.float64)
+        present = np.zeros(len(vectors), dtype=bool)
+        for row, vector in enumerate(vectors):
+            if vector and len(vector) == width:
+                matrix[row] = vector
+                present[row] = True
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix, present
+
+    def _build_arrays(self, profiles: List[RoomProfile]):
+        self._capacity = np.array([p.capacity or 0 for p in profiles], dtype=np.float64)
+        self._area = np.array([p.area_id if p.area_id is not None else -1 for p in profiles])
+        self._features, self._has_features = self._stack_normalized([p.feature_vector for p in profiles])
+        self._usage, self._has_usage = self._stack_normalized([p.usage_vector for p in profiles])
+
+        for profile in profiles:
+            for user in profile.common_users:
+                self._user_index.setdefault(user, len(self._user_index))
+        self._users = np.zeros((len(profiles), len(self._user_index)), dtype=np.float32)
+        for row, profile in enumerate(profiles):
+            if profile.common_users:
+                self._users[row, [self._user_index[u] for u in profile.common_users]] = 1.0
+        self._user_counts = self._users.sum(axis=1)
+
+    def _score_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Weighted similarity of `rows` against every room, shape (len(rows), N)."""
+        cap_a = self._capacity[rows][:, None]
+        cap_b = self._capacity[None, :]
+        high = np.maximum(cap_a, cap_b)
+        ratio = np.divide(np.minimum(cap_a, cap_b), high, out=np.zeros_like(high), where=high > 0)
+        capacity = 2 / (1 + np.exp(-4 * ratio)) - 1
+        capacity[(cap_a == 0) | (cap_b == 0)] = 0.5
+
+        area = (self._area[rows][:, None] == self._area[None, :]).astype(np.float64)
+
+        features = self._features[rows] @ self._features.T
+        features[~(self._has_features[rows][:, None] & self._has_features[None, :])] = 0.5
+
+        usage = self._usage[rows] @ self._usage.T
+        usage[~(self._has_usage[rows][:, None] & self._has_usage[None, :])] = 0.5
+
+        intersection = (self._users[rows] @ self._users.T).astype(np.float64)
+        union = self._user_counts[rows][:, None] + self._user_counts[None, :] - intersection
+        user_overlap = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+        total = (capacity * self.weights['capacity'] + area * self.weights['area']
+                 + features * self.weights['features'] + usage * self.weights['usage_patterns']
+                 + user_overlap * self.weights['user_overlap'])
+        return np.clip(total, 0.0, 1.0)
+
+    def refresh(self, profiles: List[RoomProfile]) -> int:
+        """
+        Add or update rooms from `profiles`; returns how many rooms were recomputed.
+
+        Only new rooms and rooms whose fingerprint changed get their row and
+        column recomputed; every other score is kept.
+        """
+        changed_ids = [
+            p.room_id for p in profiles
+            if self._fingerprints.get(p.room_id) != self._fingerprint(p)
+        ]
+        if not changed_ids:
+            return 0
+        for profile in profiles:
+            self._profiles[profile.room_id] = profile
+            self._fingerprints[profile.room_id] = self._fingerprint(profile)
+
+        old_size = len(self.room_ids)
+        self.room_ids.extend(room_id for room_id in changed_ids if room_id not in self.index)
+        self.index = {room_id: row for row, room_id in enumerate(self.room_ids)}
+        scores = np.zeros((len(self.room_ids), len(self.room_ids)), dtype=np.float64)
+        scores[:old_size, :old_size] = self.scores
+        self._build_arrays([self._profiles[room_id] for room_id in self.room_ids])
+
+        rows = np.array([self.index[room_id] for room_id in changed_ids], dtype=np.intp)
+        block = self._score_rows(rows)
+        scores[rows, :] = block
+        scores[:, rows] = block.T
+        np.fill_diagonal(scores, 1.0)
+        self.scores = scores
+        return len(changed_ids)
+
+    def submatrix(self, room_ids: List[int]) -> np.ndarray:
+        rows = np.array([self.index[room_id] for room_id in room_ids], dtype=np.intp)
+        return self.scores[np.ix_(rows, rows)]
+
+
 class SimilarityEngine:
     """Main engine for calculating similarities between rooms, time slots, and patterns"""
     
@@ -93,13 +226,19 @@ class SimilarityEngine:
         }
         
         self.cache_ttl = 3600
+        self.room_matrix = RoomSimilarityMatrix(self.room_similarity_weights)
+        
+        self.profile_window_days = 180
+        self.profile_refresh_interval = 60
+        self.profile_rebuild_interval = 86400
+        self._reset_room_profiles()
     
     def calculate_room_similarity(self, room1_id: int, room2_id: int, 
                                  context: Optional[Dict] = None) -> SimilarityScore:
         """Calculate similarity between two rooms"""
         try:
-            cache_key = f"room_similarity:{min(room1_id, room2_id)}:{max(room1_id, room2_id)}"
-            cached_score = self.cache_manager.get(cache_key)
+            pair = (min(room1_id, room2_id), max(room1_id, room2_id))
+            cached_score = self.cache_manager.get(CacheKeyType.ROOM_SIMILARITIES, None, *pair)
             if cached_score:
                 return cached_score
             
@@ -130,7 +269,7 @@ class SimilarityEngine:
                 calculated_at=datetime.now()
             )
             
-            self.cache_manager.set(cache_key, similarity_score, ttl=self.cache_ttl)
+            self.cache_manager.set(CacheKeyType.ROOM_SIMILARITIES, similarity_score, self.cache_ttl, *pair)
             return similarity_score
             
         except Exception as e:
@@ -228,23 +367,21 @@ class SimilarityEngine:
             return []
     
     def calculate_user_booking_similarity(self, user1_id: str, user2_id: str) -> SimilarityScore:
-        """Calculate similarity between two users' booking patterns"""
+        """Calculate similarity between two users' booking patterns from the shared user index"""
         try:
-            user1_bookings = self._get_user_booking_history(user1_id)
-            user2_bookings = self._get_user_booking_history(user2_id)
-            
-            if not user1_bookings or not user2_bookings:
+            blocks = user_similarity_index.block_similarities(user1_id, user2_id, db=self.db)
+            if not blocks:
                 return self._create_empty_similarity_score(user1_id, user2_id, SimilarityType.USER_BEHAVIOR)
             
             factors = {
-                'room_preferences': self._calculate_room_preference_similarity(user1_bookings, user2_bookings),
-                'time_preferences': self._calculate_time_preference_similarity(user1_bookings, user2_bookings),
-                'duration_patterns': self._calculate_duration_preference_similarity(user1_bookings, user2_bookings),
-                'booking_frequency': self._calculate_booking_frequency_similarity(user1_bookings, user2_bookings)
+                'room_preferences': blocks['rooms'],
+                'time_preferences': blocks['hours'],
+                'duration_patterns': blocks['durations']
             }
             
-            total_score = sum(factors.values()) / len(factors)
-            confidence = min(len(user1_bookings) / 20.0, len(user2_bookings) / 20.0, 1.0)
+            total_score = user_similarity_index.similarity(user1_id, user2_id)
+            confidence = min(user_similarity_index.booking_count(user1_id) / 20.0,
+                             user_similarity_index.booking_count(user2_id) / 20.0, 1.0)
             
             return SimilarityScore(
                 entity1_id=user1_id,
@@ -275,73 +412,132 @@ class SimilarityEngine:
     def _get_room_profile(self, room_id: int) -> Optional[RoomProfile]:
         """Get comprehensive room profile with usage statistics"""
         try:
-            cache_key = f"room_profile:{room_id}"
-            cached_profile = self.cache_manager.get(cache_key)
-            if cached_profile:
-                return cached_profile
-            
-            room = self.db.query(MRBSRoom).filter(MRBSRoom.id == room_id).first()
-            if not room:
-                return None
-            
-            area = self.db.query(MRBSRepeat).filter(MRBSRepeat.id == room.area_id).first()
-            area_name = area.area_name if area else "Unknown"
-            
-            six_months_ago = datetime.now() - timedelta(days=180)
-            six_months_timestamp = int(six_months_ago.timestamp())
-            
-            bookings = self.db.query(MRBSEntry).filter(
-                and_(MRBSEntry.room_id == room_id, MRBSEntry.start_time >= six_months_timestamp)
-            ).all()
-            
-            usage_frequency = len(bookings)
-            total_hours = sum((b.end_time - b.start_time) / 3600 for b in bookings)
-            avg_duration = total_hours / len(bookings) if bookings else 0.0
-            
-            hour_counts = Counter()
-            common_users = set()
-            booking_purposes = []
-            
-            for booking in bookings:
-                start_dt = datetime.fromtimestamp(booking.start_time)
-                hour_counts[start_dt.hour] += 1
-                common_users.add(booking.create_by)
-                if booking.name:
-                    booking_purposes.append(booking.name)
-            
-            peak_hours = [hour for hour, count in hour_counts.most_common(3)]
-            
-            total_possible_hours = 180 * 12
-            utilization_rate = total_hours / total_possible_hours if total_possible_hours > 0 else 0.0
-            
-            features = self._extract_room_features(room.description or "")
-            feature_vector = self._create_feature_vector(room, features)
-            usage_vector = self._create_usage_vector(bookings)
-            
-            profile = RoomProfile(
-                room_id=room.id,
-                room_name=room.room_name,
-                capacity=room.capacity,
-                area_id=room.area_id,
-                area_name=area_name,
-                description=room.description or "",
-                usage_frequency=usage_frequency,
-                average_booking_duration=avg_duration,
-                peak_usage_hours=peak_hours,
-                common_users=common_users,
-                booking_purposes=booking_purposes,
-                utilization_rate=utilization_rate,
-                feature_vector=feature_vector,
-                usage_vector=usage_vector
-            )
-            
-            self.cache_manager.set(cache_key, profile, ttl=self.cache_ttl)
-            return profile
+            return self.build_room_profiles().get(room_id)
             
         except Exception as e:
             logger.error(f"Error getting room profile for room {room_id}: {str(e)}")
             return None
     
+    def _reset_room_profiles(self):
+        self._room_profiles: Dict[int, RoomProfile] = {}
+        self._room_stats: Dict[int, RoomUsageStats] = defaultdict(RoomUsageStats)
+        self._last_entry_id = 0
+        self._profiles_rebuilt_at = 0.0
+        self._profiles_refreshed_at = 0.0
+    
+    def build_room_profiles(self, force: bool = False) -> Dict[int, RoomProfile]:
+        """
+        Build RoomProfiles for every room from grouped queries and keep them on the engine.
+        
+        The first call (and one every profile_rebuild_interval, so bookings age
+        out of the window) aggregates the whole window; later calls only
+        aggregate bookings added since the last build. Calls within
+        profile_refresh_interval return the profiles already built.
+        """
+        now = time.time()
+        if not force and self._room_profiles and now - self._profiles_refreshed_at < self.profile_refresh_interval:
+            return self._room_profiles
+        
+        full = force or not self._room_profiles or now - self._profiles_rebuilt_at >= self.profile_rebuild_interval
+        if full:
+            self._room_stats = defaultdict(RoomUsageStats)
+            self._last_entry_id = 0
+        
+        window_start = int((datetime.now() - timedelta(days=self.profile_window_days)).timestamp())
+        max_entry_id = self.db.query(func.max(MRBSEntry.id)).scalar() or 0
+        changed = self._aggregate_room_usage(window_start, self._last_entry_id, max_entry_id)
+        self._last_entry_id = max(self._last_entry_id, max_entry_id)
+        
+        rooms = self.db.query(MRBSRoom, MRBSArea.area_name).outerjoin(
+            MRBSArea, MRBSArea.id == MRBSRoom.area_id
+        ).all()
+        profiles = {}
+        for room, area_name in rooms:
+            previous = self._room_profiles.get(room.id)
+            if full or previous is None or room.id in changed or self._room_fields_changed(previous, room, area_name):
+                profiles[room.id] = self._profile_from_stats(room, area_name, self._room_stats[room.id])
+            else:
+                profiles[room.id] = previous
+        
+        self._room_profiles = profiles
+        self._profiles_refreshed_at = now
+        if full:
+            self._profiles_rebuilt_at = now
+        logger.info(f"{'Built' if full else 'Refreshed'} room profiles: {len(profiles)} rooms, {len(changed)} with new bookings")
+        return profiles
+    
+    def _aggregate_room_usage(self, window_start: int, after_id: int, max_id: int) -> Set[int]:
+        """Fold bookings with after_id < id <= max_id into the per-room stats; returns the rooms touched"""
+        if max_id <= after_id:
+            return set()
+        in_range = and_(
+            MRBSEntry.start_time >= window_start,
+            MRBSEntry.id > after_id,
+            MRBSEntry.id <= max_id
+        )
+        
+        changed = set()
+        for room_id, count, seconds in self.db.query(
+            MRBSEntry.room_id, func.count(MRBSEntry.id), func.sum(MRBSEntry.end_time - MRBSEntry.start_time)
+        ).filter(in_range).group_by(MRBSEntry.room_id):
+            stats = self._room_stats[room_id]
+            stats.booking_count += count
+            stats.total_seconds += int(seconds or 0)
+            changed.add(room_id)
+        
+        # Local hour of day per distinct start time; a fixed UTC offset in SQL
+        # would misplace everything on the other side of a DST change
+        for room_id, start_time, count in self.db.query(
+            MRBSEntry.room_id, MRBSEntry.start_time, func.count(MRBSEntry.id)
+        ).filter(in_range).group_by(MRBSEntry.room_id, MRBSEntry.start_time):
+            self._room_stats[room_id].hour_counts[datetime.fromtimestamp(start_time).hour] += count
+        
+        for room_id, user in self.db.query(MRBSEntry.room_id, MRBSEntry.create_by).filter(in_range).distinct():
+            self._room_stats[room_id].users.add(user)
+        
+        for room_id, name, count in self.db.query(
+            MRBSEntry.room_id, MRBSEntry.name, func.count(MRBSEntry.id)
+        ).filter(in_range, MRBSEntry.name != "").group_by(MRBSEntry.room_id, MRBSEntry.name):
+            if name:
+                self._room_stats[room_id].purposes[name] += count
+        
+        return changed
+    
+    def _room_fields_changed(self, profile: RoomProfile, room: MRBSRoom, area_name: Optional[str]) -> bool:
+        return (profile.capacity != room.capacity or profile.area_id != room.area_id
+                or profile.description != (room.description or "")
+                or profile.room_name != room.room_name or profile.area_name != (area_name or "Unknown"))
+    
+    def _profile_from_stats(self, room: MRBSRoom, area_name: Optional[str], stats: RoomUsageStats) -> RoomProfile:
+        """Assemble a RoomProfile from a room row and its booking aggregates"""
+        total_hours = stats.total_seconds / 3600
+        avg_duration = total_hours / stats.booking_count if stats.booking_count else 0.0
+        
+        hour_counts = Counter({hour: count for hour, count in enumerate(stats.hour_counts) if count})
+        peak_hours = [hour for hour, count in hour_counts.most_common(3)]
+        
+        total_possible_hours = self.profile_window_days * 12
+        utilization_rate = total_hours / total_possible_hours if total_possible_hours > 0 else 0.0
+        
+        features = self._extract_room_features(room.description or "")
+        
+        return RoomProfile(
+            room_id=room.id,
+            room_name=room.room_name,
+            capacity=room.capacity,
+            area_id=room.area_id,
+            area_name=area_name or "Unknown",
+            description=room.description or "",
+            usage_frequency=stats.booking_count,
+            average_booking_duration=avg_duration,
+            peak_usage_hours=peak_hours,
+            common_users=set(stats.users),
+            booking_purposes=list(stats.purposes.elements()),
+            utilization_rate=utilization_rate,
+            feature_vector=self._create_feature_vector(room, features),
+            usage_vector=self._usage_vector_from_counts(stats.hour_counts, stats.booking_count, avg_duration)
+        )
+    
     def _get_time_slot_profile(self, time: datetime, duration: float) -> TimeSlotProfile:
         """Get time slot profile with usage patterns"""
         try:
@@ -349,16 +545,11 @@ class SimilarityEngine:
             end_hour = (time.hour + int(duration)) % 24
             day_of_week = time.weekday()
             
-            similar_slots = self.db.query(MRBSEntry).filter(
-                and_(
-                    func.extract('hour', func.from_unixtime(MRBSEntry.start_time)) == start_hour,
-                    func.extract('dow', func.from_unixtime(MRBSEntry.start_time)) == day_of_week
-                )
-            ).limit(100).all()
+            demand = demand_histogram.slot(day_of_week, start_hour, self.db)
             
-            popularity_score = len(similar_slots) / 100.0
-            typical_users = set(booking.create_by for booking in similar_slots)
-            common_purposes = [booking.name for booking in similar_slots if booking.name]
+            popularity_score = min(demand['bookings'], 100) / 100.0
+            typical_users = set(user for user, _ in demand['users'].most_common(100))
+            common_purposes = [purpose for purpose, _ in demand['purposes'].most_common(10)]
             conflict_probability = min(popularity_score * 1.5, 1.0)
             seasonal_usage = {'spring': 0.25, 'summer': 0.25, 'fall': 0.25, 'winter': 0.25}
             
@@ -465,37 +656,12 @@ class SimilarityEngine:
     
     def _extract_room_features(self, description: str) -> List[str]:
         """Extract features from room description"""
-        if not description:
-            return []
-        
-        features = []
-        description_lower = description.lower()
-        
-        feature_keywords = {
-            'projector': ['projector', 'projection'],
-            'whiteboard': ['whiteboard', 'board'],
-            'tv': ['tv', 'television', 'screen'],
-            'ac': ['ac', 'air conditioning', 'aircon'],
-            'wifi': ['wifi', 'wireless'],
-            'video_conference': ['video', 'conference', 'zoom', 'teams'],
-            'phone': ['phone', 'telephone'],
-            'windows': ['window', 'natural light'],
-            'kitchen': ['kitchen', 'pantry', 'coffee'],
-            'parking': ['parking', 'garage']
-        }
-        
-        for feature, keywords in feature_keywords.items():
-            if any(keyword in description_lower for keyword in keywords):
-                features.append(feature)
-        
-        return features
+        features = parse_room_features(description)
+        return [feature for feature in ROOM_FEATURE_KEYWORDS if feature in features]
     
     def _create_feature_vector(self, room: MRBSRoom, features: List[str]) -> List[float]:
         """Create feature vector for room"""
-        feature_dims = [
-            'projector', 'whiteboard', 'tv', 'ac', 'wifi', 
-            'video_conference', 'phone', 'windows', 'kitchen', 'parking'
-        ]
+        feature_dims = list(ROOM_FEATURE_KEYWORDS)
         
         vector = []
         
@@ -515,20 +681,27 @@ class SimilarityEngine:
             hour = datetime.fromtimestamp(booking.start_time).hour
             hour_counts[hour] += 1
         
+        durations = [(b.end_time - b.start_time) / 3600 for b in bookings]
+        avg_duration = sum(durations) / len(durations) if durations else 0.0
+        return self._usage_vector_from_counts(hour_counts, len(bookings), avg_duration)
+    
+    def _usage_vector_from_counts(self, hour_counts: List[int], total_bookings: int,
+                                  avg_duration: float) -> List[float]:
+        """Usage pattern vector from an hour-of-day histogram"""
+        if not total_bookings:
+            return [0.0] * 10
+        
         vector = []
         periods = [
             hour_counts[0:3], hour_counts[3:6], hour_counts[6:9], hour_counts[9:12],
             hour_counts[12:15], hour_counts[15:18], hour_counts[18:21], hour_counts[21:24]
         ]
         
-        total_bookings = len(bookings)
         for period in periods:
-            vector.append(sum(period) / total_bookings if total_bookings > 0 else 0.0)
+            vector.append(sum(period) / total_bookings)
         
-        durations = [(b.end_time - b.start_time) / 3600 for b in bookings]
-        avg_duration = sum(durations) / len(durations) if durations else 0.0
         vector.append(min(avg_duration / 8.0, 1.0))
-        vector.append(min(len(bookings) / 100.0, 1.0))
+        vector.append(min(total_bookings / 100.0, 1.0))
         
         return vector
     
@@ -546,95 +719,6 @@ class SimilarityEngine:
         
         return dot_product / (norm1 * norm2)
     
-    def _get_user_booking_history(self, user_id: str) -> List[MRBSEntry]:
-        """Get user's booking history"""
-        return self.db.query(MRBSEntry).filter(
-            MRBSEntry.create_by == user_id
-        ).order_by(MRBSEntry.timestamp.desc()).limit(200).all()
-    
-    def _calculate_room_preference_similarity(self, bookings1: List[MRBSEntry], bookings2: List[MRBSEntry]) -> float:
-        """Calculate similarity in room preferences between users"""
-        rooms1 = set(b.room_id for b in bookings1)
-        rooms2 = set(b.room_id for b in bookings2)
-        
-        if not rooms1 or not rooms2:
-            return 0.0
-        
-        intersection = len(rooms1 & rooms2)
-        union = len(rooms1 | rooms2)
-        return intersection / union if union > 0 else 0.0
-    
-    def _calculate_time_preference_similarity(self, bookings1: List[MRBSEntry], bookings2: List[MRBSEntry]) -> float:
-        """Calculate similarity in time preferences between users"""
-        hours1 = [datetime.fromtimestamp(b.start_time).hour for b in bookings1]
-        hours2 = [datetime.fromtimestamp(b.start_time).hour for b in bookings2]
-        
-        if not hours1 or not hours2:
-            return 0.0
-        
-        hour_dist1 = [0] * 24
-        hour_dist2 = [0] * 24
-        
-        for hour in hours1:
-            hour_dist1[hour] += 1
-        for hour in hours2:
-            hour_dist2[hour] += 1
-        
-        total1 = sum(hour_dist1)
-        total2 = sum(hour_dist2)
-        
-        if total1 == 0 or total2 == 0:
-            return 0.0
-        
-        norm_dist1 = [count / total1 for count in hour_dist1]
-        norm_dist2 = [count / total2 for count in hour_dist2]
-        
-        return self._cosine_similarity(norm_dist1, norm_dist2)
-    
-    def _calculate_duration_preference_similarity(self, bookings1: List[MRBSEntry], bookings2: List[MRBSEntry]) -> float:
-        """Calculate similarity in duration preferences between users"""
-        durations1 = [(b.end_time - b.start_time) / 3600 for b in bookings1]
-        durations2 = [(b.end_time - b.start_time) / 3600 for b in bookings2]
-        
-        if not durations1 or not durations2:
-            return 0.0
-        
-        avg_duration1 = sum(durations1) / len(durations1)
-        avg_duration2 = sum(durations2) / len(durations2)
-        
-        max_duration = max(avg_duration1, avg_duration2)
-        min_duration = min(avg_duration1, avg_duration2)
-        
-        if max_duration == 0:
-            return 1.0
-        
-        return min_duration / max_duration
-    
-    def _calculate_booking_frequency_similarity(self, bookings1: List[MRBSEntry], bookings2: List[MRBSEntry]) -> float:
-        """Calculate similarity in booking frequency patterns"""
-        if not bookings1 or not bookings2:
-            return 0.0
-        
-        dates1 = [datetime.fromtimestamp(b.start_time).date() for b in bookings1]
-        dates2 = [datetime.fromtimestamp(b.start_time).date() for b in bookings2]
-        
-        if not dates1 or not dates2:
-            return 0.0
-        
-        range1 = max((max(dates1) - min(dates1)).days, 1)
-        range2 = max((max(dates2) - min(dates2)).days, 1)
-        
-        freq1 = len(bookings1) * 7 / range1
-        freq2 = len(bookings2) * 7 / range2
-        
-        max_freq = max(freq1, freq2)
-        min_freq = min(freq1, freq2)
-        
-        if max_freq == 0:
-            return 1.0
-        
-        return min_freq / max_freq
-    
     def _calculate_room_similarity_confidence(self, room1: RoomProfile, room2: RoomProfile) -> float:
         """Calculate confidence in room similarity score"""
         factors = []
@@ -666,20 +750,29 @@ class SimilarityEngine:
         
         return sum(factors) / len(factors)
     
+    def get_room_similarity_array(self, room_ids: List[int]) -> np.ndarray:
+        """Dense similarity matrix for room_ids, in order; rooms without a profile score 0"""
+        profiles = [p for p in (self._get_room_profile(room_id) for room_id in room_ids) if p]
+        recomputed = self.room_matrix.refresh(profiles)
+        if recomputed:
+            logger.debug(f"Recomputed similarity rows for {recomputed} rooms")
+        
+        scores = np.zeros((len(room_ids), len(room_ids)), dtype=np.float64)
+        present = [i for i, room_id in enumerate(room_ids) if room_id in self.room_matrix.index]
+        if present:
+            rows = np.array(present, dtype=np.intp)
+            scores[np.ix_(rows, rows)] = self.room_matrix.submatrix([room_ids[i] for i in present])
+        np.fill_diagonal(scores, 1.0)
+        return scores
+    
     def get_room_similarity_matrix(self, room_ids: List[int]) -> Dict[Tuple[int, int], float]:
-        """Calculate similarity matrix for a set of rooms"""
+        """Similarity of every room pair, as a dict view over the dense matrix"""
         try:
+            scores = self.get_room_similarity_array(room_ids).tolist()
             similarity_matrix = {}
-            
             for i, room1_id in enumerate(room_ids):
                 for j, room2_id in enumerate(room_ids):
-                    if i < j:
-                        similarity = self.calculate_room_similarity(room1_id, room2_id)
-                        similarity_matrix[(room1_id, room2_id)] = similarity.similarity_score
-                        similarity_matrix[(room2_id, room1_id)] = similarity.similarity_score
-                    elif i == j:
-                        similarity_matrix[(room1_id, room2_id)] = 1.0
-            
+                    similarity_matrix[(room1_id, room2_id)] = scores[i][j]
             return similarity_matrix
             
         except Exception as e:
@@ -819,8 +912,9 @@ class SimilarityEngine:
     def clear_similarity_cache(self):
         """Clear all similarity-related cache entries"""
         try:
-            self.cache_manager.clear_pattern("room_similarity:*")
-            self.cache_manager.clear_pattern("room_profile:*")
+            self.cache_manager.flush_by_key_type(CacheKeyType.ROOM_SIMILARITIES)
+            self.room_matrix = RoomSimilarityMatrix(self.room_similarity_weights)
+            self._reset_room_profiles()
             logger.info("Similarity cache cleared")
         except Exception as e:
             logger.error(f"Error clearing similarity cache: {str(e)}")
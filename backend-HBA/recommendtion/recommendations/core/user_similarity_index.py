@@ -0,0 +1,213 @@
+# recommendtion/recommendations/core/user_similarity_index.py
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from src.models import MRBSEntry
+
+logger = logging.getLogger(__name__)
+
+USER_INDEX_WINDOW_DAYS = int(os.getenv("USER_INDEX_WINDOW_DAYS", "180"))
+# New bookings are folded in at most this often; a full rebuild picks up
+# edits, deletions and bookings that aged out of the window
+USER_INDEX_REFRESH_SECONDS = int(os.getenv("USER_INDEX_REFRESH_SECONDS", "300"))
+USER_INDEX_REBUILD_SECONDS = int(os.getenv("USER_INDEX_REBUILD_SECONDS", "86400"))
+
+HOURS_PER_WEEK = 7 * 24
+DURATION_BUCKETS_MINUTES = [30, 60, 90, 120, 180]
+
+
+class UserSimilarityIndex:
+    """
+    Sparse user × feature matrix with top-k cosine neighbour lookup.
+
+    Features are three blocks, each L2-normalized and weighted so that the
+    cosine of two rows is the weighted sum of per-block cosines:
+    room visits, hour-of-week histogram and booking-duration buckets.
+    """
+
+    def __init__(self, window_days: int = USER_INDEX_WINDOW_DAYS,
+                 refresh_seconds: int = USER_INDEX_REFRESH_SECONDS,
+                 rebuild_seconds: int = USER_INDEX_REBUILD_SECONDS):
+        self.window_days = window_days
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.weights = {'rooms': 0.4, 'hours': 0.4, 'durations': 0.2}
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._room_counts: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self._hour_counts: Dict[str, np.ndarray] = defaultdict(lambda: np.zeros(HOURS_PER_WEEK))
+        self._duration_counts: Dict[str, np.ndarray] = defaultdict(lambda: np.zeros(len(DURATION_BUCKETS_MINUTES) + 1))
+        self._room_columns: Dict[int, int] = {}
+        self._rows: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._dirty: set = set()
+        self._users: List[str] = []
+        self._user_pos: Dict[str, int] = {}
+        self._matrix = None
+        self._last_entry_id = 0
+        self._rebuilt_at = 0.0
+        self._refreshed_at = 0.0
+
+    # ---------------------------------------------------------------- ingest
+
+    def refresh(self, db: Session, force: bool = False) -> int:
+        """Fold bookings added since the last refresh into the index; returns how many were read."""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._refreshed_at < self.refresh_seconds:
+                return 0
+            if force or now - self._rebuilt_at >= self.rebuild_seconds:
+                self._reset()
+                self._rebuilt_at = now
+            window_start = int((datetime.now() - timedelta(days=self.window_days)).timestamp())
+            rows = db.query(
+                MRBSEntry.id, MRBSEntry.create_by, MRBSEntry.room_id, MRBSEntry.start_time, MRBSEntry.end_time
+            ).filter(
+                MRBSEntry.id > self._last_entry_id,
+                MRBSEntry.start_time >= window_start
+            ).order_by(MRBSEntry.id).all()
+            for entry_id, user_id, room_id, start_ts, end_ts in rows:
+                self.add_booking(user_id, room_id, start_ts, end_ts)
+                self._last_entry_id = max(self._last_entry_id, entry_id)
+            self._refreshed_at = now
+            if rows:
+                logger.info(f"User similarity index: folded in {len(rows)} bookings, {len(self._dirty)} users changed")
+            return len(rows)
+
+    def add_booking(self, user_id: str, room_id: int, start_ts: int, end_ts: int):
+        """Count one booking towards a user's features."""
+        if not user_id:
+            return
+        with self._lock:
+            start = datetime.fromtimestamp(start_ts)
+            self._room_counts[user_id][room_id] += 1
+            self._hour_counts[user_id][start.weekday() * 24 + start.hour] += 1
+            minutes = max(0, end_ts - start_ts) / 60
+            self._duration_counts[user_id][np.searchsorted(DURATION_BUCKETS_MINUTES, minutes)] += 1
+            if room_id not in self._room_columns:
+                self._room_columns[room_id] = len(self._room_columns)
+            self._dirty.add(user_id)
+
+    # ---------------------------------------------------------------- matrix
+
+    def _user_row(self, user_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(columns, values) of a user's weighted, block-normalized feature row."""
+        room_counts = self._room_counts[user_id]
+        blocks = [
+            ('rooms', np.array([self._room_columns[r] for r in room_counts], dtype=np.int64),
+             np.array(list(room_counts.values()), dtype=np.float64)),
+            ('hours', np.arange(HOURS_PER_WEEK), self._hour_counts[user_id]),
+            ('durations', np.arange(len(DURATION_BUCKETS_MINUTES) + 1), self._duration_counts[user_id]),
+        ]
+        # Room columns go last so new rooms only widen the matrix
+        offsets = {'hours': 0, 'durations': HOURS_PER_WEEK, 'rooms': HOURS_PER_WEEK + len(DURATION_BUCKETS_MINUTES) + 1}
+        columns, values = [], []
+        for name, block_columns, block_values in blocks:
+            nonzero = block_values > 0
+            block_columns, block_values = block_columns[nonzero], block_values[nonzero]
+            norm = np.linalg.norm(block_values)
+            if norm == 0:
+                continue
+            columns.append(block_columns + offsets[name])
+            values.append(block_values / norm * np.sqrt(self.weights[name]))
+        if not columns:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        return np.concatenate(columns), np.concatenate(values)
+
+    def _ensure_matrix(self):
+        if self._matrix is not None and not self._dirty:
+            return
+        for user_id in self._dirty:
+            self._rows[user_id] = self._user_row(user_id)
+            if user_id not in self._user_pos:
+                self._user_pos[user_id] = len(self._users)
+                self._users.append(user_id)
+        self._dirty = set()
+
+        width = HOURS_PER_WEEK + len(DURATION_BUCKETS_MINUTES) + 1 + len(self._room_columns)
+        lengths = [len(self._rows[user_id][0]) for user_id in self._users]
+        indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        indices = np.concatenate([self._rows[u][0] for u in self._users]) if self._users else np.zeros(0, dtype=np.int64)
+        data = np.concatenate([self._rows[u][1] for u in self._users]) if self._users else np.zeros(0)
+        self._matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(self._users), width))
+
+    # ---------------------------------------------------------------- lookup
+
+    def most_similar(self, user_id: str, k: int = 5, db: Optional[Session] = None,
+                     min_similarity: float = 0.0) -> List[Dict[str, Any]]:
+        """Top-k users by cosine similarity of booking features, best first."""
+        with self._lock:
+            if db is not None:
+                self.refresh(db)
+            self._ensure_matrix()
+            position = self._user_pos.get(user_id)
+            if position is None or k <= 0:
+                return []
+            scores = (self._matrix @ self._matrix[position].T).toarray().ravel()
+            scores[position] = -1.0
+            k = min(k, len(scores) - 1)
+            if k <= 0:
+                return []
+            candidates = np.argpartition(-scores, k - 1)[:k]
+            candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+            return [
+                {'user_id': self._users[i], 'similarity_score': float(scores[i])}
+                for i in candidates if scores[i] >= min_similarity and scores[i] > 0
+            ]
+
+    def similarity(self, user1_id: str, user2_id: str, db: Optional[Session] = None) -> float:
+        with self._lock:
+            if db is not None:
+                self.refresh(db)
+            self._ensure_matrix()
+            first, second = self._user_pos.get(user1_id), self._user_pos.get(user2_id)
+            if first is None or second is None:
+                return 0.0
+            return float(self._matrix[first].multiply(self._matrix[second]).sum())
+
+    def block_similarities(self, user1_id: str, user2_id: str, db: Optional[Session] = None) -> Dict[str, float]:
+        """Cosine similarity per feature block (rooms, hours, durations); empty if either user is unknown."""
+        with self._lock:
+            if db is not None:
+                self.refresh(db)
+            self._ensure_matrix()
+            first, second = self._user_pos.get(user1_id), self._user_pos.get(user2_id)
+            if first is None or second is None:
+                return {}
+            product = self._matrix[first].multiply(self._matrix[second]).tocoo()
+            bounds = {'hours': (0, HOURS_PER_WEEK),
+                      'durations': (HOURS_PER_WEEK, HOURS_PER_WEEK + len(DURATION_BUCKETS_MINUTES) + 1),
+                      'rooms': (HOURS_PER_WEEK + len(DURATION_BUCKETS_MINUTES) + 1, product.shape[1])}
+            return {
+                name: float(product.data[(product.col >= low) & (product.col < high)].sum()) / self.weights[name]
+                for name, (low, high) in bounds.items()
+            }
+
+    def booking_count(self, user_id: str) -> int:
+        """Bookings of a user currently counted in the index."""
+        with self._lock:
+            durations = self._duration_counts.get(user_id)
+            return int(durations.sum()) if durations is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'users': len(self._room_counts),
+                'rooms': len(self._room_columns),
+                'nnz': int(self._matrix.nnz) if self._matrix is not None else 0,
+                'last_entry_id': self._last_entry_id,
+                'pending_users': len(self._dirty),
+            }
+
+
+user_similarity_index = UserSimilarityIndex()
@@ -7,6 +7,7 @@ import pandas as pd
 import numpy as np
 from collections import defaultdict, Counter
 from src.models import MRBSEntry, MRBSRoom
+from src.demand_histogram import demand_histogram
 import json
 
 class AnalyticsProcessor:
@@ -171,12 +172,15 @@ class AnalyticsProcessor:
             MRBSEntry.start_time > int((datetime.now() - timedelta(days=30)).timestamp())
         ).all()
         
+        # Demand over the histogram window, scaled to bookings per 30 days
+        hour_counts = demand_histogram.room_histogram(room.id, self.db).sum(axis=0)
+        
         return self._cache_result(cache_key, {
             'id': room.id, 'name': room.room_name, 'capacity': room.capacity,
             'description': room.description, 'area_id': room.area_id,
-            'popularity_score': len(recent_bookings),
+            'popularity_score': round(int(hour_counts.sum()) * 30 / demand_histogram.window_days, 2),
             'avg_booking_duration': self._calculate_avg_duration(recent_bookings),
-            'peak_hours': self._get_peak_hours(recent_bookings),
+            'peak_hours': [f"{h:02d}:00" for h in np.argsort(-hour_counts, kind='stable')[:3] if hour_counts[h] > 0],
             'utilization_rate': self._calculate_utilization_rate(recent_bookings)
         })
     
@@ -246,37 +250,25 @@ class AnalyticsProcessor:
         cache_key = f"optimal_times_{limit}"
         if self._is_cached_valid(cache_key): return self._cache[cache_key]
         
-        recent_bookings = self.db.query(MRBSEntry).filter(
-            MRBSEntry.start_time > int((datetime.now() - timedelta(days=30)).timestamp())
-        ).all()
-        
-        time_room_stats = defaultdict(lambda: {'bookings': 0, 'rooms': set(), 'avg_duration': []})
-        
-        for booking in recent_bookings:
-            time_slot = datetime.fromtimestamp(booking.start_time).strftime("%H:%M")
-            duration = (booking.end_time - booking.start_time) / 3600
-            
-            room = self.db.query(MRBSRoom).filter(MRBSRoom.id == booking.room_id).first()
-            if room:
-                time_room_stats[time_slot]['bookings'] += 1
-                time_room_stats[time_slot]['rooms'].add(room.room_name)
-                time_room_stats[time_slot]['avg_duration'].append(duration)
+        hour_stats = [stats for stats in demand_histogram.hour_stats(self.db) if stats['bookings'] > 0]
+        top_room_ids = {stats['top_room_id'] for stats in hour_stats}
+        room_names = dict(self.db.query(MRBSRoom.id, MRBSRoom.room_name).filter(MRBSRoom.id.in_(top_room_ids)).all()) if top_room_ids else {}
         
         optimal_times = []
-        for time_slot, stats in time_room_stats.items():
-            if stats['bookings'] > 0:
-                popularity = stats['bookings'] / 30
-                room_variety = len(stats['rooms'])
-                avg_duration = np.mean(stats['avg_duration'])
-                
-                optimal_times.append({
-                    'time_slot': time_slot, 'start_time': time_slot,
-                    'end_time': self._add_hours(time_slot, avg_duration),
-                    'room_name': list(stats['rooms'])[0] if stats['rooms'] else 'Various',
-                    'popularity': popularity,
-                    'optimality_score': popularity * 0.4 + room_variety * 0.3 + (2 / avg_duration) * 0.3,
-                    'avg_duration': avg_duration
-                })
+        for stats in hour_stats:
+            time_slot = f"{stats['hour']:02d}:00"
+            popularity = stats['bookings'] / demand_histogram.window_days
+            room_variety = stats['rooms']
+            avg_duration = stats['avg_duration'] or 1.0
+            
+            optimal_times.append({
+                'time_slot': time_slot, 'start_time': time_slot,
+                'end_time': self._add_hours(time_slot, avg_duration),
+                'room_name': room_names.get(stats['top_room_id'], 'Various'),
+                'popularity': popularity,
+                'optimality_score': popularity * 0.4 + room_variety * 0.3 + (2 / avg_duration) * 0.3,
+                'avg_duration': avg_duration
+            })
         
         optimal_times.sort(key=lambda x: x['optimality_score'], reverse=True)
         return self._cache_result(cache_key, optimal_times[:limit])
@@ -1,37 +1,26 @@
 # recommendtion/recommendations/models/embedding_model.py
-from langchain_community.embeddings import HuggingFaceEmbeddings
 import numpy as np
 from typing import List, Dict, Any, Optional
 import logging
 import json
 from datetime import datetime
 import os
+from .model_registry import get_embeddings, embed_one, embed_many as embed_batch, DEFAULT_EMBEDDING_MODEL
 
 logger = logging.getLogger(__name__)
 
 class EmbeddingModel:
     """Manages embeddings for rooms, users, and time slots using Hugging Face models"""
     
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", persist_directory: str = "./data/embeddings"):
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, persist_directory: str = "./data/embeddings"):
         logger.info(f"Initializing EmbeddingModel with model: {model_name}")
         
-        try:
-            try:
-                from langchain_huggingface import HuggingFaceEmbeddings
-                self.embeddings = HuggingFaceEmbeddings(model_name=model_name)
-                logger.info("Using new langchain-huggingface package")
-            except ImportError:
-                import warnings
-                warnings.filterwarnings('ignore', category=DeprecationWarning)
-                from langchain_community.embeddings import HuggingFaceEmbeddings
-                self.embeddings = HuggingFaceEmbeddings(model_name=model_name)
-                logger.info("Using langchain_community package (deprecated)")
-            
+        # The underlying model is shared process-wide through the registry
+        self.embeddings = get_embeddings(model_name)
+        if self.embeddings is not None:
             self.model_name = model_name
             logger.info("Successfully loaded embedding model")
-        except Exception as e:
-            logger.error(f"Failed to load embedding model: {e}")
-            self.embeddings = None
+        else:
             self.model_name = "fallback"
             logger.warning("Using fallback embedding method")
         
@@ -42,22 +31,32 @@ class EmbeddingModel:
         self._booking_embeddings = {}
         logger.info("EmbeddingModel initialized successfully")
     
+    def _fallback_embedding(self, text: str) -> np.ndarray:
+        import hashlib
+        hash_obj = hashlib.md5(text.encode())
+        hash_int = int(hash_obj.hexdigest(), 16)
+        return np.random.RandomState(hash_int % (2**32)).normal(0, 1, 384).astype(np.float32)
+    
     def _get_embedding(self, text: str) -> np.ndarray:
         try:
             if self.embeddings is not None:
-                embedding = self.embeddings.embed_query(text)
-                return np.array(embedding, dtype=np.float32)
+                return embed_one(text, self.model_name)
             else:
-                import hashlib
-                hash_obj = hashlib.md5(text.encode())
-                hash_int = int(hash_obj.hexdigest(), 16)
-                np.random.seed(hash_int % (2**32))
-                embedding = np.random.normal(0, 1, 384).astype(np.float32)
-                return embedding
+                return self._fallback_embedding(text)
         except Exception as e:
             logger.error(f"Error generating embedding for text: {e}")
             return np.zeros(384, dtype=np.float32)
     
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        """Embed many texts with one batched model call; returns an (n, dim) array."""
+        try:
+            if self.embeddings is not None:
+                return embed_batch(texts, self.model_name)
+            return np.stack([self._fallback_embedding(text) for text in texts]) if texts else np.zeros((0, 384), dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Error generating batch embeddings: {e}")
+            return np.zeros((len(texts), 384), dtype=np.float32)
+    
     def get_room_embedding(self, room_description: str) -> Optional[np.ndarray]:
         try:
             if not room_description or not isinstance(room_description, str):
@@ -1,5 +1,5 @@
 from .embedding_model import EmbeddingModel
-from sentence_transformers import SentenceTransformer
+from .model_registry import get_sentence_transformer
 import chromadb
 from chromadb.config import Settings
 import numpy as np
@@ -18,7 +18,7 @@ class EnhancedEmbeddingModel(EmbeddingModel):
     
     def _initialize_advanced_components(self):
         try:
-            self.behavioral_model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
+            self.behavioral_model = get_sentence_transformer('paraphrase-MiniLM-L6-v2')
             self.chroma_client = chromadb.Client(Settings(chroma_db_impl="duckdb+parquet", persist_directory=self.persist_directory))
             
             self.user_collection = self._get_or_create_collection("user_behaviors")
@@ -0,0 +1,154 @@
+# recommendtion/recommendations/models/model_registry.py
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Single-text requests arriving within this window are embedded together
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+# A model that failed to load is retried after this many seconds
+MODEL_LOAD_RETRY_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_SECONDS", "60"))
+
+# _lock only guards the dicts; each model loads under its own lock so a slow
+# download never blocks lookups of models that are already loaded
+_lock = threading.Lock()
+_load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_failed_until: Dict[Tuple[str, str], float] = {}
+_embeddings: Dict[str, Any] = {}
+_sentence_transformers: Dict[str, Any] = {}
+_batchers: Dict[str, "EmbeddingBatcher"] = {}
+
+
+def _load_embeddings(model_name: str):
+    try:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        logger.info("Using new langchain-huggingface package")
+    except ImportError:
+        import warnings
+        warnings.filterwarnings('ignore', category=DeprecationWarning)
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        logger.info("Using langchain_community package (deprecated)")
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+def _load_sentence_transformer(model_name: str):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def _get_model(models: Dict[str, Any], kind: str, model_name: str, load: Callable[[str], Any]):
+    """Loaded model from `models`, loading it once; None while a failed load is backing off."""
+    model = models.get(model_name)
+    if model is not None:
+        return model
+    key = (kind, model_name)
+    with _lock:
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+    with load_lock:
+        model = models.get(model_name)
+        if model is not None or time.monotonic() < _failed_until.get(key, 0.0):
+            return model
+        try:
+            model = load(model_name)
+        except Exception as e:
+            logger.error(f"Failed to load {kind} {model_name}, retrying in {MODEL_LOAD_RETRY_SECONDS:g}s: {e}")
+            with _lock:
+                _failed_until[key] = time.monotonic() + MODEL_LOAD_RETRY_SECONDS
+            return None
+        logger.info(f"Loaded {kind} {model_name}")
+        with _lock:
+            models[model_name] = model
+            _failed_until.pop(key, None)
+        return model
+
+
+def get_embeddings(model_name: str = DEFAULT_EMBEDDING_MODEL):
+    """Process-wide HuggingFaceEmbeddings for a model, or None if it cannot be loaded."""
+    return _get_model(_embeddings, "embedding model", model_name, _load_embeddings)
+
+
+def get_sentence_transformer(model_name: str):
+    """Process-wide SentenceTransformer for a model, or None if it cannot be loaded."""
+    return _get_model(_sentence_transformers, "sentence transformer", model_name, _load_sentence_transformer)
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding requests into micro-batches.
+
+    Callers block on a future while a worker thread collects every request
+    that arrives within `window_ms` (up to `max_batch`) and embeds them with
+    one embed_documents call.
+    """
+
+    def __init__(self, embeddings, window_ms: float = EMBEDDING_BATCH_WINDOW_MS,
+                 max_batch: int = EMBEDDING_MAX_BATCH):
+        self.embeddings = embeddings
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.batches = 0
+        self.texts = 0
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            try:
+                while len(pending) < self.max_batch:
+                    pending.append(self._queue.get(timeout=self.window))
+            except queue.Empty:
+                pass
+            try:
+                vectors = self.embeddings.embed_documents([text for text, _ in pending])
+                self.batches += 1
+                self.texts += len(pending)
+                for (_, future), vector in zip(pending, vectors):
+                    future.set_result(np.asarray(vector, dtype=np.float32))
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+
+
+def get_batcher(model_name: str = DEFAULT_EMBEDDING_MODEL) -> Optional[EmbeddingBatcher]:
+    embeddings = get_embeddings(model_name)
+    if embeddings is None:
+        return None
+    with _lock:
+        if model_name not in _batchers:
+            _batchers[model_name] = EmbeddingBatcher(embeddings)
+        return _batchers[model_name]
+
+
+def embed_one(text: str, model_name: str = DEFAULT_EMBEDDING_MODEL) -> Optional[np.ndarray]:
+    """Embed one text through the shared micro-batcher; None if the model is unavailable."""
+    batcher = get_batcher(model_name)
+    return batcher.embed(text) if batcher is not None else None
+
+
+def embed_many(texts: Sequence[str], model_name: str = DEFAULT_EMBEDDING_MODEL) -> Optional[np.ndarray]:
+    """Embed a list of texts in one batched call; returns an (n, dim) float32 array."""
+    embeddings = get_embeddings(model_name)
+    if embeddings is None:
+        return None
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.asarray(embeddings.embed_documents(list(texts)), dtype=np.float32)
@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from ..models.embedding_model import EmbeddingModel
 from ..data.analytics_processor import AnalyticsProcessor
 from src.models import MRBSRoom, MRBSEntry
+from src.booking_index import free_rooms_in_window
+from src.room_catalog import CatalogRoom, room_catalog
 from datetime import datetime
 import numpy as np
 
@@ -13,7 +15,7 @@ class AlternativeRoomStrategy:
         self.embedding_model = EmbeddingModel()
     
     async def find_similar_rooms(self, target_room: str, date: str, start_time: str, end_time: str, room_features: Dict[str, Any], user_preferences: Dict[str, Any]) -> List[Dict[str, Any]]:
-        target_room_obj = self.db.query(MRBSRoom).filter(MRBSRoom.room_name == target_room).first()
+        target_room_obj = room_catalog.by_name(target_room, self.db)
         if not target_room_obj: return []
         
         available_rooms = await self._get_available_rooms(date, start_time, end_time)
@@ -29,15 +31,15 @@ class AlternativeRoomStrategy:
         unique = [alt for alt in alternatives if not (alt['room_name'] in seen or seen.add(alt['room_name']))]
         return sorted(unique, key=lambda x: x['confidence_score'], reverse=True)[:8]
     
-    async def _get_available_rooms(self, date: str, start_time: str, end_time: str) -> List[MRBSRoom]:
+    async def _get_available_rooms(self, date: str, start_time: str, end_time: str) -> List[CatalogRoom]:
         start_dt = datetime.strptime(f"{date} {start_time}", "%Y-%m-%d %H:%M")
         end_dt = datetime.strptime(f"{date} {end_time}", "%Y-%m-%d %H:%M")
         start_ts, end_ts = int(start_dt.timestamp()), int(end_dt.timestamp())
         
-        booked_ids = [r[0] for r in self.db.query(MRBSEntry.room_id).filter(MRBSEntry.start_time < end_ts, MRBSEntry.end_time > start_ts).distinct().all()]
-        return self.db.query(MRBSRoom).filter(~MRBSRoom.id.in_(booked_ids), MRBSRoom.disabled == False).all()
+        free_ids = {room_id for room_id, is_free in free_rooms_in_window(self.db, start_ts, end_ts).items() if is_free}
+        return [room for room in room_catalog.rooms(self.db) if room.id in free_ids]
     
-    async def _find_embedding_similar_rooms(self, target_room: str, available_rooms: List[MRBSRoom], room_features: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def _find_embedding_similar_rooms(self, target_room: str, available_rooms: List[CatalogRoom], room_features: Dict[str, Any]) -> List[Dict[str, Any]]:
         alternatives = []
         target_room_obj = next((r for r in available_rooms if r.room_name == target_room), None)
         
@@ -56,7 +58,7 @@ class AlternativeRoomStrategy:
                     })
         return alternatives
     
-    def _find_capacity_similar_rooms(self, target_room: MRBSRoom, available_rooms: List[MRBSRoom], room_features: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _find_capacity_similar_rooms(self, target_room: CatalogRoom, available_rooms: List[CatalogRoom], room_features: Dict[str, Any]) -> List[Dict[str, Any]]:
         alternatives = []
         target_capacity = target_room.capacity
         
@@ -80,7 +82,7 @@ class AlternativeRoomStrategy:
             })
         return alternatives
     
-    async def _find_preference_based_rooms(self, available_rooms: List[MRBSRoom], user_preferences: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def _find_preference_based_rooms(self, available_rooms: List[CatalogRoom], user_preferences: Dict[str, Any]) -> List[Dict[str, Any]]:
         alternatives = []
         preferred_rooms = user_preferences.get('preferred_rooms', [])
         
@@ -96,7 +98,7 @@ class AlternativeRoomStrategy:
                 })
         return alternatives
     
-    def _find_location_similar_rooms(self, target_room: MRBSRoom, available_rooms: List[MRBSRoom]) -> List[Dict[str, Any]]:
+    def _find_location_similar_rooms(self, target_room: CatalogRoom, available_rooms: List[CatalogRoom]) -> List[Dict[str, Any]]:
         return [{
             'room_name': room.room_name, 'room_id': room.id,
             'confidence_score': 0.7, 'reason': 'Same building/area',
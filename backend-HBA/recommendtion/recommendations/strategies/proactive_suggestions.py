@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from ..data.analytics_processor import AnalyticsProcessor
 from ..models.embedding_model import EmbeddingModel
+from ..core.user_similarity_index import user_similarity_index
 from ..utils.time_utils import TimeUtils
 from ..utils.metrics import RecommendationMetrics
 import pandas as pd
@@ -120,7 +121,7 @@ class ProactiveSuggestionStrategy:
     async def _suggest_collaborative_bookings(self, user_id: str, user_patterns: Dict, context: Dict = None) -> List[Dict]:
         suggestions = []
         try:
-            similar_users = await self.embedding_model.find_similar_users(user_id, n_results=5)
+            similar_users = user_similarity_index.most_similar(user_id, k=5, db=self.db)
             
             for user in similar_users:
                 if user['similarity_score'] < 0.3: continue
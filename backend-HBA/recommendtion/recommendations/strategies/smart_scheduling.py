@@ -13,14 +13,23 @@ import base64
 from sqlalchemy.orm import Session
 from src.database import get_db
 from src.models import MRBSRoom, MRBSEntry, MRBSRepeat
+from src.booking_index import booking_index
 from ..core.pattern_analyzer import PatternAnalyzer
 from ..core.preference_learner import PreferenceLearner
 from ..data.analytics_processor import AnalyticsProcessor
 from ..utils.time_utils import TimeUtils
 from ..utils.metrics import RecommendationMetrics
+from ..utils.interval_sweep import common_free_windows, complement_intervals
 
 logger = logging.getLogger(__name__)
 
+# Meeting suggestions are searched on weekdays between these hours, over the
+# next MEETING_SEARCH_DAYS when no time range is given
+MEETING_DAY_START_HOUR = 8
+MEETING_DAY_END_HOUR = 20
+MEETING_SEARCH_DAYS = 7
+MEETING_SLOT_STEP_MINUTES = 30
+
 class OptimizationGoal(Enum):
     MINIMIZE_CONFLICTS = "minimize_conflicts"
     MAXIMIZE_EFFICIENCY = "maximize_efficiency"
@@ -304,23 +313,24 @@ class SmartSchedulingStrategy:
                 logger.info("Returning cached meeting suggestions")
                 return cached_result
             
-            # Get availability and preferences
-            attendee_data = {}
-            for attendee_id in attendees:
-                availability = await self._get_user_availability(attendee_id, preferred_time_range)
-                preferences = await self._load_user_preferences(attendee_id)
-                attendee_data[attendee_id] = {'availability': availability, 'preferences': preferences}
+            # Availability of all attendees comes from one query; preferences load concurrently
+            time_range = self._meeting_time_range(preferred_time_range)
+            availability, preferences = await asyncio.gather(
+                self._load_attendee_availability(attendees, time_range),
+                asyncio.gather(*(self._load_user_preferences(attendee_id) for attendee_id in attendees))
+            )
+            attendee_preferences = dict(zip(attendees, preferences))
             
             # Find common slots and score them
             common_slots = self._find_common_available_slots(
-                {aid: data['availability'] for aid, data in attendee_data.items()}, 
-                duration_minutes, preferred_time_range
+                availability, duration_minutes, time_range,
+                room_free=self._room_free_intervals(room_requirements, time_range)
             )
             
             scored_slots = []
             for slot in common_slots:
                 score = await self._score_meeting_slot(
-                    slot, attendees, {aid: data['preferences'] for aid, data in attendee_data.items()},
+                    slot, attendees, attendee_preferences,
                     room_requirements, optimization_goals or []
                 )
                 scored_slots.append({
@@ -441,22 +451,92 @@ class SmartSchedulingStrategy:
         await self.cache_manager.set(cache_key, context, ttl=900)
         return context
     
+    def _meeting_time_range(self, time_range: Tuple[datetime, datetime] = None) -> Tuple[datetime, datetime]:
+        if time_range: return time_range
+        now = datetime.now().replace(second=0, microsecond=0)
+        return now, now + timedelta(days=MEETING_SEARCH_DAYS)
+    
+    def _working_intervals(self, time_range: Tuple[datetime, datetime]) -> List[Tuple[int, int]]:
+        """Weekday working hours inside the range as [start, end) timestamps."""
+        range_start, range_end = int(time_range[0].timestamp()), int(time_range[1].timestamp())
+        intervals = []
+        day = time_range[0].replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < time_range[1]:
+            if day.weekday() < 5:
+                start = max(range_start, int(day.replace(hour=MEETING_DAY_START_HOUR).timestamp()))
+                end = min(range_end, int(day.replace(hour=MEETING_DAY_END_HOUR).timestamp()))
+                if end > start:
+                    intervals.append((start, end))
+            day += timedelta(days=1)
+        return intervals
+    
+    async def _load_attendee_availability(self, attendees: List[int],
+                                          time_range: Tuple[datetime, datetime]) -> Dict[int, List[Dict]]:
+        """Free slots of every attendee in the range, from a single query over all their bookings."""
+        range_start, range_end = int(time_range[0].timestamp()), int(time_range[1].timestamp())
+        rows = self.db.query(MRBSEntry.create_by, MRBSEntry.start_time, MRBSEntry.end_time).filter(
+            MRBSEntry.create_by.in_([str(attendee_id) for attendee_id in attendees]),
+            MRBSEntry.start_time < range_end,
+            MRBSEntry.end_time > range_start
+        ).all()
+        
+        busy = {str(attendee_id): [] for attendee_id in attendees}
+        for user_id, start_ts, end_ts in rows:
+            busy[user_id].append((start_ts, end_ts))
+        
+        return {
+            attendee_id: [
+                {'start_time': datetime.fromtimestamp(start), 'end_time': datetime.fromtimestamp(end)}
+                for start, end in complement_intervals(busy[str(attendee_id)], (range_start, range_end))
+            ]
+            for attendee_id in attendees
+        }
+    
+    def _room_free_intervals(self, room_requirements: Optional[Dict[str, Any]],
+                             time_range: Tuple[datetime, datetime]) -> Optional[List[Tuple[int, int]]]:
+        """Free gaps of the requested room, or None when no specific room is required."""
+        if not room_requirements: return None
+        room_id = room_requirements.get('room_id')
+        if room_id is None and room_requirements.get('room_name'):
+            room = self.db.query(MRBSRoom.id).filter(MRBSRoom.room_name == room_requirements['room_name']).first()
+            if room is None: return []
+            room_id = room.id
+        if room_id is None: return None
+        return booking_index.free_gaps(
+            int(room_id), int(time_range[0].timestamp()), int(time_range[1].timestamp()), self.db, active_only=True
+        )
+    
     def _find_common_available_slots(self, attendee_availability: Dict[int, List[Dict]], 
-                                   duration_minutes: int, time_range: Tuple[datetime, datetime] = None) -> List[Dict[str, Any]]:
+                                   duration_minutes: int, time_range: Tuple[datetime, datetime] = None,
+                                   room_free: Optional[List[Tuple[int, int]]] = None) -> List[Dict[str, Any]]:
+        """
+        Meeting slots free for every attendee (and the room, if given) within working hours.
+        
+        All free-interval lists are intersected in one sweep; each maximal common
+        window yields slots of `duration_minutes` starting at the window start and
+        then on every MEETING_SLOT_STEP_MINUTES boundary that still fits.
+        """
         if not attendee_availability: return []
         
-        common_slots = []
-        first_attendee = list(attendee_availability.keys())[0]
-        base_slots = attendee_availability[first_attendee]
+        free_lists = [
+            [(int(slot['start_time'].timestamp()), int(slot['end_time'].timestamp())) for slot in availability]
+            for availability in attendee_availability.values()
+        ]
+        free_lists.append(self._working_intervals(self._meeting_time_range(time_range)))
+        if room_free is not None:
+            free_lists.append(room_free)
         
-        for slot in base_slots:
-            if all(self._is_time_available_for_user(slot['start_time'], slot['end_time'], availability) 
-                   for availability in attendee_availability.values()):
-                if (slot['end_time'] - slot['start_time']).total_seconds() >= duration_minutes * 60:
-                    common_slots.append({
-                        'start_time': slot['start_time'],
-                        'end_time': slot['start_time'] + timedelta(minutes=duration_minutes)
-                    })
+        duration = duration_minutes * 60
+        step = MEETING_SLOT_STEP_MINUTES * 60
+        common_slots = []
+        for window_start, window_end in common_free_windows(free_lists, duration):
+            start = window_start
+            while start + duration <= window_end:
+                common_slots.append({
+                    'start_time': datetime.fromtimestamp(start),
+                    'end_time': datetime.fromtimestamp(start + duration)
+                })
+                start = (start // step + 1) * step
         return common_slots
     
     async def _score_meeting_slot(self, slot: Dict[str, Any], attendees: List[int],
@@ -531,12 +611,14 @@ class SmartSchedulingStrategy:
         
         return reasoning
     
-    # Placeholder methods for missing functionality
     async def _get_user_availability(self, user_id: int, time_range: Tuple[datetime, datetime]) -> List[Dict]:
-        return [{'start_time': datetime.now(), 'end_time': datetime.now() + timedelta(hours=1)}]
+        availability = await self._load_attendee_availability([user_id], self._meeting_time_range(time_range))
+        return availability[user_id]
     
     def _is_time_available_for_user(self, start_time, end_time, availability) -> bool:
-        return True
+        return any(slot['start_time'] <= start_time and end_time <= slot['end_time'] for slot in availability)
+    
+    # Placeholder methods for missing functionality
     
     async def _score_conflict_likelihood(self, slot, attendees) -> float:
         return 0.8
@@ -0,0 +1,70 @@
+# recommendtion/recommendations/utils/interval_sweep.py
+import heapq
+from typing import Iterable, List, Sequence, Tuple
+
+Interval = Tuple[int, int]
+
+
+def normalize_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sort [start, end) intervals and merge the ones that overlap or touch."""
+    merged: List[Interval] = []
+    for start, end in sorted(i for i in intervals if i[1] > i[0]):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def complement_intervals(busy: Iterable[Interval], window: Interval) -> List[Interval]:
+    """Free [start, end) gaps of `window` not covered by any busy interval."""
+    window_start, window_end = window
+    free = []
+    cursor = window_start
+    for start, end in normalize_intervals(busy):
+        if end <= cursor:
+            continue
+        if start >= window_end:
+            break
+        if start > cursor:
+            free.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < window_end:
+        free.append((cursor, window_end))
+    return free
+
+
+def common_free_windows(free_lists: Sequence[Iterable[Interval]], min_length: int = 0) -> List[Interval]:
+    """
+    Maximal windows covered by every list of free intervals, at least `min_length` long.
+
+    Each list is normalized (sorted, non-overlapping), then all start/end
+    events are k-way merged with a heap and swept once: a window is open
+    while all k lists are covering the sweep position. O(n log k) for n
+    intervals in total.
+    """
+    lists = [normalize_intervals(intervals) for intervals in free_lists]
+    if not lists or any(not intervals for intervals in lists):
+        return []
+    k = len(lists)
+
+    def events(intervals):
+        # Ends sort before starts at the same instant so touching intervals
+        # from different lists do not count as an overlap
+        for start, end in intervals:
+            yield (start, 1)
+            yield (end, -1)
+
+    windows: List[Interval] = []
+    covering = 0
+    window_start = None
+    for position, delta in heapq.merge(*(events(intervals) for intervals in lists)):
+        covering += delta
+        if covering == k:
+            window_start = position
+        elif window_start is not None:
+            if position - window_start >= max(min_length, 1):
+                windows.append((window_start, position))
+            window_start = None
+    return windows
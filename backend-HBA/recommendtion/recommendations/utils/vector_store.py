@@ -4,22 +4,106 @@ import sqlite3
 import json
 import os
 from pathlib import Path
-from sklearn.metrics.pairwise import cosine_similarity
 from datetime import datetime, timedelta
 import logging
 import tempfile
+import threading
 
 logger = logging.getLogger(__name__)
 
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class _Snapshot:
+    """
+    Immutable columnar copy of room_vectors: ids, metadata arrays for filter
+    masks and pre-normalized float32 matrices (one per embedding dimension).
+    """
+
+    __slots__ = ("room_vectors", "ids", "capacity", "location", "feature_index", "feature_matrix",
+                 "matrices", "version", "loaded_at")
+
+    def __init__(self, room_vectors: Dict[str, Dict], version: Optional[int], loaded_at: Optional[datetime] = None):
+        self.room_vectors = room_vectors
+        self.ids = list(room_vectors)
+        infos = [room_vectors[room_id] for room_id in self.ids]
+        self.capacity = np.array([info['room_data']['capacity'] or 0 for info in infos], dtype=np.int64)
+        self.location = np.array(
+            [info['room_data']['metadata'].get('location', '') for info in infos], dtype=object
+        )
+        feature_index: Dict[str, int] = {}
+        for info in infos:
+            for feature in info['room_data']['features']:
+                feature_index.setdefault(str(feature).lower(), len(feature_index))
+        feature_matrix = np.zeros((len(infos), len(feature_index)), dtype=bool)
+        for row, info in enumerate(infos):
+            for feature in info['room_data']['features']:
+                feature_matrix[row, feature_index[str(feature).lower()]] = True
+        self.feature_index = feature_index
+        self.feature_matrix = feature_matrix
+        
+        grouped: Dict[int, Tuple[List[np.ndarray], List[int]]] = {}
+        for position, info in enumerate(infos):
+            rows, positions = grouped.setdefault(info['embedding'].shape[-1], ([], []))
+            rows.append(info['embedding'])
+            positions.append(position)
+        self.matrices: Dict[int, Tuple[np.ndarray, np.ndarray]] = {
+            dim: (
+                np.ascontiguousarray(_normalize_rows(np.asarray(rows, dtype=np.float32))),
+                np.asarray(positions, dtype=np.int64),
+            )
+            for dim, (rows, positions) in grouped.items()
+        }
+        self.version = version
+        self.loaded_at = loaded_at
+    
+    def filter_mask(self, filters: Dict[str, Any] = None) -> np.ndarray:
+        """Boolean mask over the rooms for min/max_capacity, location, features and room_ids filters."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        if not filters:
+            return mask
+        if filters.get('min_capacity') is not None:
+            mask &= self.capacity >= filters['min_capacity']
+        if filters.get('max_capacity') is not None:
+            mask &= self.capacity <= filters['max_capacity']
+        location = filters.get('location') or filters.get('area')
+        if location:
+            mask &= self.location == location
+        for feature in filters.get('features') or []:
+            column = self.feature_index.get(str(feature).lower())
+            if column is None:
+                return np.zeros(len(self.ids), dtype=bool)
+            mask &= self.feature_matrix[:, column]
+        if filters.get('room_ids') is not None:
+            wanted = {str(room_id) for room_id in filters['room_ids']}
+            mask &= np.fromiter((room_id in wanted for room_id in self.ids), dtype=bool, count=len(self.ids))
+        return mask
+
+
+_EMPTY_SNAPSHOT = _Snapshot({}, None)
+
+
 class VectorStore:
     def __init__(self, db_path: str = None):
         if db_path is None:
             db_path = os.getenv('VECTOR_DB_PATH', 'cache/vector_store.db')
         self.db_path = self._ensure_valid_db_path(db_path)
         self._init_database()
-        self._room_vectors = {}
-        self._last_cache_update = None
-        self._cache_ttl = timedelta(minutes=30)
+        # Replaced as a whole under _lock, so a search that took a reference
+        # never mixes ids and matrices from two loads
+        self._snapshot = _EMPTY_SNAPSHOT
+        self._lock = threading.Lock()
+        # Set by local writes; forces a reload even if the version looks unchanged
+        self._reload = True
+        # One read connection per thread for the per-search version check
+        self._local = threading.local()
+        self._readers_lock = threading.Lock()
+        self._readers: List[sqlite3.Connection] = []
+        self._embedding_model = None
         logger.info(f"VectorStore initialized with database: {self.db_path}")
     
     def _ensure_valid_db_path(self, db_path: str) -> str:
@@ -64,6 +148,16 @@ class VectorStore:
             ''')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_room_capacity ON room_vectors(capacity)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_room_updated ON room_vectors(updated_at)')
+            # Single-row version counter bumped by triggers on every change, so
+            # readers can tell whether their cached copy is stale
+            cursor.execute('CREATE TABLE IF NOT EXISTS room_vectors_version (version INTEGER NOT NULL)')
+            cursor.execute('INSERT INTO room_vectors_version (version) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM room_vectors_version)')
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS room_vectors_version_{event.lower()}
+                    AFTER {event} ON room_vectors
+                    BEGIN UPDATE room_vectors_version SET version = version + 1; END
+                ''')
             conn.commit()
             conn.close()
             logger.info("Vector store database initialized successfully")
@@ -100,21 +194,22 @@ class VectorStore:
             ''', (room_id, room_name, description, capacity, features, embedding_bytes, metadata))
             conn.commit()
             conn.close()
-            self._room_vectors[room_id] = {
-                'embedding': embedding,
-                'room_data': room_data,
-                'updated_at': datetime.now()
-            }
+            self._reload = True
             logger.info(f"Added room vector for room {room_id}")
             return True
         except Exception as e:
             logger.error(f"Failed to add room vector: {e}")
             return False
     
+    def _get_embedding_model(self):
+        if self._embedding_model is None:
+            from ..models.embedding_model import EmbeddingModel
+            self._embedding_model = EmbeddingModel()
+        return self._embedding_model
+    
     def _generate_room_embedding(self, room_data: Dict[str, Any]) -> np.ndarray:
         try:
-            from ..models.embedding_model import EmbeddingModel
-            embedding_model = EmbeddingModel()
+            embedding_model = self._get_embedding_model()
             text_parts = []
             if room_data.get('name'):
                 text_parts.append(room_data['name'])
@@ -166,41 +261,85 @@ class VectorStore:
             features[100:] = np.random.normal(0, 0.1, 28)
         return features
     
+    @staticmethod
+    def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Indices of the top_k highest scores, best first."""
+        if top_k >= scores.shape[-1]:
+            return np.argsort(-scores)
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        return candidates[np.argsort(-scores[candidates])]
+    
+    def _rank_scores(self, snapshot: _Snapshot, scores: np.ndarray, positions: np.ndarray, mask: np.ndarray,
+                     top_k: int) -> List[Dict[str, Any]]:
+        allowed = mask[positions]
+        count = min(top_k, int(allowed.sum()))
+        if count == 0:
+            return []
+        scores = np.where(allowed, scores, -np.inf)
+        return [
+            {
+                'room_id': snapshot.ids[positions[i]],
+                'similarity': float(scores[i]),
+                'room_data': snapshot.room_vectors[snapshot.ids[positions[i]]]['room_data']
+            }
+            for i in self._top_k(scores, count).tolist()
+        ]
+    
+    def _rank(self, snapshot: _Snapshot, query_embedding: np.ndarray, mask: np.ndarray,
+              top_k: int) -> List[Dict[str, Any]]:
+        entry = snapshot.matrices.get(query_embedding.shape[-1]) if query_embedding is not None else None
+        if entry is None:
+            logger.warning("No room vectors match the query embedding dimension")
+            return []
+        matrix, positions = entry
+        query = _normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+        return self._rank_scores(snapshot, matrix @ query, positions, mask, top_k)
+    
     def search_similar_rooms(self, query: str, top_k: int = 5, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         try:
             query_embedding = self._generate_query_embedding(query)
-            room_vectors = self._get_all_room_vectors(filters)
-            if not room_vectors:
+            snapshot = self._refresh_cache()
+            if not snapshot.ids:
                 logger.warning("No room vectors found in database")
                 return []
-            similarities = []
-            for room_id, room_info in room_vectors.items():
-                try:
-                    similarity = cosine_similarity(
-                        query_embedding.reshape(1, -1),
-                        room_info['embedding'].reshape(1, -1)
-                    )[0][0]
-                    similarities.append({
-                        'room_id': room_id,
-                        'similarity': float(similarity),
-                        'room_data': room_info['room_data']
-                    })
-                except Exception as e:
-                    logger.warning(f"Error calculating similarity for room {room_id}: {e}")
-                    continue
-            similarities.sort(key=lambda x: x['similarity'], reverse=True)
-            results = similarities[:top_k]
+            results = self._rank(snapshot, query_embedding, snapshot.filter_mask(filters), top_k)
             logger.info(f"Found {len(results)} similar rooms for query: {query}")
             return results
         except Exception as e:
             logger.error(f"Failed to search similar rooms: {e}")
             return []
     
+    def search_similar_rooms_batch(self, queries: List[str], top_k: int = 5,
+                                   filters: Dict[str, Any] = None) -> List[List[Dict[str, Any]]]:
+        """Top-k rooms for many queries with one embedding batch and one matrix product per dimension."""
+        try:
+            if not queries:
+                return []
+            snapshot = self._refresh_cache()
+            if not snapshot.ids:
+                logger.warning("No room vectors found in database")
+                return [[] for _ in queries]
+            mask = snapshot.filter_mask(filters)
+            query_embeddings = self._generate_query_embeddings(queries)
+            entry = snapshot.matrices.get(query_embeddings.shape[-1])
+            if entry is None:
+                return [self._rank(snapshot, q, mask, top_k) for q in query_embeddings]
+            matrix, positions = entry
+            scores = _normalize_rows(query_embeddings.astype(np.float32)) @ matrix.T
+            return [self._rank_scores(snapshot, row, positions, mask, top_k) for row in scores]
+        except Exception as e:
+            logger.error(f"Failed to batch search similar rooms: {e}")
+            return [[] for _ in queries]
+    
+    def _generate_query_embeddings(self, queries: List[str]) -> np.ndarray:
+        try:
+            return self._get_embedding_model().embed_many(queries)
+        except ImportError:
+            return np.stack([self._simple_query_embedding(query) for query in queries])
+    
     def _generate_query_embedding(self, query: str) -> np.ndarray:
         try:
-            from ..models.embedding_model import EmbeddingModel
-            embedding_model = EmbeddingModel()
-            return embedding_model.get_room_embedding(query)
+            return self._get_embedding_model().get_room_embedding(query)
         except ImportError:
             return self._simple_query_embedding(query)
     
@@ -233,29 +372,43 @@ class VectorStore:
             features = features / norm
         return features
     
-    def _get_all_room_vectors(self, filters: Dict[str, Any] = None) -> Dict[str, Dict]:
-        try:
-            if (self._last_cache_update and 
-                datetime.now() - self._last_cache_update < self._cache_ttl and
-                not filters):
-                return self._room_vectors
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            query = "SELECT * FROM room_vectors"
-            params = []
-            if filters:
-                conditions = []
-                if 'min_capacity' in filters:
-                    conditions.append("capacity >= ?")
-                    params.append(filters['min_capacity'])
-                if 'max_capacity' in filters:
-                    conditions.append("capacity <= ?")
-                    params.append(filters['max_capacity'])
-                if conditions:
-                    query += " WHERE " + " AND ".join(conditions)
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Only ever used by this thread; close() may close it from another one
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+    
+    def _drop_reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            with self._readers_lock:
+                if conn in self._readers:
+                    self._readers.remove(conn)
             conn.close()
+    
+    def _table_version(self, conn) -> int:
+        row = conn.execute("SELECT version FROM room_vectors_version").fetchone()
+        return row[0] if row else 0
+    
+    def _refresh_cache(self) -> _Snapshot:
+        """The current snapshot, reloaded first if room_vectors changed since it was built."""
+        snapshot = self._snapshot
+        try:
+            conn = self._reader()
+            try:
+                reload, self._reload = self._reload, False
+                version = self._table_version(conn)
+                if version == snapshot.version and not reload:
+                    return snapshot
+                rows = conn.execute("SELECT * FROM room_vectors").fetchall()
+            except sqlite3.Error:
+                self._drop_reader()
+                raise
             room_vectors = {}
             for row in rows:
                 try:
@@ -282,13 +435,23 @@ class VectorStore:
                 except Exception as e:
                     logger.warning(f"Error processing room vector for room {row[0] if row else 'unknown'}: {e}")
                     continue
-            if not filters:
-                self._room_vectors = room_vectors
-                self._last_cache_update = datetime.now()
-            return room_vectors
+            fresh = _Snapshot(room_vectors, version, datetime.now())
+            with self._lock:
+                # A slower concurrent load of an older version must not win
+                if self._snapshot.version is None or self._snapshot.version <= version:
+                    self._snapshot = fresh
+                return self._snapshot
         except Exception as e:
+            self._reload = True
             logger.error(f"Failed to get room vectors: {e}")
-            return {}
+            return snapshot
+    
+    def _get_all_room_vectors(self, filters: Dict[str, Any] = None) -> Dict[str, Dict]:
+        snapshot = self._refresh_cache()
+        if not filters:
+            return snapshot.room_vectors
+        mask = snapshot.filter_mask(filters)
+        return {snapshot.ids[i]: snapshot.room_vectors[snapshot.ids[i]] for i in np.flatnonzero(mask).tolist()}
     
     def get_room_vector(self, room_id: str) -> Optional[np.ndarray]:
         try:
@@ -309,8 +472,7 @@ class VectorStore:
             deleted_count = cursor.rowcount
             conn.commit()
             conn.close()
-            if room_id in self._room_vectors:
-                del self._room_vectors[room_id]
+            self._reload = True
             logger.info(f"Removed room vector for {room_id}")
             return deleted_count > 0
         except Exception as e:
@@ -331,8 +493,8 @@ class VectorStore:
                 'avg_capacity': capacity_stats[0] if capacity_stats[0] else 0,
                 'min_capacity': capacity_stats[1] if capacity_stats[1] else 0,
                 'max_capacity': capacity_stats[2] if capacity_stats[2] else 0,
-                'cache_size': len(self._room_vectors),
-                'last_cache_update': self._last_cache_update.isoformat() if self._last_cache_update else None,
+                'cache_size': len(self._snapshot.ids),
+                'last_cache_update': self._snapshot.loaded_at.isoformat() if self._snapshot.loaded_at else None,
                 'database_path': self.db_path
             }
         except Exception as e:
@@ -340,8 +502,9 @@ class VectorStore:
             return {'error': str(e)}
     
     def clear_cache(self):
-        self._room_vectors.clear()
-        self._last_cache_update = None
+        with self._lock:
+            self._snapshot = _EMPTY_SNAPSHOT
+        self._reload = True
         logger.info("Vector store cache cleared")
     
     def test_connection(self) -> bool:
@@ -359,4 +522,9 @@ class VectorStore:
     
     def close(self):
         self.clear_cache()
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
+        self._local = threading.local()
         logger.info("Vector store closed")
\ No newline at end of file
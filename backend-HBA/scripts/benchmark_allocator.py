@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark batch timetable allocation on a synthetic faculty')
+    parser.add_argument('--modules', type=int, default=500)
+    parser.add_argument('--rooms', type=int, default=60)
+    parser.add_argument('--sessions-per-module', type=int, default=2)
+    parser.add_argument('--existing-bookings', type=int, default=2000)
+    parser.add_argument('--semester-start', default='2026-02-02')
+    parser.add_argument('--weeks', type=int, default=15)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-baseline', action='store_true', help='Do not run the one-booking-at-a-time baseline')
+    return parser.parse_args()
+
+
+args = parse_args()
+workdir = tempfile.mkdtemp(prefix="allocator_bench_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/faculty.db")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src import models
+from src.database import Base
+from src.availability_logic import fetch_halls_by_module_code
+from src.recurrence.recurrence_service import create_recurring_booking, expand_occurrences
+from src.timetable_allocator import TimetableSession, WEEKDAY_CODES, allocate_timetable
+
+ROOM_SIZES = [((25, 60), 0.40), ((60, 150), 0.35), ((150, 300), 0.20), ((300, 500), 0.05)]
+CLASS_SIZES = [((10, 50), 0.45), ((50, 120), 0.35), ((120, 250), 0.15), ((250, 450), 0.05)]
+SESSION_TIMES = [("08:00", 120), ("10:00", 120), ("13:00", 120), ("15:00", 120), ("12:00", 60), ("17:00", 60)]
+
+
+def sized(rng, buckets):
+    (low, high), = rng.choices([b for b, _ in buckets], weights=[w for _, w in buckets])
+    return rng.randint(low, high)
+
+
+def generate(path, rng, semester_start, semester_end):
+    """Areas, rooms, modules and scattered one-off bookings; returns the timetable to allocate."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.now()
+
+    db.add_all([models.MRBSArea(id=a + 1, area_name=f"Building {a + 1}") for a in range(max(1, args.rooms // 15))])
+    db.add(models.MRBSUser(id=1, email="faculty@example.com", name="Faculty Office"))
+    db.add_all([
+        models.MRBSRoom(id=r + 1, area_id=r % max(1, args.rooms // 15) + 1, room_name=f"Hall {r + 1}",
+                        capacity=sized(rng, ROOM_SIZES), description="Lecture hall")
+        for r in range(args.rooms)
+    ])
+    codes = [f"MOD{m:04d}" for m in range(args.modules)]
+    db.add_all([
+        models.MRBSModule(module_code=code, number_of_students=sized(rng, CLASS_SIZES), lecture_id=1)
+        for code in codes
+    ])
+
+    start_ts = int(datetime.combine(semester_start, datetime.min.time()).timestamp())
+    span = int(datetime.combine(semester_end, datetime.min.time()).timestamp()) - start_ts
+    for _ in range(args.existing_bookings):
+        begin = start_ts + rng.randrange(0, span // 1800) * 1800
+        db.add(models.MRBSEntry(
+            start_time=begin, end_time=begin + rng.choice([3600, 7200, 10800]),
+            room_id=rng.randint(1, args.rooms), timestamp=now, create_by="seed", name="Existing booking",
+        ))
+    db.commit()
+    db.close()
+    engine.dispose()
+
+    sessions = []
+    for code in codes:
+        for weekday in rng.sample(range(5), args.sessions_per_module):
+            start_time, duration = rng.choice(SESSION_TIMES)
+            sessions.append(TimetableSession(code, weekday, start_time, duration))
+    return sessions
+
+
+def open_session(path):
+    return sessionmaker(bind=create_engine(f"sqlite:///{path}"))()
+
+
+def run_batch(path, sessions, semester_start, semester_end):
+    db = open_session(path)
+    started = time.perf_counter()
+    result = allocate_timetable(sessions, semester_start.isoformat(), semester_end.isoformat(), "benchmark", db)
+    elapsed = time.perf_counter() - started
+    db.close()
+    return elapsed, len(result["allocated"]), result["stats"]["wasted_seats"], result["stats"]["bookings_created"]
+
+
+def run_baseline(path, sessions, semester_start, semester_end):
+    """Each session booked on its own: list the halls that seat the module, try them in turn."""
+    db = open_session(path)
+    capacity = dict(db.query(models.MRBSRoom.room_name, models.MRBSRoom.capacity).all())
+    students = dict(db.query(models.MRBSModule.module_code, models.MRBSModule.number_of_students).all())
+    allocated, wasted, bookings = 0, 0, 0
+    started = time.perf_counter()
+    for session in sessions:
+        occurrences = expand_occurrences(
+            f"FREQ=WEEKLY;BYDAY={WEEKDAY_CODES[session.weekday]}", semester_start.isoformat(),
+            semester_end.isoformat(), session.start_time, session.end_time,
+        )
+        for hall in fetch_halls_by_module_code(session.module_code, db):
+            result = create_recurring_booking(hall, session.module_code, occurrences, "benchmark", db)
+            if result["status"] == "success":
+                allocated += 1
+                wasted += capacity[hall] - students[session.module_code]
+                bookings += len(result["bookings"])
+                break
+    elapsed = time.perf_counter() - started
+    db.close()
+    return elapsed, allocated, wasted, bookings
+
+
+def main():
+    rng = random.Random(args.seed)
+    semester_start = date.fromisoformat(args.semester_start)
+    semester_end = semester_start + timedelta(weeks=args.weeks) - timedelta(days=1)
+    seed_path = os.path.join(workdir, "seed.db")
+    sessions = generate(seed_path, rng, semester_start, semester_end)
+    print(f"Synthetic faculty: {args.modules} modules, {len(sessions)} sessions, {args.rooms} rooms, "
+          f"{args.existing_bookings} existing bookings, {args.weeks} weeks")
+
+    runs = [("batch allocator", run_batch)]
+    if not args.skip_baseline:
+        runs.append(("one at a time", run_baseline))
+    print(f"{'approach':<18}{'seconds':>10}{'allocated':>12}{'wasted seats':>15}{'bookings':>11}")
+    try:
+        for label, run in runs:
+            path = os.path.join(workdir, f"{label.replace(' ', '_')}.db")
+            shutil.copy(seed_path, path)
+            elapsed, allocated, wasted, bookings = run(path, sessions, semester_start, semester_end)
+            print(f"{label:<18}{elapsed:>10.2f}{allocated:>12}{wasted:>15}{bookings:>11}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import sys
+import logging
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+from data.embeddings.embedding_manager import EmbeddingManager
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact the memory-mapped embedding stores')
+    parser.add_argument('--base-path', default='data/embeddings', help='EmbeddingManager base path')
+    args = parser.parse_args()
+
+    embedding_mgr = EmbeddingManager(args.base_path, backend="mmap")
+    try:
+        reclaimed = embedding_mgr.compact()
+        for table, rows in reclaimed.items():
+            print(f"{table}: reclaimed {rows} rows")
+    finally:
+        embedding_mgr.close()
+
+if __name__ == "__main__":
+    main()
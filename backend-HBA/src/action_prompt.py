@@ -0,0 +1,92 @@
+ACTION_PROMPT = """
+You are an intelligent assistant that helps manage room bookings.
+
+From the following user request:
+"{question}"
+
+Extract the **action** and its corresponding **parameters** in **strict JSON format**.
+
+Supported actions:
+- "check_availability"
+- "add_booking"
+- "cancel_booking"
+- "alternatives"
+- "update_booking" 
+
+If the request is not related to any of these actions, return:
+{{ "action": "unsupported", "parameters": {{}} }}
+
+Required JSON structure:
+{{
+  "action": "check_availability" | "add_booking" | "cancel_booking" | "alternatives",
+  "parameters": {{
+    "room_name": "...",
+    "date": "yyyy-mm-dd",
+    "start_time": "HH:MM",
+    "end_time": "HH:MM",
+    "booking_id": "..."  # Only needed for cancel_booking
+  }}
+  
+   "action": "update_booking",
+  "parameters": {{
+    "original_room_name": "...",
+    "original_date": "yyyy-mm-dd", 
+    "original_start_time": "HH:MM",
+    "original_end_time": "HH:MM",
+    "new_room_name": "..." (optional),
+    "new_date": "yyyy-mm-dd" (optional),
+    "new_start_time": "HH:MM" (optional), 
+    "new_end_time": "HH:MM" (optional)
+  }}
+}}
+
+Respond in **only JSON format**, without explanations.
+"""
+
+COMBINED_PROMPT = """
+You are an intelligent assistant that helps manage room bookings.
+
+From the following user request:
+"{question}"
+
+Extract the **action**, its **parameters** and any **recurrence** pattern in **strict JSON format**.
+
+Supported actions:
+- "check_availability"
+- "add_booking"
+- "cancel_booking"
+- "alternatives"
+- "update_booking"
+
+If the request is not related to any of these actions, use:
+{{ "action": "unsupported", "parameters": {{}} }}
+
+Required JSON structure:
+{{
+  "action": "check_availability" | "add_booking" | "cancel_booking" | "alternatives" | "update_booking",
+  "parameters": {{
+    "room_name": "...",
+    "date": "yyyy-mm-dd",
+    "start_time": "HH:MM",
+    "end_time": "HH:MM",
+    "booking_id": "..."  # Only needed for cancel_booking
+  }},
+  "recurrence": {{
+    "is_recurring": true | false,
+    "frequency": "daily" | "weekly" | "monthly",
+    "days_of_week": ["Monday", "Wednesday"],   // only for weekly
+    "start_time": "HH:MM",
+    "end_time": "HH:MM",
+    "start_date": "YYYY-MM-DD",
+    "end_date": "YYYY-MM-DD"  // last day of recurrence
+  }}
+}}
+
+For update_booking use the parameters original_room_name, original_date,
+original_start_time, original_end_time and optionally new_room_name, new_date,
+new_start_time, new_end_time.
+
+If the request is not a recurring booking, return "recurrence": {{ "is_recurring": false }}.
+
+Respond in **only JSON format**, without explanations.
+"""
@@ -1,16 +1,25 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from src.database import get_db
+from src.database import get_route_db
 from src.deepseek_llm import DeepSeekLLM
 from src.entity_extraction import extract_entities
+from src.extraction_cache import extraction_cache
+from src.session_store import create_session_backend
 from src.recurrence.recurrence_service import handle_recurring_booking
-from src.recurrence.recurrence_prompt import RECURRENCE_PROMPT
-from src.recurrence.recurrence_parser import extract_recurrence
+from src.recurrence.recurrence_parser import has_recurrence_cue
+from src.action_prompt import ACTION_PROMPT, COMBINED_PROMPT
 from src.recurrence.recurrence_utils import build_rrule_from_extracted
 import json
 import re
 from datetime import datetime
-from src.availability_logic import check_availability, add_booking, check_available_slotes,book_recommendation_directly, cancel_booking,update_booking
+from src.availability_logic import (
+    check_availability_async,
+    add_booking_async,
+    check_available_slotes_async,
+    book_recommendation_directly_async,
+    cancel_booking_async,
+    update_booking_async,
+)
 from typing import Dict, Any, Optional, List
 
 
@@ -52,8 +61,8 @@ FALLBACK_QUESTIONS = {
     "original_end_time": "What was the original end time?",
 }
 
-# In-memory session store
-session_store = {}
+# Chat session store (memory or SQLite, see SESSION_BACKEND)
+session_store = create_session_backend()
 
 def get_missing_params(params: dict, required_fields: list[str]) -> list[str]:
     return [f for f in required_fields if f not in params or not params[f]]
@@ -65,8 +74,26 @@ def validate_time_format(time_str: str) -> bool:
     except ValueError:
         return False
 
+async def extract_with_llm(kind: str, prompt: str, question: str):
+    """
+    Parsed JSON for an extraction prompt, served from the extraction cache when possible.
+
+    The cleaned LLM response is None on a cache hit; only fresh responses are put back.
+    """
+    parsed = extraction_cache.get(kind, question)
+    if parsed is not None:
+        return parsed, None
+    llm = DeepSeekLLM()
+    try:
+        llm_response = await llm._acall(prompt)
+        cleaned_response = re.sub(r"^```json|```$", "", llm_response.strip(), flags=re.MULTILINE).strip()
+        parsed = json.loads(cleaned_response)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"LLM call/parse error: {str(e)}")
+    return parsed, cleaned_response
+
 @router.post("/ask_llm/")
-async def ask_llm(request: QuestionRequest, db=Depends(get_db)):
+async def ask_llm(request: QuestionRequest, db=Depends(get_route_db)):
     session_id = request.session_id
     question = request.question.strip()
     session = session_store.get(session_id, {
@@ -82,10 +109,16 @@ async def ask_llm(request: QuestionRequest, db=Depends(get_db)):
         session["params"][last_param] = question
         session["missing_fields"] = [f for f in session["missing_fields"] if f != last_param]
         session["last_asked"] = None
-        session_store[session_id] = session
+        session_store.set(session_id, session)
     else:
-        # First, try to detect recurrence
-        recurrence_data = extract_recurrence(question)
+        # One LLM round trip per turn: only questions with a recurrence cue
+        # need the combined prompt, the rest go straight to action extraction
+        if has_recurrence_cue(question):
+            kind, prompt = "combined", COMBINED_PROMPT.format(question=question)
+        else:
+            kind, prompt = "action", ACTION_PROMPT.format(question=question)
+        parsed, cleaned_response = await extract_with_llm(kind, prompt, question)
+        recurrence_data = parsed.get("recurrence") or {"is_recurring": False}
 
         if recurrence_data.get("is_recurring"):
             # Build RRULE string
@@ -98,7 +131,7 @@ async def ask_llm(request: QuestionRequest, db=Depends(get_db)):
             params = {
                 "action": "add_recurring_booking",
                 "parameters": {
-                    "room_name": None,
+                    "room_name": (parsed.get("parameters") or {}).get("room_name"),
                     "start_date": recurrence_data.get("start_date"),
                     "end_date": recurrence_data.get("end_date"),
                     "start_time": recurrence_data.get("start_time"),
@@ -112,71 +145,22 @@ async def ask_llm(request: QuestionRequest, db=Depends(get_db)):
             extracted = extract_entities(question)
             if "room_name" in extracted:
                 params["parameters"]["room_name"] = extracted["room_name"]
+            if cleaned_response is not None:
+                extraction_cache.put(kind, question, parsed)
 
             session["action"] = params["action"]
             session["params"] = params["parameters"]
             session["last_asked"] = None
-            session_store[session_id] = session
+            session_store.set(session_id, session)
         else:
-            # Use standard LLM prompt for action extraction
-            llm = DeepSeekLLM()
-            prompt = f"""
-You are an intelligent assistant that helps manage room bookings.
-
-From the following user request:
-\"{question}\"
-
-Extract the **action** and its corresponding **parameters** in **strict JSON format**.
-
-Supported actions:
-- "check_availability"
-- "add_booking"
-- "cancel_booking"
-- "alternatives"
-- "update_booking" 
-
-If the request is not related to any of these actions, return:
-{{ "action": "unsupported", "parameters": {{}} }}
-
-Required JSON structure:
-{{
-  "action": "check_availability" | "add_booking" | "cancel_booking" | "alternatives",
-  "parameters": {{
-    "room_name": "...",
-    "date": "yyyy-mm-dd",
-    "start_time": "HH:MM",
-    "end_time": "HH:MM",
-    "booking_id": "..."  # Only needed for cancel_booking
-  }}
-  
-   "action": "update_booking",
-  "parameters": {{
-    "original_room_name": "...",
-    "original_date": "yyyy-mm-dd", 
-    "original_start_time": "HH:MM",
-    "original_end_time": "HH:MM",
-    "new_room_name": "..." (optional),
-    "new_date": "yyyy-mm-dd" (optional),
-    "new_start_time": "HH:MM" (optional), 
-    "new_end_time": "HH:MM" (optional)
-  }}
-}}
-
-Respond in **only JSON format**, without explanations.
-"""
-            try:
-                llm_response = llm._call(prompt)
-                cleaned_response = re.sub(r"^```json|```$", "", llm_response.strip(), flags=re.MULTILINE).strip()
-                parsed = json.loads(cleaned_response)
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"LLM call/parse error: {str(e)}")
-
             if "action" not in parsed or "parameters" not in parsed:
                 return {
                     "status": "llm_response_invalid",
                     "message": "LLM did not return a valid action or parameters.",
                     "llm_response": cleaned_response
                 }
+            if cleaned_response is not None:
+                extraction_cache.put(kind, question, parsed)
 
             action = parsed["action"]
             params = parsed["parameters"]
@@ -196,7 +180,7 @@ Respond in **only JSON format**, without explanations.
             session["action"] = action
             session["params"] = params
             session["last_asked"] = None
-            session_store[session_id] = session
+            session_store.set(session_id, session)
 
     # Check for missing required fields
     required_fields = REQUIRED_FIELDS.get(session["action"], [])
@@ -215,7 +199,7 @@ Respond in **only JSON format**, without explanations.
     if missing_fields:
         next_missing = missing_fields[0]
         session["last_asked"] = next_missing
-        session_store[session_id] = session
+        session_store.set(session_id, session)
         return {
             "status": "missing_parameters",
             "missing_parameter": next_missing,
@@ -227,7 +211,7 @@ Respond in **only JSON format**, without explanations.
     params = session["params"]
 
     if action == "check_availability":
-        return check_availability(
+        return await check_availability_async(
             room_name=params["room_name"],
             date=params["date"],
             start_time=params["start_time"],
@@ -273,7 +257,7 @@ Respond in **only JSON format**, without explanations.
     #         created_by=params.get("created_by", "system"),
     #         db=db,
     #     )
-        result = add_booking(
+        result = await add_booking_async(
             room_name=params["room_name"],
             date=params["date"],
             start_time=params["start_time"],
@@ -282,38 +266,18 @@ Respond in **only JSON format**, without explanations.
             db=db,
         )
         return result
-
-        unavailable_dates = []
-        for occurrence in rule.between(start_date_dt, end_date_dt, inc=True):
-            date_str = occurrence.strftime("%Y-%m-%d")
-            availability = check_availability(
-                room_name=params["room_name"],
-                date=date_str,
-                start_time=params["start_time"],
-                end_time=params["end_time"],
-                db=db,
-            )
-            if availability["status"] != "available":
-                unavailable_dates.append(date_str)
-
-        if unavailable_dates:
-            return {
-                "status": "unavailable",
-                "message": f"{params['room_name']} is NOT available on the following dates: {', '.join(unavailable_dates)}."
-            }
-
-        # All available - create bookings
-        result = await handle_recurring_booking(params, db)
-        return result
+    elif action == "add_recurring_booking":
+        # Checks every occurrence up front and books the series in one transaction
+        return await handle_recurring_booking(params, db)
     elif action == "alternatives":
-        return check_available_slotes(
+        return await check_available_slotes_async(
             date=params["date"],
             start_time=params["start_time"],
             end_time=params["end_time"],
             db=db,
         )
     elif action == "cancel_booking":
-        return cancel_booking(
+        return await cancel_booking_async(
             room_name=params["room_name"],
             date=params["date"],
             start_time=params["start_time"],
@@ -322,7 +286,7 @@ Respond in **only JSON format**, without explanations.
         )
         
     elif action == "update_booking":
-        return update_booking(
+        return await update_booking_async(
             original_room_name=params["original_room_name"],
             original_date=params["original_date"],
             original_start_time=params["original_start_time"],
@@ -338,10 +302,14 @@ Respond in **only JSON format**, without explanations.
 
 
 
+@router.get("/session_metrics/")
+async def session_metrics():
+    return session_store.stats()
+
 @router.post("/book_recommendation/")
-async def book_recommendation(request: RecommendationBookingRequest, db=Depends(get_db)):
+async def book_recommendation(request: RecommendationBookingRequest, db=Depends(get_route_db)):
     try:
-        result = book_recommendation_directly(
+        result = await book_recommendation_directly_async(
             recommendation=request.recommendation,
             created_by=request.created_by,
             db=db
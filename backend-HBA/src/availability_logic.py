@@ -3,19 +3,67 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 import time
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import models
+from .booking_index import booking_index
+from .demand_histogram import demand_histogram
+from .room_catalog import room_catalog
+from .stage_timing import span
+from .occupancy import OccupancyGrid, load_occupancy_grid
 from datetime import datetime, timedelta
 from recommendtion.config.recommendation_config import RecommendationConfig
-from recommendtion.recommendations.core.recommendation_engine import RecommendationEngine
-from recommendtion.recommendations.core.hybridRecommendations import hybridRecommendationsEngine
-from typing import Dict, Any
+from .warmup import lazy_component
+from typing import Dict, Any, List, Optional
 
 config = RecommendationConfig()
-recommendation_engine = RecommendationEngine(config=config)
 
-enhanced_engine = hybridRecommendationsEngine(config=config)  
+
+# The engines pull in embeddings, Chroma and the LLM processor, so they are
+# built on first use (or by the startup warmup) rather than at import time.
+def _build_recommendation_engine():
+    from recommendtion.recommendations.core.recommendation_engine import RecommendationEngine
+    return RecommendationEngine(config=config)
+
+
+def _build_enhanced_engine():
+    from recommendtion.recommendations.core.hybridRecommendations import hybridRecommendationsEngine
+    return hybridRecommendationsEngine(config=config)
+
+
+recommendation_engine = lazy_component("recommendation_engine", _build_recommendation_engine)
+
+enhanced_engine = lazy_component("enhanced_engine", _build_enhanced_engine)
+
+def observe_new_bookings(created_by: str, entries: List[models.MRBSEntry]):
+    """
+    Fold committed bookings into the creator's cached preference profile.
+
+    Only done when an engine is already loaded; otherwise the learner catches
+    up from mrbs_entry the next time the profile is read.
+    """
+    for component in (enhanced_engine, recommendation_engine):
+        if not component.loaded:
+            continue
+        learner = getattr(component.get(), "preference_learner", None)
+        if learner is not None:
+            for entry in entries:
+                learner.observe_booking(created_by, entry)
+            return
+
+
+# Session.info key under which run_db_call collects recommendation requests
+# made during run_sync, to compute them off the event loop afterwards.
+DEFERRED_RECOMMENDATIONS = "deferred_recommendations"
+
 
 def get_room_recommendations(room_name: str, date: str, start_time: str, end_time: str, db: Session):
+    deferred = db.info.get(DEFERRED_RECOMMENDATIONS) if db is not None else None
+    if deferred is not None:
+        # Filled in place by run_db_call once the DB work is done
+        placeholder = []
+        deferred.append(((room_name, date, start_time, end_time), placeholder))
+        return placeholder
     try:
         start_dt = datetime.strptime(f"{date} {start_time}", "%Y-%m-%d %H:%M")
         end_dt = datetime.strptime(f"{date} {end_time}", "%Y-%m-%d %H:%M")
@@ -30,13 +78,37 @@ def get_room_recommendations(room_name: str, date: str, start_time: str, end_tim
             "requirements": {"original_room": room_name}
         }
         
-        recommendations = enhanced_engine.get_recommendations(request_data)
+        with span("recommendations"):
+            recommendations = enhanced_engine.get().get_recommendations(request_data)
         return recommendations
     except Exception as e:
         print(f"Recommendation system error: {e}")
         return []
 
 
+def find_conflicting_booking(room_id: int, start_ts: int, end_ts: int, db: Session,
+                             exclude_id: Optional[int] = None) -> Optional[models.MRBSEntry]:
+    """
+    Authoritative overlap check against mrbs_entry.
+
+    Write paths call this instead of booking_index, which may not have seen
+    bookings made by other workers or the MRBS web UI yet.
+    """
+    query = db.query(models.MRBSEntry).filter(
+        models.MRBSEntry.room_id == room_id,
+        models.MRBSEntry.start_time < end_ts,
+        models.MRBSEntry.end_time > start_ts,
+    )
+    if exclude_id is not None:
+        query = query.filter(models.MRBSEntry.id != exclude_id)
+    return query.first()
+
+
+def lock_room(room_name: str, db: Session) -> Optional[models.MRBSRoom]:
+    """Fetch a room row with FOR UPDATE so concurrent writers to it serialize until commit."""
+    return db.query(models.MRBSRoom).filter(models.MRBSRoom.room_name == room_name).with_for_update().first()
+
+
 def check_availability(room_name: str, date: str, start_time: str, end_time: str, db: Session):
     print(f"Checking availability for room: {room_name}")
     print(f"Date: {date}, Start time: {start_time}, End time: {end_time}")
@@ -55,11 +127,7 @@ def check_availability(room_name: str, date: str, start_time: str, end_time: str
     print(f"Converted end datetime to Unix timestamp: {end_ts}")
 
     # Query for conflicting bookings using Unix timestamps
-    conflicting = db.query(models.MRBSEntry).filter(
-        models.MRBSEntry.room_id == room.id,
-        models.MRBSEntry.start_time < end_ts,
-        models.MRBSEntry.end_time > start_ts,
-    ).first()
+    conflicting = find_conflicting_booking(room.id, start_ts, end_ts, db)
     print(f"Conflicting booking found: {conflicting}")
 
     if conflicting:
@@ -104,6 +172,8 @@ def update_booking_general(booking_id: int, room_id: int,name:str,date:str, star
         if not booking:
             raise HTTPException(status_code=404, detail="Booking not found")
         logging.info(f"Updating booking: {booking_id}, {booking.name}, {date}, {start_timestamp}, {end_timestamp}")
+        previous_room_id = booking.room_id
+        previous = (booking.room_id, booking.start_time, booking.end_time, booking.create_by, booking.name)
         # ✅ Update with valid fields
         booking.room_id = room_id
         booking.start_time = start_timestamp
@@ -114,6 +184,10 @@ def update_booking_general(booking_id: int, room_id: int,name:str,date:str, star
 
         db.commit()
         db.refresh(booking)
+        booking_index.remove(previous_room_id, booking.id)
+        booking_index.add(booking.room_id, booking.id, booking.start_time, booking.end_time, booking.status)
+        demand_histogram.forget(*previous)
+        demand_histogram.record(booking.room_id, booking.start_time, booking.end_time, booking.create_by, booking.name)
 
         return {"status": "success", "message": "Booking updated successfully"}
     except Exception as e:
@@ -129,6 +203,8 @@ def delete_booking(booking_id: int, db: Session):
 
         db.delete(booking)
         db.commit()
+        booking_index.remove(booking.room_id, booking.id)
+        demand_histogram.forget(booking.room_id, booking.start_time, booking.end_time, booking.create_by, booking.name)
         return {"status": "success", "message": "Booking deleted successfully"}
     except Exception as e:
         print(f"Error deleting booking: {e}")
@@ -137,9 +213,11 @@ def delete_booking(booking_id: int, db: Session):
 def add_booking(room_name: str,name: str, date: str, start_time: str, end_time: str, created_by: str, db: Session):
     
     try:
-        room = db.query(models.MRBSRoom).filter(models.MRBSRoom.room_name == room_name).first()
+        # Lock the room row so the conflict check and the insert are atomic
+        room = lock_room(room_name, db)
         
         if not room:
+            db.rollback()
             recommendations = get_room_recommendations(room_name, date, start_time, end_time, db)
             raise HTTPException(
                 status_code=404, 
@@ -160,19 +238,18 @@ def add_booking(room_name: str,name: str, date: str, start_time: str, end_time:
 
             
         except ValueError as e:
+            db.rollback()
             raise HTTPException(status_code=400, detail=f"Invalid date/time format: {e}")
         
         if end_ts <= start_ts:
+            db.rollback()
             raise HTTPException(status_code=400, detail="End time must be after start time")
         
         
-        conflict = db.query(models.MRBSEntry).filter(
-            models.MRBSEntry.room_id == room.id,
-            models.MRBSEntry.start_time < end_ts,
-            models.MRBSEntry.end_time > start_ts,
-        ).first()
+        conflict = find_conflicting_booking(room.id, start_ts, end_ts, db)
         
         if conflict:
+            db.rollback()
             recommendations = get_room_recommendations(room_name, date, start_time, end_time, db)
             return {
                 "status": "unavailable",
@@ -224,6 +301,10 @@ def add_booking(room_name: str,name: str, date: str, start_time: str, end_time:
         except Exception as e:
             pass
         
+        booking_index.add(room.id, new_booking.id, start_ts, end_ts, new_booking.status)
+        demand_histogram.record(room.id, start_ts, end_ts, created_by, name)
+        observe_new_bookings(created_by, [new_booking])
+        
         return {
             "message": "Booking created successfully",
             "booking_id": new_booking.id,
@@ -252,39 +333,19 @@ def check_available_slotes(room_name: str, date: str, start_time: str, end_time:
 
     # Convert to datetime objects first
     date_obj = datetime.strptime(date, "%Y-%m-%d")
-    start_time = datetime.combine(date_obj, datetime.min.time()) + timedelta(hours=7)  # 7 AM
-    end_time = datetime.combine(date_obj, datetime.min.time()) + timedelta(hours=21)  # 9 PM
-
-    all_slots = []
-    current = start_time
-    while current < end_time:
-        slot_start = current
-        slot_end = current + timedelta(minutes=30)
-        all_slots.append((int(time.mktime(slot_start.timetuple())), int(time.mktime(slot_end.timetuple()))))
-        current = slot_end
-
-    # Step 3: Get all bookings for that day and room
-    day_start_ts = int(time.mktime(start_time.timetuple()))
-    day_end_ts = int(time.mktime(end_time.timetuple()))
-
-    bookings = db.query(models.MRBSEntry).filter(
-        models.MRBSEntry.room_id == room.id,
-        models.MRBSEntry.start_time < day_end_ts,
-        models.MRBSEntry.end_time > day_start_ts
-    ).all()
-
-    # Step 4: Filter available slots
-    available_slots = []
-    for slot_start, slot_end in all_slots:
-        conflict = any(
-            booking.start_time < slot_end and booking.end_time > slot_start
-            for booking in bookings
-        )
-        if not conflict:
-            available_slots.append({
-                "start_time": datetime.fromtimestamp(slot_start).strftime("%H:%M"),
-                "end_time": datetime.fromtimestamp(slot_end).strftime("%H:%M")
-            })
+    start_time = datetime.combine(date_obj, datetime.min.time()) + timedelta(hours=config.business_start_hour)  # 7 AM by default
+    end_time = datetime.combine(date_obj, datetime.min.time()) + timedelta(hours=config.business_end_hour)  # 9 PM by default
+
+    # Step 3: Mark the day's bookings on a one-room occupancy bitmap
+    grid = OccupancyGrid([room.id], [date_obj.date()], config.time_slot_minutes,
+                         config.business_start_hour, config.business_end_hour)
+    day_start_ts, day_end_ts = grid.window
+
+    bookings = booking_index.conflicts(room.id, day_start_ts, day_end_ts, db)
+    grid.mark_busy([room.id] * len(bookings), [b[0] for b in bookings], [b[1] for b in bookings])
+
+    # Step 4: Read available slots off the bitmap
+    available_slots = grid.free_slots(room.id, date_obj.date())
             
     if not available_slots:
         recommendations = get_room_recommendations(room_name, date, start_time, end_time, db)
@@ -312,6 +373,51 @@ def check_available_slotes(room_name: str, date: str, start_time: str, end_time:
     return {"room": room_name, "date": date, "available_slots": available_slots}
 
 
+def fetch_available_slots_bulk(room_names: Optional[List[str]], start_date: str, days: int, db: Session,
+                               duration_minutes: Optional[int] = None):
+    try:
+        first_day = datetime.strptime(start_date, "%Y-%m-%d").date()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date format: {e}")
+    if days < 1 or days > 31:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 31")
+
+    rooms_query = db.query(models.MRBSRoom).filter(models.MRBSRoom.disabled == False)
+    if room_names:
+        rooms_query = rooms_query.filter(models.MRBSRoom.room_name.in_(room_names))
+    rooms = rooms_query.order_by(models.MRBSRoom.room_name).all()
+
+    missing = sorted(set(room_names or []) - {room.room_name for room in rooms})
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Room(s) not found: {', '.join(missing)}")
+
+    dates = [first_day + timedelta(days=offset) for offset in range(days)]
+    grid = load_occupancy_grid(db, [room.id for room in rooms], dates, config.time_slot_minutes,
+                               config.business_start_hour, config.business_end_hour)
+
+    def slots_for(free_row, day):
+        if duration_minutes:
+            needed = -(-duration_minutes // grid.slot_minutes)
+            return [grid.format_window(day, first, last) for first, last in grid.free_runs(free_row, needed)]
+        return [grid.format_window(day, slot, slot + 1) for slot in free_row.nonzero()[0].tolist()]
+
+    result = {
+        "start_date": start_date,
+        "days": days,
+        "slot_minutes": grid.slot_minutes,
+        "rooms": {
+            room.room_name: {day.strftime("%Y-%m-%d"): slots_for(grid.free(room.id, day), day) for day in dates}
+            for room in rooms
+        },
+    }
+    if len(rooms) > 1:
+        common = grid.common_free()
+        result["common_free_slots"] = {
+            day.strftime("%Y-%m-%d"): slots_for(common[i], day) for i, day in enumerate(dates)
+        }
+    return result
+
+
 def book_recommendation_directly(recommendation: Dict[str, Any], created_by: str, db: Session):
    
     try:
@@ -388,8 +494,8 @@ def fetch_halls_by_module_code(module_code: str, db: Session):
     if not module:
         return []  # Module not found
 
-    # Fetch halls that can accommodate the number of students
-    halls = db.query(models.MRBSRoom).filter(models.MRBSRoom.capacity >= module.number_of_students).all()
+    # Enabled halls that can accommodate the number of students, best fit first
+    halls = room_catalog.at_least(module.number_of_students, db)
     
     return [hall.room_name for hall in halls]
 
@@ -441,14 +547,13 @@ def update_booking(original_room_name: str, original_date: str, original_start_t
             return {"status": "invalid_time", "message": "End time must be after start time."}
         
         if (final_room_id != room.id or final_start_ts != start_ts or final_end_ts != end_ts):
-            conflict = db.query(models.MRBSEntry).filter(
-                models.MRBSEntry.room_id == final_room_id,
-                models.MRBSEntry.start_time < final_end_ts,
-                models.MRBSEntry.end_time > final_start_ts,
-                models.MRBSEntry.id != booking.id
-            ).first()
+            # Lock the target room so the conflict check and the move are atomic
+            lock_room(final_room_name, db)
+            conflict = find_conflicting_booking(final_room_id, final_start_ts, final_end_ts, db,
+                                                exclude_id=booking.id)
             
             if conflict:
+                db.rollback()
                 return {"status": "unavailable", "message": "The new time slot is not available."}
         
         booking.room_id = final_room_id
@@ -458,6 +563,10 @@ def update_booking(original_room_name: str, original_date: str, original_start_t
         booking.timestamp = datetime.now()
         
         db.commit()
+        booking_index.remove(room.id, booking.id)
+        booking_index.add(final_room_id, booking.id, final_start_ts, final_end_ts, booking.status)
+        demand_histogram.forget(room.id, start_ts, end_ts, booking.create_by, booking.name)
+        demand_histogram.record(final_room_id, final_start_ts, final_end_ts, booking.create_by, booking.name)
         
         return {
             "status": "success",
@@ -500,6 +609,8 @@ def cancel_booking(room_name: str, date: str, start_time: str, end_time: str, db
         
         db.delete(booking)
         db.commit()
+        booking_index.remove(room.id, booking.id)
+        demand_histogram.forget(room.id, start_ts, end_ts, booking.create_by, booking.name)
         
         return {
             "status": "success",
@@ -512,3 +623,68 @@ def cancel_booking(room_name: str, date: str, start_time: str, end_time: str, db
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error cancelling booking: {e}")
+
+
+# -----------------------------
+# Async variants for async routes
+# -----------------------------
+async def run_db_call(func, *args, db, **kwargs):
+    """
+    Run one of the functions above without blocking the event loop.
+
+    With an AsyncSession the function runs through run_sync, so its queries go
+    through the async driver; with a plain Session it runs in the threadpool.
+    run_sync executes on the event loop, so recommendations requested inside
+    it (engines, embeddings, LLM calls) are only collected there and computed
+    in the threadpool afterwards.
+    """
+    if not isinstance(db, AsyncSession):
+        return await run_in_threadpool(func, *args, db=db, **kwargs)
+
+    info = db.sync_session.info
+    deferred = info[DEFERRED_RECOMMENDATIONS] = []
+    try:
+        result = await db.run_sync(lambda session: func(*args, db=session, **kwargs))
+    except HTTPException:
+        await _fill_deferred_recommendations(deferred)
+        raise
+    finally:
+        info.pop(DEFERRED_RECOMMENDATIONS, None)
+    await _fill_deferred_recommendations(deferred)
+    return result
+
+
+async def _fill_deferred_recommendations(deferred):
+    for args, placeholder in deferred:
+        placeholder.extend(await run_in_threadpool(get_room_recommendations, *args, None))
+
+
+async def check_availability_async(room_name: str, date: str, start_time: str, end_time: str, db):
+    return await run_db_call(check_availability, room_name, date, start_time, end_time, db=db)
+
+
+async def add_booking_async(room_name: str, name: str, date: str, start_time: str, end_time: str,
+                            created_by: str, db):
+    return await run_db_call(add_booking, room_name, name, date, start_time, end_time, created_by, db=db)
+
+
+async def check_available_slotes_async(room_name: str, date: str, start_time: str, end_time: str, db):
+    return await run_db_call(check_available_slotes, room_name, date, start_time, end_time, db=db)
+
+
+async def cancel_booking_async(room_name: str, date: str, start_time: str, end_time: str, db):
+    return await run_db_call(cancel_booking, room_name, date, start_time, end_time, db=db)
+
+
+async def update_booking_async(original_room_name: str, original_date: str, original_start_time: str,
+                               original_end_time: str, new_room_name: str = None, new_date: str = None,
+                               new_start_time: str = None, new_end_time: str = None,
+                               modified_by: str = "system", db=None):
+    return await run_db_call(
+        update_booking, original_room_name, original_date, original_start_time, original_end_time,
+        new_room_name, new_date, new_start_time, new_end_time, modified_by, db=db
+    )
+
+
+async def book_recommendation_directly_async(recommendation: Dict[str, Any], created_by: str, db):
+    return await run_db_call(book_recommendation_directly, recommendation, created_by, db=db)
@@ -0,0 +1,214 @@
+import os
+import time
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+
+from src import models
+
+# Seconds before a room's intervals are re-read from the database. Writes made
+# through availability_logic update the index immediately; the TTL only bounds
+# how long bookings made by other processes (MRBS web UI, other workers) can
+# stay invisible.
+BOOKING_INDEX_TTL = int(os.getenv("BOOKING_INDEX_TTL", "300"))
+
+
+class _RoomIntervals:
+    """Sorted start/end arrays for one room plus a running max of end times."""
+
+    __slots__ = ("starts", "ends", "ids", "statuses", "max_ends", "loaded_at")
+
+    def __init__(self, rows: List[Tuple[int, int, int, int]]):
+        rows = sorted(rows)
+        self.starts = [r[0] for r in rows]
+        self.ends = [r[1] for r in rows]
+        self.ids = [r[2] for r in rows]
+        self.statuses = [r[3] for r in rows]
+        self.max_ends: List[int] = []
+        self._rebuild_max_ends(0)
+        self.loaded_at = time.monotonic()
+
+    def _rebuild_max_ends(self, position: int):
+        del self.max_ends[position:]
+        running = self.max_ends[-1] if self.max_ends else None
+        for end in self.ends[position:]:
+            running = end if running is None or end > running else running
+            self.max_ends.append(running)
+
+    def insert(self, start: int, end: int, entry_id: int, status: int):
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.ids.insert(position, entry_id)
+        self.statuses.insert(position, status)
+        self._rebuild_max_ends(position)
+
+    def remove(self, entry_id: int) -> bool:
+        try:
+            position = self.ids.index(entry_id)
+        except ValueError:
+            return False
+        for values in (self.starts, self.ends, self.ids, self.statuses):
+            del values[position]
+        self._rebuild_max_ends(position)
+        return True
+
+    def overlapping(self, start: int, end: int, active_only: bool = False) -> List[Tuple[int, int, int]]:
+        """(start, end, entry_id) of every interval overlapping [start, end), in start order."""
+        found = []
+        # Only entries that start before `end` can overlap; walk them backwards
+        # and stop once no earlier entry can still be running at `start`.
+        position = bisect_left(self.starts, end) - 1
+        while position >= 0 and self.max_ends[position] > start:
+            if self.ends[position] > start and (not active_only or self.statuses[position] == 0):
+                found.append((self.starts[position], self.ends[position], self.ids[position]))
+            position -= 1
+        found.reverse()
+        return found
+
+
+class BookingIntervalIndex:
+    """
+    In-process per-room index of mrbs_entry [start_time, end_time) intervals.
+
+    Rooms are loaded lazily with one query on first use and then answer
+    availability questions without touching the database.
+    """
+
+    def __init__(self, ttl_seconds: int = BOOKING_INDEX_TTL):
+        self.ttl_seconds = ttl_seconds
+        self._rooms: Dict[int, _RoomIntervals] = {}
+        # Bumped by every add/remove/invalidate of a room (_epoch: of all
+        # rooms), so a load that raced with a write is not cached
+        self._writes: Dict[int, int] = {}
+        self._epoch = 0
+        self._lock = threading.RLock()
+
+    def _load_room(self, room_id: int, db: Session) -> _RoomIntervals:
+        rows = db.query(
+            models.MRBSEntry.start_time,
+            models.MRBSEntry.end_time,
+            models.MRBSEntry.id,
+            models.MRBSEntry.status,
+        ).filter(models.MRBSEntry.room_id == room_id).all()
+        return _RoomIntervals([(r[0], r[1], r[2], r[3] or 0) for r in rows])
+
+    def _room(self, room_id: int, db: Optional[Session]) -> Optional[_RoomIntervals]:
+        with self._lock:
+            intervals = self._rooms.get(room_id)
+            expired = intervals is not None and time.monotonic() - intervals.loaded_at > self.ttl_seconds
+            stamp = (self._epoch, self._writes.get(room_id, 0))
+        if (intervals is None or expired) and db is not None:
+            # Query outside the lock so a slow load does not block other rooms
+            intervals = self._load_room(room_id, db)
+            with self._lock:
+                if (self._epoch, self._writes.get(room_id, 0)) == stamp:
+                    self._rooms[room_id] = intervals
+        return intervals
+
+    def preload(self, db: Session, room_ids: Optional[List[int]] = None):
+        """Load several rooms at once with a single query."""
+        query = db.query(
+            models.MRBSEntry.room_id,
+            models.MRBSEntry.start_time,
+            models.MRBSEntry.end_time,
+            models.MRBSEntry.id,
+            models.MRBSEntry.status,
+        )
+        if room_ids is not None:
+            query = query.filter(models.MRBSEntry.room_id.in_(room_ids))
+        grouped: Dict[int, List[Tuple[int, int, int, int]]] = {room_id: [] for room_id in room_ids or []}
+        for room_id, start, end, entry_id, status in query.all():
+            grouped.setdefault(room_id, []).append((start, end, entry_id, status or 0))
+        with self._lock:
+            for room_id, rows in grouped.items():
+                self._rooms[room_id] = _RoomIntervals(rows)
+
+    def is_free(self, room_id: int, start_ts: int, end_ts: int, db: Optional[Session] = None,
+                active_only: bool = False) -> bool:
+        """True if no booking of the room overlaps [start_ts, end_ts)."""
+        return not self.conflicts(room_id, start_ts, end_ts, db, active_only)
+
+    def conflicts(self, room_id: int, start_ts: int, end_ts: int, db: Optional[Session] = None,
+                  active_only: bool = False) -> List[Tuple[int, int, int]]:
+        """(start, end, entry_id) of bookings overlapping [start_ts, end_ts)."""
+        intervals = self._room(room_id, db)
+        if intervals is None:
+            return []
+        with self._lock:
+            return intervals.overlapping(start_ts, end_ts, active_only)
+
+    def free_gaps(self, room_id: int, window_start: int, window_end: int, db: Optional[Session] = None,
+                  active_only: bool = False) -> List[Tuple[int, int]]:
+        """Maximal free [start, end) gaps of the room inside the window."""
+        gaps = []
+        cursor = window_start
+        for start, end, _ in self.conflicts(room_id, window_start, window_end, db, active_only):
+            if start > cursor:
+                gaps.append((cursor, min(start, window_end)))
+            cursor = max(cursor, end)
+            if cursor >= window_end:
+                break
+        if cursor < window_end:
+            gaps.append((cursor, window_end))
+        return gaps
+
+    def add(self, room_id: int, entry_id: int, start_ts: int, end_ts: int, status: int = 0):
+        """Record a committed booking. Rooms not loaded yet are left to load lazily."""
+        with self._lock:
+            self._writes[room_id] = self._writes.get(room_id, 0) + 1
+            intervals = self._rooms.get(room_id)
+            if intervals is not None:
+                intervals.remove(entry_id)
+                intervals.insert(start_ts, end_ts, entry_id, status or 0)
+
+    def remove(self, room_id: int, entry_id: int):
+        """Forget a deleted or moved booking."""
+        with self._lock:
+            self._writes[room_id] = self._writes.get(room_id, 0) + 1
+            intervals = self._rooms.get(room_id)
+            if intervals is not None:
+                intervals.remove(entry_id)
+
+    def invalidate(self, room_id: Optional[int] = None):
+        """Drop one room (or every room) so it is re-read on next use."""
+        with self._lock:
+            if room_id is None:
+                self._rooms.clear()
+                self._epoch += 1
+            else:
+                self._rooms.pop(room_id, None)
+                self._writes[room_id] = self._writes.get(room_id, 0) + 1
+
+
+def free_rooms_in_window(db: Session, start_ts: int, end_ts: int, active_only: bool = False,
+                         room_ids: Optional[List[int]] = None) -> Dict[int, bool]:
+    """
+    Free/busy status of every enabled room for [start_ts, end_ts) in one grouped query.
+
+    Returns {room_id: True if the room has no overlapping booking}.
+    """
+    overlap = [
+        models.MRBSEntry.room_id == models.MRBSRoom.id,
+        models.MRBSEntry.start_time < end_ts,
+        models.MRBSEntry.end_time > start_ts,
+    ]
+    if active_only:
+        overlap.append(models.MRBSEntry.status == 0)
+    query = db.query(
+        models.MRBSRoom.id,
+        func.count(models.MRBSEntry.id),
+    ).outerjoin(
+        models.MRBSEntry, and_(*overlap)
+    ).filter(
+        models.MRBSRoom.disabled == False
+    )
+    if room_ids is not None:
+        query = query.filter(models.MRBSRoom.id.in_(room_ids))
+    return {room_id: conflicts == 0 for room_id, conflicts in query.group_by(models.MRBSRoom.id).all()}
+
+
+booking_index = BookingIntervalIndex()
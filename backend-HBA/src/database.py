@@ -1,24 +1,83 @@
 from sqlalchemy import create_engine, Column, Integer, String, Date, Time, ForeignKey
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 # Replace with your MySQL details
 # DATABASE_URL = "mysql+pymysql://root:'@123'@localhost/hba"
-from sqlalchemy import create_engine
 import os
 load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL") 
-engine = create_engine(DATABASE_URL)
-try:
-    with engine.connect() as connection:
-        print("✅ Database connection successful!")
-except Exception as e:
-    print("❌ Database connection failed!")
-    print(f"Error: {e}")
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Connection pool settings (ignored for SQLite, which uses its own pool classes)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Async mode: async routes get an AsyncSession backed by aiomysql/asyncmy
+# (MySQL) or aiosqlite (SQLite) instead of a blocking Session.
+DB_ASYNC_MODE = os.getenv("DB_ASYNC_MODE", "false").lower() == "true"
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql+mysqldb": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def engine_kwargs(url: str) -> dict:
+    """Pool settings for create_engine / create_async_engine."""
+    kwargs = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if make_url(url).get_backend_name() != "sqlite":
+        kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return kwargs
+
+
+def async_database_url(url: str) -> str:
+    """ASYNC_DATABASE_URL if set, otherwise DATABASE_URL with its async driver."""
+    if os.getenv("ASYNC_DATABASE_URL"):
+        return os.getenv("ASYNC_DATABASE_URL")
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+engine = create_engine(DATABASE_URL, **engine_kwargs(DATABASE_URL))
+if os.getenv("DB_CHECK_ON_STARTUP", "true").lower() == "true":
+    try:
+        with engine.connect() as connection:
+            print("✅ Database connection successful!")
+    except Exception as e:
+        print("❌ Database connection failed!")
+        print(f"Error: {e}")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    """Create the async engine on first use so the async driver is only needed in async mode."""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        url = async_database_url(DATABASE_URL)
+        _async_engine = create_async_engine(url, **engine_kwargs(url))
+        _async_session_factory = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -27,3 +86,20 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    get_async_engine()
+    async with _async_session_factory() as db:
+        yield db
+
+
+async def get_route_db():
+    """Session for async routes: an AsyncSession in async mode, a pooled Session otherwise."""
+    if DB_ASYNC_MODE:
+        async for db in get_async_db():
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
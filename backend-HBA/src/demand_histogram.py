@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from src import models
+
+# Bookings starting within this many days before now (and any time after) are
+# counted. Writes made through availability_logic update the histogram
+# immediately; it is rebuilt from the database after DEMAND_HISTOGRAM_TTL
+# seconds so bookings made by other processes and aged-out ones are picked up.
+DEMAND_WINDOW_DAYS = int(os.getenv("DEMAND_WINDOW_DAYS", "180"))
+DEMAND_HISTOGRAM_TTL = int(os.getenv("DEMAND_HISTOGRAM_TTL", "3600"))
+
+
+class DemandHistogram:
+    """
+    Booking demand keyed by (room, weekday, hour) of the local start time.
+
+    counts[room, weekday, hour] holds the number of bookings and seconds[...]
+    their total duration. Users and purposes are tallied per (weekday, hour)
+    across all rooms. Lookups are array indexing instead of a scan of
+    mrbs_entry with non-indexable hour/day-of-week expressions.
+    """
+
+    def __init__(self, window_days: int = DEMAND_WINDOW_DAYS, ttl_seconds: int = DEMAND_HISTOGRAM_TTL):
+        self.window_days = window_days
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        # Bumped by every record/forget/invalidate, so a rebuild that raced
+        # with a write is not trusted
+        self._writes = 0
+        self._room_pos: Dict[int, int] = {}
+        self.counts = np.zeros((0, 7, 24), dtype=np.int64)
+        self.seconds = np.zeros((0, 7, 24), dtype=np.int64)
+        self._users: Dict[Tuple[int, int], Counter] = {}
+        self._purposes: Dict[Tuple[int, int], Counter] = {}
+        self.built_at: Optional[float] = None
+
+    @property
+    def window_start(self) -> int:
+        return int((datetime.now() - timedelta(days=self.window_days)).timestamp())
+
+    def _position(self, room_id: int) -> int:
+        position = self._room_pos.get(room_id)
+        if position is None:
+            position = len(self._room_pos)
+            self._room_pos[room_id] = position
+            if position >= self.counts.shape[0]:
+                grow = max(16, self.counts.shape[0])
+                self.counts = np.concatenate([self.counts, np.zeros((grow, 7, 24), dtype=np.int64)])
+                self.seconds = np.concatenate([self.seconds, np.zeros((grow, 7, 24), dtype=np.int64)])
+        return position
+
+    def _load(self, db: Session) -> list:
+        return db.query(
+            models.MRBSEntry.room_id,
+            models.MRBSEntry.start_time,
+            models.MRBSEntry.end_time,
+            models.MRBSEntry.create_by,
+            models.MRBSEntry.name,
+        ).filter(models.MRBSEntry.start_time >= self.window_start).all()
+
+    def rebuild(self, db: Session):
+        """Recount the whole window with a single query."""
+        with self._lock:
+            stamp = self._writes
+        # Count into a private histogram so readers keep the old one meanwhile
+        fresh = DemandHistogram(self.window_days, self.ttl_seconds)
+        for room_id, start_ts, end_ts, user, name in self._load(db):
+            fresh._apply(room_id, start_ts, end_ts, user, name, 1)
+        with self._lock:
+            self._room_pos, self.counts, self.seconds = fresh._room_pos, fresh.counts, fresh.seconds
+            self._users, self._purposes = fresh._users, fresh._purposes
+            # A write during the query may or may not be in it: serve these
+            # counts but rebuild again on next use
+            self.built_at = time.monotonic() if self._writes == stamp else None
+
+    def _stale(self) -> bool:
+        with self._lock:
+            return self.built_at is None or time.monotonic() - self.built_at > self.ttl_seconds
+
+    def _ensure(self, db: Optional[Session]):
+        if db is None or not self._stale():
+            return
+        # One rebuild at a time; once built, readers keep the current counts
+        # instead of waiting for someone else's rebuild
+        if not self._rebuild_lock.acquire(blocking=self.built_at is None):
+            return
+        try:
+            if self._stale():
+                self.rebuild(db)
+        finally:
+            self._rebuild_lock.release()
+
+    def _apply(self, room_id: int, start_ts: int, end_ts: int, user: Optional[str], name: Optional[str], delta: int):
+        start = datetime.fromtimestamp(start_ts)
+        weekday, hour = start.weekday(), start.hour
+        position = self._position(room_id)
+        self.counts[position, weekday, hour] += delta
+        self.seconds[position, weekday, hour] += delta * max(0, end_ts - start_ts)
+        for tally, key in ((self._users, user), (self._purposes, name)):
+            if not key:
+                continue
+            counter = tally.setdefault((weekday, hour), Counter())
+            counter[key] += delta
+            if counter[key] <= 0:
+                del counter[key]
+
+    def record(self, room_id: int, start_ts: int, end_ts: int, user: Optional[str] = None,
+               name: Optional[str] = None):
+        """Count a committed booking. Ignored until the histogram has been built."""
+        with self._lock:
+            self._writes += 1
+            if self.built_at is not None and start_ts >= self.window_start:
+                self._apply(room_id, start_ts, end_ts, user, name, 1)
+
+    def forget(self, room_id: int, start_ts: int, end_ts: int, user: Optional[str] = None,
+               name: Optional[str] = None):
+        """Uncount a deleted booking, or the old values of a moved one."""
+        with self._lock:
+            self._writes += 1
+            if self.built_at is not None and start_ts >= self.window_start:
+                self._apply(room_id, start_ts, end_ts, user, name, -1)
+
+    def invalidate(self):
+        with self._lock:
+            self._writes += 1
+            self.built_at = None
+
+    def room_histogram(self, room_id: int, db: Optional[Session] = None) -> np.ndarray:
+        """(7, 24) booking counts for one room; zeros if it has none."""
+        self._ensure(db)
+        with self._lock:
+            position = self._room_pos.get(room_id)
+            if position is None:
+                return np.zeros((7, 24), dtype=np.int64)
+            return self.counts[position].copy()
+
+    def totals(self, db: Optional[Session] = None, room_ids: Optional[List[int]] = None) -> np.ndarray:
+        """(7, 24) booking counts summed over all rooms, or over room_ids."""
+        self._ensure(db)
+        with self._lock:
+            if room_ids is None:
+                return self.counts.sum(axis=0)
+            rows = [self._room_pos[room_id] for room_id in room_ids if room_id in self._room_pos]
+            return self.counts[rows].sum(axis=0)
+
+    def slot(self, weekday: int, hour: int, db: Optional[Session] = None) -> Dict[str, object]:
+        """Demand of one (weekday, hour) cell across all rooms."""
+        self._ensure(db)
+        with self._lock:
+            cell = self.counts[:, weekday, hour]
+            return {
+                "bookings": int(cell.sum()),
+                "seconds": int(self.seconds[:, weekday, hour].sum()),
+                "rooms": int(np.count_nonzero(cell)),
+                "users": Counter(self._users.get((weekday, hour), {})),
+                "purposes": Counter(self._purposes.get((weekday, hour), {})),
+            }
+
+    def hour_stats(self, db: Optional[Session] = None) -> List[Dict[str, float]]:
+        """
+        Per hour of day across all weekdays: bookings, rooms used, the busiest
+        room and the average duration in hours.
+        """
+        self._ensure(db)
+        with self._lock:
+            by_room_hour = self.counts.sum(axis=1)
+            bookings = by_room_hour.sum(axis=0)
+            seconds = self.seconds.sum(axis=(0, 1))
+            rooms = np.count_nonzero(by_room_hour, axis=0)
+            room_ids = np.zeros(by_room_hour.shape[0], dtype=np.int64)
+            for room_id, position in self._room_pos.items():
+                room_ids[position] = room_id
+            top_rooms = room_ids[by_room_hour.argmax(axis=0)] if by_room_hour.size else np.zeros(24, dtype=np.int64)
+        return [
+            {
+                "hour": hour,
+                "bookings": int(bookings[hour]),
+                "rooms": int(rooms[hour]),
+                "top_room_id": int(top_rooms[hour]) if bookings[hour] else None,
+                "avg_duration": float(seconds[hour] / bookings[hour] / 3600) if bookings[hour] else 0.0,
+            }
+            for hour in range(24)
+        ]
+
+
+demand_histogram = DemandHistogram()
@@ -1,10 +1,16 @@
-import spacy
 import re
 from dateutil.parser import parse as parse_date
 from datetime import datetime
+from src.warmup import lazy_component
 
-# Load spaCy English model
-nlp = spacy.load("en_core_web_sm")
+
+def _load_spacy():
+    import spacy
+    return spacy.load("en_core_web_sm")
+
+
+# spaCy English model, loaded on first use or by the startup warmup
+nlp = lazy_component("spacy_nlp", _load_spacy)
 
 
 # Define known room names (extend as needed)
@@ -29,7 +35,7 @@ def extract_time(text):
     return times[:2]  # Return up to 2 times (start_time, end_time)
 
 def extract_entities(text: str) -> dict:
-    doc = nlp(text)
+    doc = nlp.get()(text)
     entities = {}
 
     # Extract room name
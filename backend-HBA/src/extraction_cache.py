@@ -0,0 +1,180 @@
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# Parsed LLM extraction results keyed on the normalized question text.
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "2048"))
+EXTRACTION_CACHE_TTL = int(os.getenv("EXTRACTION_CACHE_TTL", "86400"))
+# Optional near-duplicate lookup; needs sentence-transformers
+EXTRACTION_CACHE_SEMANTIC = os.getenv("EXTRACTION_CACHE_SEMANTIC", "false").lower() == "true"
+EXTRACTION_CACHE_SIMILARITY = float(os.getenv("EXTRACTION_CACHE_SIMILARITY", "0.92"))
+EXTRACTION_CACHE_MODEL = os.getenv("EXTRACTION_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+RELATIVE_DATE_PATTERN = re.compile(
+    r"\b(today|tonight|tomorrow|tmrw|day after tomorrow|next week|this week|in \d+ days?|"
+    r"(?:next |this |coming )?(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday))\b"
+)
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, drop filler punctuation and collapse whitespace."""
+    text = text.lower().strip()
+    text = re.sub(r"[^\w\s:.\-/]", " ", text)
+    text = re.sub(r"(?<!\d)[.\-/]|[.\-/](?!\d)", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _cache_day(question: str, today: date) -> str:
+    """Today's date for a question with a relative date phrase, else ""."""
+    return today.isoformat() if RELATIVE_DATE_PATTERN.search(question) else ""
+
+
+def _slot_signature(question: str) -> Tuple[str, ...]:
+    """Tokens that must match exactly for a semantic hit: rooms, numbers, times and date words."""
+    return tuple(sorted(
+        token for token in question.split()
+        if any(ch.isdigit() for ch in token) or token in WEEKDAYS
+        or token in ("today", "tonight", "tomorrow", "tmrw", "next", "this")
+    ))
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "signature")
+
+    def __init__(self, value: Dict[str, Any], expires_at: float, signature: Tuple[str, ...]):
+        self.value = value
+        self.expires_at = expires_at
+        self.signature = signature
+
+
+class ExtractionCache:
+    """
+    TTL + LRU cache of parsed extraction results ({action, parameters} or
+    recurrence data) keyed on (kind, normalized question, day).
+
+    `day` is today's date for questions with a relative phrase like
+    "tomorrow" or "next friday" and empty otherwise, so the dates the LLM
+    resolved are only reused on the day they were resolved.
+    """
+
+    def __init__(self, max_entries: int = EXTRACTION_CACHE_SIZE, ttl_seconds: int = EXTRACTION_CACHE_TTL,
+                 semantic: bool = EXTRACTION_CACHE_SEMANTIC, similarity: float = EXTRACTION_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._entries: "OrderedDict[Tuple[str, str, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._model = None
+        self._semantic = semantic
+        self._vectors: Dict[Tuple[str, str, str], np.ndarray] = {}
+
+    # ------------------------------------------------------------ embeddings
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        if not self._semantic:
+            return None
+        if self._model is None:
+            try:
+                from recommendtion.recommendations.models.model_registry import get_sentence_transformer
+            except Exception as e:
+                print(f"⚠️ Semantic extraction cache disabled: {e}")
+                self._semantic = False
+                return None
+            # None while the registry backs off a failed load; retried on a later call
+            self._model = get_sentence_transformer(EXTRACTION_CACHE_MODEL)
+            if self._model is None:
+                return None
+        return np.asarray(self._model.encode(question, normalize_embeddings=True), dtype=np.float32)
+
+    def _semantic_match(self, kind: str, question: str, day: str) -> Optional[Tuple[str, str, str]]:
+        vector = self._embed(question)
+        if vector is None:
+            return None
+        signature = _slot_signature(question)
+        with self._lock:
+            keys = [key for key in self._vectors
+                    if key[0] == kind and key[2] == day and key in self._entries and self._entries[key].signature == signature]
+            if not keys:
+                return None
+            scores = np.stack([self._vectors[key] for key in keys]) @ vector
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.similarity else None
+
+    # ------------------------------------------------------------------- api
+
+    def get(self, kind: str, question: str) -> Optional[Dict[str, Any]]:
+        """Cached result for a question."""
+        normalized = normalize_question(question)
+        day = _cache_day(normalized, date.today())
+        key = (kind, normalized, day)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at < now:
+                self._drop(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is None:
+            similar = self._semantic_match(kind, normalized, day)
+            with self._lock:
+                entry = self._entries.get(similar) if similar else None
+                if entry is None or entry.expires_at < now:
+                    self.misses += 1
+                    return None
+                self._entries.move_to_end(similar)
+                self.semantic_hits += 1
+        return copy.deepcopy(entry.value)
+
+    def put(self, kind: str, question: str, value: Dict[str, Any]):
+        """Store a successfully parsed extraction result."""
+        normalized = normalize_question(question)
+        key = (kind, normalized, _cache_day(normalized, date.today()))
+        entry = _Entry(
+            copy.deepcopy(value),
+            time.time() + self.ttl_seconds,
+            _slot_signature(normalized),
+        )
+        vector = self._embed(normalized)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if vector is not None:
+                self._vectors[key] = vector
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Tuple[str, str, str]):
+        self._entries.pop(key, None)
+        self._vectors.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._vectors.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+
+extraction_cache = ExtractionCache()
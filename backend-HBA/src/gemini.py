@@ -1,23 +1,24 @@
 from langchain.llms.base import LLM
 from pydantic import BaseModel, Field  # Use Pydantic directly
-import requests
+import httpx
 import os
 from typing import Optional, List, Any
 from dotenv import load_dotenv
 from langchain_core.language_models import BaseLLM
 from langchain_core.outputs import LLMResult, Generation
+from src.llm_client import llm_client, LLM_BASE_URL
 # Load environment variables
 load_dotenv()
 print(f"🔐 Loaded API Key: {os.getenv('GEMINI_API_KEY3')}")
 
 class Gemini(BaseLLM):
     api_key: str = Field(default_factory=lambda: os.getenv("GEMINI_API_KEY3"))
-    base_url: str = "https://openrouter.ai/api/v1/chat/completions"
+    base_url: str = LLM_BASE_URL
     model: str = "gpt-oss-20b:free" # Replace with the correct model name for DeepSeek
 
-    def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+    def _request(self, prompt: str):
         """
-        Make a call to the Gemini model (via OpenRouter API).
+        Headers and chat-completion payload for one prompt.
         """
         payload = {
            "model": self.model,
@@ -41,19 +42,26 @@ class Gemini(BaseLLM):
             "X-Title": "HBA"            # Optional - can customize
         }
 
-        # data = {
-        #     "model": self.model,
-        #     "messages": [{"role": "user", "content": prompt}],
-        # }
+        return headers, payload
 
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        """
+        Make a call to the Gemini model (via OpenRouter API).
+        """
+        headers, payload = self._request(prompt)
         try:
-            # response = requests.post(f"{self.base_url}/chat/completions", headers=headers, json=data)
-            response = requests.post(self.base_url, headers=headers, json=payload)
-
-            response.raise_for_status()  # Raises an HTTPError if the status code is 4xx or 5xx
-            return response.json()['choices'][0]['message']['content']
+            return llm_client.complete(self._llm_type, self.base_url, headers, payload)
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"Failed to call Gemini API: {e}")
 
-        except requests.RequestException as e:
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        """
+        Non-blocking version of _call for async routes.
+        """
+        headers, payload = self._request(prompt)
+        try:
+            return await llm_client.acomplete(self._llm_type, self.base_url, headers, payload)
+        except httpx.HTTPError as e:
             raise RuntimeError(f"Failed to call Gemini API: {e}")
 
     def _generate(self, prompts: List[str], stop: Optional[List[str]] = None, **kwargs: Any) -> LLMResult:
@@ -67,6 +75,14 @@ class Gemini(BaseLLM):
 
         return LLMResult(generations=generations)
 
+    async def _agenerate(self, prompts: List[str], stop: Optional[List[str]] = None, **kwargs: Any) -> LLMResult:
+        generations = []
+        for prompt in prompts:
+            response_text = await self._acall(prompt, stop=stop, **kwargs)
+            generations.append([Generation(text=response_text)])
+
+        return LLMResult(generations=generations)
+
     @property
     def _llm_type(self) -> str:
         return "gemini"
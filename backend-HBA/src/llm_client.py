@@ -0,0 +1,152 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Defaults shared by every OpenRouter-backed wrapper (DeepSeekLLM, Gemini, QWEN, ZAILLM).
+# LLM_BASE_URL lets tests point all of them at a local stub server.
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://openrouter.ai/api/v1/chat/completions")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "0.5"))
+# Upper bound on any single wait, including a provider's Retry-After
+LLM_MAX_BACKOFF_SECONDS = float(os.getenv("LLM_MAX_BACKOFF_SECONDS", "30"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+
+# Status codes worth retrying: rate limiting and transient upstream failures
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMClient:
+    """
+    Pooled HTTP client for chat-completion calls.
+
+    One keep-alive connection pool is shared by all wrappers, and each provider
+    gets its own semaphore so a slow model cannot take every connection. The
+    async path is used from request handlers; the sync path backs the `_call`
+    shims used by scripts and threadpool code.
+    """
+
+    def __init__(self, timeout: float = LLM_TIMEOUT, connect_timeout: float = LLM_CONNECT_TIMEOUT,
+                 max_retries: int = LLM_MAX_RETRIES, backoff_seconds: float = LLM_BACKOFF_SECONDS,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, max_connections: int = LLM_MAX_CONNECTIONS,
+                 max_backoff_seconds: float = LLM_MAX_BACKOFF_SECONDS,
+                 transport: Optional[httpx.MockTransport] = None):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.max_concurrency = max_concurrency
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        # Only set by tests, which answer requests in-process
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._sync_client: Optional[httpx.Client] = None
+        self._sync_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        # Async clients and semaphores are bound to the event loop that created
+        # them, so every loop gets its own pair
+        self._async_clients: Dict[asyncio.AbstractEventLoop, tuple] = {}
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff_seconds)
+        return min(self.backoff_seconds * (2 ** attempt), self.max_backoff_seconds)
+
+    def _should_retry(self, attempt: int, response: Optional[httpx.Response]) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        return response is None or response.status_code in RETRY_STATUS_CODES
+
+    @staticmethod
+    def _content(response: httpx.Response) -> str:
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    # ------------------------------------------------------------------ sync
+
+    def _sync(self, provider: str):
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(timeout=self.timeout, limits=self.limits,
+                                                 transport=self.transport)
+            if provider not in self._sync_semaphores:
+                self._sync_semaphores[provider] = threading.BoundedSemaphore(self.max_concurrency)
+            return self._sync_client, self._sync_semaphores[provider]
+
+    def complete(self, provider: str, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> str:
+        """POST a chat-completion request and return the first message's content."""
+        client, semaphore = self._sync(provider)
+        attempt = 0
+        while True:
+            response = None
+            try:
+                with semaphore:
+                    response = client.post(url, headers=headers, json=payload)
+                if not self._should_retry(attempt, response):
+                    return self._content(response)
+            except httpx.TransportError:
+                if not self._should_retry(attempt, None):
+                    raise
+            time.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    # ----------------------------------------------------------------- async
+
+    def _async(self, provider: str):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                # Forget loops that were closed without aclose_loop()
+                for closed in [other for other in self._async_clients if other.is_closed()]:
+                    del self._async_clients[closed]
+                client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, transport=self.transport)
+                entry = self._async_clients[loop] = (client, {})
+            client, semaphores = entry
+            if provider not in semaphores:
+                semaphores[provider] = asyncio.Semaphore(self.max_concurrency)
+            return client, semaphores[provider]
+
+    async def acomplete(self, provider: str, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> str:
+        """Async version of complete() that never blocks the event loop."""
+        client, semaphore = self._async(provider)
+        attempt = 0
+        while True:
+            response = None
+            try:
+                async with semaphore:
+                    response = await client.post(url, headers=headers, json=payload)
+                if not self._should_retry(attempt, response):
+                    return self._content(response)
+            except httpx.TransportError:
+                if not self._should_retry(attempt, None):
+                    raise
+            await asyncio.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    async def aclose_loop(self):
+        """Close the running loop's connection pool; call before closing a short-lived loop."""
+        with self._lock:
+            entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[0].aclose()
+
+    async def aclose(self):
+        """Close the pooled connections (call from app shutdown)."""
+        await self.aclose_loop()
+        with self._lock:
+            if self._sync_client is not None:
+                self._sync_client.close()
+                self._sync_client = None
+
+
+llm_client = LLMClient()
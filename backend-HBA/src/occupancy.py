@@ -0,0 +1,138 @@
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from src import models
+
+
+class OccupancyGrid:
+    """
+    Room × day × slot occupancy bitmap.
+
+    Each room-day is a fixed-width boolean row covering [start_hour, end_hour)
+    at `slot_minutes` granularity; True means at least one booking touches the
+    slot. Free slots, runs long enough for a booking and multi-room
+    intersections are all computed with array operations over these rows.
+    """
+
+    def __init__(self, room_ids: Sequence[int], dates: Sequence[date], slot_minutes: int = 30,
+                 start_hour: int = 7, end_hour: int = 21):
+        if slot_minutes <= 0 or (end_hour - start_hour) * 60 % slot_minutes:
+            raise ValueError("slot_minutes must evenly divide the opening hours")
+        self.room_ids = list(room_ids)
+        self.dates = list(dates)
+        self.slot_minutes = slot_minutes
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.slots_per_day = (end_hour - start_hour) * 60 // slot_minutes
+        self._room_pos = {room_id: i for i, room_id in enumerate(self.room_ids)}
+        self._date_pos = {d: i for i, d in enumerate(self.dates)}
+        # Local (mktime) timestamp at which each day's first slot starts
+        self.day_starts = np.array(
+            [int(time.mktime(datetime.combine(d, datetime.min.time()).replace(hour=start_hour).timetuple()))
+             for d in self.dates],
+            dtype=np.int64,
+        )
+        self.occupied = np.zeros((len(self.room_ids), len(self.dates), self.slots_per_day), dtype=bool)
+
+    @property
+    def window(self) -> Tuple[int, int]:
+        """[first slot start, last slot end) as Unix timestamps."""
+        if not self.dates:
+            return 0, 0
+        return int(self.day_starts[0]), int(self.day_starts[-1]) + self.slots_per_day * self.slot_minutes * 60
+
+    def _flat_positions(self, timestamps: np.ndarray, round_up: bool) -> np.ndarray:
+        """Map timestamps onto the concatenated day rows, clipping outside opening hours."""
+        slot_seconds = self.slot_minutes * 60
+        day = np.clip(np.searchsorted(self.day_starts, timestamps, side="right") - 1, 0, len(self.dates) - 1)
+        offset = timestamps - self.day_starts[day]
+        if round_up:
+            offset = -(-offset // slot_seconds)
+        else:
+            offset = offset // slot_seconds
+        return day * self.slots_per_day + np.clip(offset, 0, self.slots_per_day)
+
+    def mark_busy(self, room_ids: Iterable[int], starts: Iterable[int], ends: Iterable[int]):
+        """Mark [start, end) intervals of the given rooms as occupied."""
+        rooms = np.fromiter((self._room_pos.get(r, -1) for r in room_ids), dtype=np.int64)
+        starts = np.asarray(list(starts), dtype=np.int64)
+        ends = np.asarray(list(ends), dtype=np.int64)
+        if not self.dates or rooms.size == 0:
+            return
+        keep = rooms >= 0
+        rooms, starts, ends = rooms[keep], starts[keep], ends[keep]
+
+        total = len(self.dates) * self.slots_per_day
+        first = self._flat_positions(starts, round_up=False)
+        last = self._flat_positions(ends, round_up=True)
+        keep = last > first
+        rooms, first, last = rooms[keep], first[keep], last[keep]
+
+        # Difference array per room: +1 where a booking starts, -1 past its end
+        deltas = np.zeros((len(self.room_ids), total + 1), dtype=np.int32)
+        np.add.at(deltas, (rooms, first), 1)
+        np.add.at(deltas, (rooms, last), -1)
+        covered = np.cumsum(deltas[:, :total], axis=1) > 0
+        self.occupied |= covered.reshape(self.occupied.shape)
+
+    def free(self, room_id: int, day: date) -> np.ndarray:
+        """Boolean free row for one room-day."""
+        return ~self.occupied[self._room_pos[room_id], self._date_pos[day]]
+
+    def common_free(self, room_ids: Optional[Sequence[int]] = None) -> np.ndarray:
+        """(days, slots) mask of slots free in every one of the rooms."""
+        rows = self.occupied if room_ids is None else self.occupied[[self._room_pos[r] for r in room_ids]]
+        return ~rows.any(axis=0)
+
+    def slot_start(self, day: date, slot: int) -> datetime:
+        return datetime.combine(day, datetime.min.time()) + timedelta(
+            hours=self.start_hour, minutes=slot * self.slot_minutes
+        )
+
+    @staticmethod
+    def free_runs(free_row: np.ndarray, min_slots: int = 1) -> List[Tuple[int, int]]:
+        """Maximal [first, last) slot runs of a free row that are at least `min_slots` long."""
+        padded = np.concatenate(([0], free_row.astype(np.int8), [0]))
+        edges = np.diff(padded)
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1)
+        long_enough = (run_ends - run_starts) >= max(min_slots, 1)
+        return list(zip(run_starts[long_enough].tolist(), run_ends[long_enough].tolist()))
+
+    def free_slots(self, room_id: int, day: date) -> List[Dict[str, str]]:
+        """Free slots of one room-day as HH:MM start/end pairs."""
+        return [self.format_window(day, slot, slot + 1) for slot in np.flatnonzero(self.free(room_id, day)).tolist()]
+
+    def format_window(self, day: date, first: int, last: int) -> Dict[str, str]:
+        """HH:MM start/end of the slot range [first, last) on a day."""
+        return {
+            "start_time": self.slot_start(day, first).strftime("%H:%M"),
+            "end_time": self.slot_start(day, last).strftime("%H:%M"),
+        }
+
+
+def load_occupancy_grid(db: Session, room_ids: Sequence[int], dates: Sequence[date], slot_minutes: int = 30,
+                        start_hour: int = 7, end_hour: int = 21, active_only: bool = False) -> OccupancyGrid:
+    """Build a grid for many rooms and days from a single range query."""
+    grid = OccupancyGrid(room_ids, dates, slot_minutes, start_hour, end_hour)
+    if not grid.room_ids or not grid.dates:
+        return grid
+    window_start, window_end = grid.window
+    query = db.query(
+        models.MRBSEntry.room_id,
+        models.MRBSEntry.start_time,
+        models.MRBSEntry.end_time,
+    ).filter(
+        models.MRBSEntry.room_id.in_(grid.room_ids),
+        models.MRBSEntry.start_time < window_end,
+        models.MRBSEntry.end_time > window_start,
+    )
+    if active_only:
+        query = query.filter(models.MRBSEntry.status == 0)
+    rows = query.all()
+    grid.mark_busy((r[0] for r in rows), (r[1] for r in rows), (r[2] for r in rows))
+    return grid
@@ -1,26 +1,13 @@
-import json
 import re
-from src.deepseek_llm import DeepSeekLLM
-from src.recurrence.recurrence_prompt import RECURRENCE_PROMPT
 
-def extract_recurrence(user_input: str) -> dict:
-    print(f"[Recurrence Parser] Received input: {user_input}")
-
-    llm = DeepSeekLLM()
-    prompt = RECURRENCE_PROMPT.format(user_input=user_input)
-    print(f"[Recurrence Parser] Generated prompt for LLM:\n{prompt}")
-
-    raw = llm._call(prompt)
-    print(f"[Recurrence Parser] Raw LLM response:\n{raw}")
-
-    cleaned = re.sub(r"^```json|```$", "", raw.strip(), flags=re.MULTILINE).strip()
-    print(f"[Recurrence Parser] Cleaned JSON string:\n{cleaned}")
-
-    try:
-        parsed = json.loads(cleaned)
-        print(f"[Recurrence Parser] Parsed recurrence data: {parsed}")
-    except json.JSONDecodeError:
-        print("[Recurrence Parser] Failed to parse JSON, returning default non-recurring response")
-        return {"is_recurring": False}
-
-    return parsed
+# Words that can only matter to a recurring booking. Questions without any of
+# them skip the recurrence part of extraction entirely.
+RECURRENCE_CUE_PATTERN = re.compile(
+    r"\b(every|each|everyday|daily|weekly|monthly|fortnightly|bi-?weekly|recurring|repeat(?:s|ing)?|"
+    r"weekdays|weekends|until|till|through|semester|term|for (?:the next )?\d+ (?:days|weeks|months)|"
+    r"(?:mon|tues|wednes|thurs|fri|satur|sun)days?)\b",
+    re.IGNORECASE,
+)
+
+def has_recurrence_cue(user_input: str) -> bool:
+    return bool(RECURRENCE_CUE_PATTERN.search(user_input))
@@ -1,76 +1,200 @@
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+import numpy as np
 from dateutil.rrule import rrulestr
-from src.availability_logic import check_availability, add_booking
 from fastapi import HTTPException
+from sqlalchemy.orm import Session
 
-async def handle_recurring_booking(params: dict, db):
-    """
-    Handles creating recurring bookings based on recurrence_rule.
-
-    Example recurrence_rule: "FREQ=WEEKLY;BYDAY=MO"
-    Or natural language like "every Monday" (You can map this to RRULE string).
-    """
+from src import models
+from src.availability_logic import observe_new_bookings, run_db_call
+from src.booking_index import booking_index
+from src.demand_histogram import demand_histogram
 
-    room_name = params.get("room_name")
-    start_date = params.get("start_date")
-    end_date = params.get("end_date")
-    start_time = params.get("start_time")
-    end_time = params.get("end_time")
-    recurrence_rule = params.get("recurrence_rule")
 
-    # Validate basic params
-    if not all([room_name, start_date, end_date, start_time, end_time, recurrence_rule]):
-        raise HTTPException(status_code=400, detail="Missing parameters for recurring booking")
-
-    # Convert to datetime objects
+def expand_occurrences(recurrence_rule: str, start_date: str, end_date: str,
+                       start_time: str, end_time: str) -> List[Tuple[int, int]]:
+    """(start_ts, end_ts) of every occurrence of the rule between start_date and end_date."""
     try:
         start_date_dt = datetime.strptime(start_date, "%Y-%m-%d")
         end_date_dt = datetime.strptime(end_date, "%Y-%m-%d")
+        start_clock = datetime.strptime(start_time, "%H:%M")
+        end_clock = datetime.strptime(end_time, "%H:%M")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
 
-    # Parse recurrence rule — for demo, support simple weekly by day
-    # Example: "every Monday" → RRULE:FREQ=WEEKLY;BYDAY=MO
-    # For simplicity, you could pre-parse or map natural language to RRULE string.
+    if end_clock <= start_clock:
+        raise HTTPException(status_code=400, detail="End time must be after start time")
 
-    # For demo, let's assume recurrence_rule is already an RRULE string.
     try:
         rule = rrulestr(recurrence_rule, dtstart=start_date_dt)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid recurrence rule: {str(e)}")
 
-    bookings_created = []
-    for occurrence in rule.between(start_date_dt, end_date_dt, inc=True):
-        date_str = occurrence.strftime("%Y-%m-%d")
-
-        # Check availability for this occurrence
-        availability = check_availability(
-            room_name=room_name,
-            date=date_str,
-            start_time=start_time,
-            end_time=end_time,
-            db=db,
-        )
+    start_offset = timedelta(hours=start_clock.hour, minutes=start_clock.minute)
+    end_offset = timedelta(hours=end_clock.hour, minutes=end_clock.minute)
+    return [
+        (int(time.mktime((day + start_offset).timetuple())), int(time.mktime((day + end_offset).timetuple())))
+        for day in rule.between(start_date_dt, end_date_dt, inc=True)
+    ]
+
+
+def create_recurring_booking(room_name: str, name: str, occurrences: List[Tuple[int, int]],
+                             created_by: str, db: Session):
+    """
+    Book every occurrence of a series or none of them.
+
+    All occurrences are checked against the room's bookings with one range
+    query, and every conflict is reported. Without conflicts, the MRBSRepeat
+    row and all of its MRBSEntry rows are written in one transaction.
+    """
+    # Lock the room row so two series for the same room cannot interleave
+    room = (
+        db.query(models.MRBSRoom)
+        .filter(models.MRBSRoom.room_name == room_name)
+        .with_for_update()
+        .first()
+    )
+    if not room:
+        db.rollback()
+        raise HTTPException(status_code=404, detail=f"Room '{room_name}' not found")
+
+    starts = np.array([s for s, _ in occurrences], dtype=np.int64)
+    ends = np.array([e for _, e in occurrences], dtype=np.int64)
+    existing = db.query(
+        models.MRBSEntry.id,
+        models.MRBSEntry.start_time,
+        models.MRBSEntry.end_time,
+    ).filter(
+        models.MRBSEntry.room_id == room.id,
+        models.MRBSEntry.start_time < int(ends.max()),
+        models.MRBSEntry.end_time > int(starts.min()),
+    ).all()
+
+    conflicts = []
+    if existing:
+        existing_ids = np.array([r[0] for r in existing], dtype=np.int64)
+        existing_starts = np.array([r[1] for r in existing], dtype=np.int64)
+        existing_ends = np.array([r[2] for r in existing], dtype=np.int64)
+        # occurrences × existing bookings overlap matrix
+        overlap = (existing_starts[None, :] < ends[:, None]) & (existing_ends[None, :] > starts[:, None])
+        for i in np.flatnonzero(overlap.any(axis=1)).tolist():
+            start_dt = datetime.fromtimestamp(int(starts[i]))
+            conflicts.append({
+                "date": start_dt.strftime("%Y-%m-%d"),
+                "start_time": start_dt.strftime("%H:%M"),
+                "end_time": datetime.fromtimestamp(int(ends[i])).strftime("%H:%M"),
+                "conflicting_booking_ids": existing_ids[overlap[i]].tolist(),
+            })
+
+    if conflicts:
+        db.rollback()
+        return {
+            "status": "unavailable",
+            "message": f"{room_name} is NOT available on the following dates: "
+                       f"{', '.join(c['date'] for c in conflicts)}.",
+            "conflicts": conflicts,
+        }
 
-        if availability["status"] != "available":
-            return {
-                "status": "unavailable",
-                "message": f"{room_name} is NOT available on {date_str} from {start_time} to {end_time}."
-            }
-
-        # Add booking
-        booking = add_booking(
-            room_name=room_name,
-            date=date_str,
-            start_time=start_time,
-            end_time=end_time,
-            created_by=params.get("created_by", "system"),
-            db=db,
+    current_datetime = datetime.now()
+    first_start, first_end = occurrences[0]
+    ical_uid = f"{room_name}_{first_start}_{first_end}_series"
+    try:
+        repeat = models.MRBSRepeat(
+            start_time=first_start,
+            end_time=first_end,
+            entry_type=0,
+            timestamp=current_datetime,
+            create_by=created_by,
+            modified_by=created_by,
+            name=name,
+            type='E',
+            description=f"Booked by {created_by}",
+            status=0,
+            ical_uid=ical_uid,
+            ical_sequence=0,
         )
-        bookings_created.append(booking)
+        db.add(repeat)
+        db.flush()
+
+        entries = [
+            models.MRBSEntry(
+                start_time=start_ts,
+                end_time=end_ts,
+                entry_type=1,
+                repeat_id=repeat.id,
+                room_id=room.id,
+                timestamp=current_datetime,
+                create_by=created_by,
+                modified_by=created_by,
+                name=name,
+                type='E',
+                description=f"Booked by {created_by}",
+                status=0,
+                ical_uid=ical_uid,
+                ical_sequence=0,
+                ical_recur_id=datetime.fromtimestamp(start_ts, timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+            )
+            for start_ts, end_ts in occurrences
+        ]
+        db.add_all(entries)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database commit failed: {e}")
+
+    bookings_created = []
+    for entry in entries:
+        booking_index.add(room.id, entry.id, entry.start_time, entry.end_time, entry.status)
+        demand_histogram.record(room.id, entry.start_time, entry.end_time, created_by, name)
+        start_dt = datetime.fromtimestamp(entry.start_time)
+        bookings_created.append({
+            "booking_id": entry.id,
+            "room": room_name,
+            "date": start_dt.strftime("%Y-%m-%d"),
+            "start_time": start_dt.strftime("%H:%M"),
+            "end_time": datetime.fromtimestamp(entry.end_time).strftime("%H:%M"),
+        })
+    observe_new_bookings(created_by, entries)
 
     return {
         "status": "success",
         "message": f"Created {len(bookings_created)} recurring bookings.",
+        "repeat_id": repeat.id,
         "bookings": bookings_created,
     }
+
+
+async def handle_recurring_booking(params: dict, db):
+    """
+    Handles creating recurring bookings based on recurrence_rule.
+
+    Example recurrence_rule: "FREQ=WEEKLY;BYDAY=MO"
+    The whole series is checked up front and created in one transaction.
+    """
+
+    room_name = params.get("room_name")
+    start_date = params.get("start_date")
+    end_date = params.get("end_date")
+    start_time = params.get("start_time")
+    end_time = params.get("end_time")
+    recurrence_rule = params.get("recurrence_rule")
+
+    # Validate basic params
+    if not all([room_name, start_date, end_date, start_time, end_time, recurrence_rule]):
+        raise HTTPException(status_code=400, detail="Missing parameters for recurring booking")
+
+    occurrences = expand_occurrences(recurrence_rule, start_date, end_date, start_time, end_time)
+    if not occurrences:
+        raise HTTPException(status_code=400, detail="Recurrence rule produces no dates in the given range")
+
+    created_by = params.get("created_by", "system")
+    return await run_db_call(
+        create_recurring_booking,
+        room_name,
+        params.get("name") or f"Recurring booking by {created_by}",
+        occurrences,
+        created_by,
+        db=db,
+    )
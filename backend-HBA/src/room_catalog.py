@@ -0,0 +1,206 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src import models
+
+# Room metadata is reloaded after this many seconds even without a local
+# change, so edits made through the MRBS web UI are picked up.
+ROOM_CATALOG_TTL = int(os.getenv("ROOM_CATALOG_TTL", "600"))
+
+ROOM_FEATURE_KEYWORDS = {
+    'projector': ['projector', 'projection'],
+    'whiteboard': ['whiteboard', 'board'],
+    'tv': ['tv', 'television', 'screen'],
+    'ac': ['ac', 'air conditioning', 'aircon'],
+    'wifi': ['wifi', 'wireless'],
+    'video_conference': ['video', 'conference', 'zoom', 'teams'],
+    'phone': ['phone', 'telephone'],
+    'windows': ['window', 'natural light'],
+    'kitchen': ['kitchen', 'pantry', 'coffee'],
+    'parking': ['parking', 'garage'],
+}
+
+
+def parse_room_features(description: Optional[str]) -> FrozenSet[str]:
+    """Features mentioned in a room description."""
+    if not description:
+        return frozenset()
+    description = description.lower()
+    return frozenset(feature for feature, keywords in ROOM_FEATURE_KEYWORDS.items()
+                     if any(keyword in description for keyword in keywords))
+
+
+class CatalogRoom(NamedTuple):
+    id: int
+    room_name: str
+    capacity: int
+    area_id: int
+    description: Optional[str]
+    sort_key: str
+    room_admin_email: Optional[str]
+    custom_html: Optional[str]
+    features: FrozenSet[str]
+
+
+class _Snapshot:
+    """Immutable lookup tables over the enabled rooms, sorted by capacity."""
+
+    __slots__ = ("rooms", "capacities", "by_id", "by_name", "by_area", "by_feature", "version", "loaded_at")
+
+    def __init__(self, rooms: List[CatalogRoom], version: int):
+        self.rooms = sorted(rooms, key=lambda room: (room.capacity, room.id))
+        self.capacities = [room.capacity for room in self.rooms]
+        self.by_id = {room.id: room for room in self.rooms}
+        self.by_name = {room.room_name: room for room in self.rooms}
+        self.by_area: Dict[int, List[CatalogRoom]] = {}
+        self.by_feature: Dict[str, List[CatalogRoom]] = {}
+        for room in self.rooms:
+            self.by_area.setdefault(room.area_id, []).append(room)
+            for feature in room.features:
+                self.by_feature.setdefault(feature, []).append(room)
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+
+class RoomCatalog:
+    """
+    In-process catalog of enabled rooms for capacity, area and feature lookups.
+
+    Every committed local insert/update/delete of an MRBSRoom bumps `version`;
+    the next read then reloads the catalog with one query. Readers get a consistent
+    snapshot without taking a lock.
+    """
+
+    def __init__(self, ttl_seconds: int = ROOM_CATALOG_TTL):
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+
+    def load(self, db: Session) -> _Snapshot:
+        version = self.version
+        rows = db.query(models.MRBSRoom).filter(models.MRBSRoom.disabled == False).all()  # noqa: E712
+        snapshot = _Snapshot([
+            CatalogRoom(room.id, room.room_name, room.capacity or 0, room.area_id, room.description,
+                        room.sort_key or "", room.room_admin_email, room.custom_html,
+                        parse_room_features(room.description))
+            for room in rows
+        ], version)
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def _current(self, db: Optional[Session]) -> Optional[_Snapshot]:
+        snapshot = self._snapshot
+        fresh = (snapshot is not None and snapshot.version == self.version
+                 and time.monotonic() - snapshot.loaded_at <= self.ttl_seconds)
+        if not fresh and db is not None:
+            snapshot = self.load(db)
+        return snapshot
+
+    def rooms(self, db: Optional[Session] = None) -> List[CatalogRoom]:
+        """All enabled rooms, smallest first."""
+        snapshot = self._current(db)
+        return list(snapshot.rooms) if snapshot else []
+
+    def get(self, room_id: int, db: Optional[Session] = None) -> Optional[CatalogRoom]:
+        snapshot = self._current(db)
+        return snapshot.by_id.get(room_id) if snapshot else None
+
+    def by_name(self, room_name: str, db: Optional[Session] = None) -> Optional[CatalogRoom]:
+        snapshot = self._current(db)
+        return snapshot.by_name.get(room_name) if snapshot else None
+
+    def at_least(self, seats: int, db: Optional[Session] = None) -> List[CatalogRoom]:
+        """Rooms with at least `seats` seats, smallest first."""
+        snapshot = self._current(db)
+        if not snapshot:
+            return []
+        return snapshot.rooms[bisect_left(snapshot.capacities, seats):]
+
+    def smallest_at_least(self, seats: int, db: Optional[Session] = None) -> Optional[CatalogRoom]:
+        """The smallest room that seats `seats`, or None."""
+        snapshot = self._current(db)
+        if not snapshot:
+            return None
+        position = bisect_left(snapshot.capacities, seats)
+        return snapshot.rooms[position] if position < len(snapshot.rooms) else None
+
+    def nearest_capacity(self, capacity: int, k: int, db: Optional[Session] = None, min_seats: int = 0,
+                         exclude: Iterable[int] = ()) -> List[CatalogRoom]:
+        """
+        Up to k rooms closest in capacity to `capacity` that seat at least `min_seats`.
+
+        Walks outwards from the bisect position, so ties go to the smaller room.
+        """
+        snapshot = self._current(db)
+        if not snapshot or k <= 0:
+            return []
+        exclude = set(exclude)
+        floor = bisect_left(snapshot.capacities, min_seats)
+        above = max(bisect_left(snapshot.capacities, capacity), floor)
+        below = above - 1
+        result = []
+        while len(result) < k and (below >= floor or above < len(snapshot.rooms)):
+            take_below = below >= floor and (
+                above >= len(snapshot.rooms)
+                or capacity - snapshot.capacities[below] <= snapshot.capacities[above] - capacity
+            )
+            if take_below:
+                room, below = snapshot.rooms[below], below - 1
+            else:
+                room, above = snapshot.rooms[above], above + 1
+            if room.id not in exclude:
+                result.append(room)
+        return result
+
+    def in_area(self, area_id: int, db: Optional[Session] = None) -> List[CatalogRoom]:
+        snapshot = self._current(db)
+        return list(snapshot.by_area.get(area_id, [])) if snapshot else []
+
+    def with_features(self, features: Iterable[str], db: Optional[Session] = None) -> List[CatalogRoom]:
+        """Rooms whose description mentions every one of `features`, smallest first."""
+        snapshot = self._current(db)
+        if not snapshot:
+            return []
+        features = set(features)
+        if not features:
+            return list(snapshot.rooms)
+        rarest = min(features, key=lambda feature: len(snapshot.by_feature.get(feature, [])))
+        return [room for room in snapshot.by_feature.get(rarest, []) if features <= room.features]
+
+
+room_catalog = RoomCatalog()
+
+
+# Invalidate only once a room change is committed: a flush-time invalidation
+# lets a concurrent reader reload the old rows before the commit lands, and a
+# rolled-back change would needlessly drop the cache.
+_ROOMS_CHANGED = "room_catalog_dirty"
+
+
+@event.listens_for(Session, "after_flush")
+def _note_room_changes(session, flush_context):
+    if any(isinstance(obj, models.MRBSRoom) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info[_ROOMS_CHANGED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _rooms_committed(session):
+    if session.info.pop(_ROOMS_CHANGED, False):
+        room_catalog.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _rooms_rolled_back(session):
+    session.info.pop(_ROOMS_CHANGED, None)
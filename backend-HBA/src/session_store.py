@@ -0,0 +1,192 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Multi-turn slot-filling state for /ask_llm/, keyed by session_id.
+# SESSION_BACKEND=memory keeps it per process; SESSION_BACKEND=sqlite stores it
+# in a WAL-mode SQLite file that every uvicorn worker on the host can share.
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "data/sessions.db")
+SESSION_TTL = int(os.getenv("SESSION_TTL", "1800"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+
+
+class SessionBackend(ABC):
+    """Interface shared by the session backends."""
+
+    name = "base"
+
+    def __init__(self, ttl_seconds: int = SESSION_TTL, max_sessions: int = SESSION_MAX):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._stats_lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _count(self, evicted: int = 0, expired: int = 0):
+        with self._stats_lock:
+            self.evictions += evicted
+            self.expirations += expired
+
+    @abstractmethod
+    def get(self, session_id: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def set(self, session_id: str, session: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def active_sessions(self) -> int:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "active_sessions": self.active_sessions(),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class MemorySessionBackend(SessionBackend):
+    """Per-process LRU of sessions with idle TTL."""
+
+    name = "memory"
+
+    def __init__(self, ttl_seconds: int = SESSION_TTL, max_sessions: int = SESSION_MAX):
+        super().__init__(ttl_seconds, max_sessions)
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id, default=None):
+        with self._lock:
+            item = self._sessions.get(session_id)
+            if item is None:
+                return default
+            expires_at, session = item
+            if expires_at < time.time():
+                del self._sessions[session_id]
+                self._count(expired=1)
+                return default
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def set(self, session_id, session):
+        with self._lock:
+            self._sessions[session_id] = (time.time() + self.ttl_seconds, session)
+            self._sessions.move_to_end(session_id)
+            evicted = 0
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self._count(evicted=evicted)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def active_sessions(self):
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._sessions.items() if expires_at < now]
+            for key in expired:
+                del self._sessions[key]
+            active = len(self._sessions)
+        if expired:
+            self._count(expired=len(expired))
+        return active
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Sessions as JSON rows in a WAL-mode SQLite file shared by all workers on a host."""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str = SESSION_DB_PATH, ttl_seconds: int = SESSION_TTL,
+                 max_sessions: int = SESSION_MAX):
+        super().__init__(ttl_seconds, max_sessions)
+        self.db_path = db_path
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._get_connection()
+        conn.execute('''CREATE TABLE IF NOT EXISTS chat_sessions (
+            session_id TEXT PRIMARY KEY, data TEXT NOT NULL,
+            expires_at REAL NOT NULL, updated_at REAL NOT NULL)''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated ON chat_sessions(updated_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_chat_sessions_expires ON chat_sessions(expires_at)')
+        conn.commit()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if not hasattr(self._local, 'connection'):
+            conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = conn
+        return self._local.connection
+
+    def get(self, session_id, default=None):
+        conn = self._get_connection()
+        row = conn.execute(
+            'SELECT data, expires_at FROM chat_sessions WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        if row is None:
+            return default
+        if row[1] < time.time():
+            conn.execute('DELETE FROM chat_sessions WHERE session_id = ?', (session_id,))
+            conn.commit()
+            self._count(expired=1)
+            return default
+        return json.loads(row[0])
+
+    def set(self, session_id, session):
+        now = time.time()
+        conn = self._get_connection()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO chat_sessions (session_id, data, expires_at, updated_at) VALUES (?, ?, ?, ?)',
+                (session_id, json.dumps(session, default=str), now + self.ttl_seconds, now),
+            )
+            expired = conn.execute('DELETE FROM chat_sessions WHERE expires_at < ?', (now,)).rowcount
+            # Size cap: drop the least recently updated sessions beyond max_sessions
+            evicted = conn.execute(
+                '''DELETE FROM chat_sessions WHERE session_id IN (
+                       SELECT session_id FROM chat_sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)''',
+                (self.max_sessions,),
+            ).rowcount
+        if expired or evicted:
+            self._count(evicted=evicted, expired=expired)
+
+    def delete(self, session_id):
+        conn = self._get_connection()
+        with conn:
+            conn.execute('DELETE FROM chat_sessions WHERE session_id = ?', (session_id,))
+
+    def active_sessions(self):
+        row = self._get_connection().execute(
+            'SELECT COUNT(*) FROM chat_sessions WHERE expires_at >= ?', (time.time(),)
+        ).fetchone()
+        return row[0]
+
+
+def create_session_backend(backend: str = SESSION_BACKEND) -> SessionBackend:
+    """Session backend selected by SESSION_BACKEND, falling back to memory."""
+    if backend == "sqlite":
+        try:
+            return SQLiteSessionBackend()
+        except Exception as e:
+            print(f"⚠️ SQLite session store unavailable ({e}), using in-memory sessions")
+    return MemorySessionBackend()
@@ -0,0 +1,160 @@
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request stage timing, off by default. A request handler opens a trace,
+# pipeline code wraps its stages in span(); outside a trace span() does
+# nothing. Stage names and query counts are internal, so the Server-Timing
+# header and the histogram endpoint are only served to callers presenting
+# STAGE_TIMING_ADMIN_TOKEN (the endpoint is disabled while it is unset).
+# Bucket bounds are upper edges in milliseconds, the last bucket is open-ended.
+STAGE_TIMING_ENABLED = os.getenv("STAGE_TIMING_ENABLED", "false").lower() == "true"
+STAGE_TIMING_ADMIN_TOKEN = os.getenv("STAGE_TIMING_ADMIN_TOKEN", "")
+STAGE_TIMING_BUCKETS_MS = [
+    float(bound) for bound in
+    os.getenv("STAGE_TIMING_BUCKETS_MS", "1,2,5,10,20,50,100,200,500,1000,2000,5000,10000").split(",")
+]
+
+
+def is_trusted_caller(token: Optional[str]) -> bool:
+    """True if `token` matches the configured admin token."""
+    return bool(STAGE_TIMING_ADMIN_TOKEN) and token is not None and hmac.compare_digest(
+        token.encode(), STAGE_TIMING_ADMIN_TOKEN.encode())
+
+
+class Trace:
+    """Spans recorded while handling one request."""
+
+    __slots__ = ("spans", "queries", "started")
+
+    def __init__(self):
+        self.spans: List[tuple] = []
+        self.queries = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self) -> str:
+        """Spans as a Server-Timing header value, ending with the request total."""
+        metrics = [f'{name};dur={duration:.2f};desc="{queries} queries"' for name, duration, queries in self.spans]
+        metrics.append(f'total;dur={self.elapsed_ms:.2f};desc="{self.queries} queries"')
+        return ", ".join(metrics)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("stage_timing_trace", default=None)
+
+
+class span:
+    """Time a pipeline stage and count its DB queries inside the current trace."""
+
+    __slots__ = ("name", "trace", "started", "queries")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace = None
+
+    def __enter__(self):
+        self.trace = _current_trace.get()
+        if self.trace is not None:
+            self.queries = self.trace.queries
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.trace is not None:
+            duration = (time.perf_counter() - self.started) * 1000
+            queries = self.trace.queries - self.queries
+            self.trace.spans.append((self.name, duration, queries))
+            stage_histograms.record(self.name, duration, queries)
+        return False
+
+
+class trace_request:
+    """Open a trace for the duration of a request; the Trace is returned by __enter__."""
+
+    __slots__ = ("trace", "token")
+
+    def __enter__(self) -> Optional[Trace]:
+        self.trace = Trace() if STAGE_TIMING_ENABLED else None
+        self.token = _current_trace.set(self.trace)
+        return self.trace
+
+    def __exit__(self, *exc):
+        _current_trace.reset(self.token)
+        return False
+
+
+class StageHistograms:
+    """Fixed-bucket latency histograms and query totals per stage name."""
+
+    def __init__(self, bounds_ms: List[float] = STAGE_TIMING_BUCKETS_MS):
+        self.bounds_ms = sorted(bounds_ms)
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, duration_ms: float, queries: int = 0):
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = {
+                    "count": 0, "total_ms": 0.0, "max_ms": 0.0, "queries": 0,
+                    "buckets": [0] * (len(self.bounds_ms) + 1),
+                }
+            stage["count"] += 1
+            stage["total_ms"] += duration_ms
+            stage["max_ms"] = max(stage["max_ms"], duration_ms)
+            stage["queries"] += queries
+            stage["buckets"][bisect_left(self.bounds_ms, duration_ms)] += 1
+
+    def _percentile(self, buckets: List[int], count: int, fraction: float, max_ms: float) -> float:
+        """Upper edge of the bucket holding the given fraction of samples (capped at the max seen)."""
+        target = fraction * count
+        seen = 0
+        for position, bucket in enumerate(buckets):
+            seen += bucket
+            if seen >= target:
+                edge = self.bounds_ms[position] if position < len(self.bounds_ms) else max_ms
+                return round(min(edge, max_ms), 3)
+        return round(max_ms, 3)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            stages = {name: {**stage, "buckets": list(stage["buckets"])} for name, stage in self._stages.items()}
+        labels = [f"le_{bound:g}" for bound in self.bounds_ms] + ["inf"]
+        result = {}
+        for name, stage in sorted(stages.items()):
+            count = stage["count"]
+            result[name] = {
+                "count": count,
+                "mean_ms": round(stage["total_ms"] / count, 3),
+                "p50_ms": self._percentile(stage["buckets"], count, 0.50, stage["max_ms"]),
+                "p95_ms": self._percentile(stage["buckets"], count, 0.95, stage["max_ms"]),
+                "p99_ms": self._percentile(stage["buckets"], count, 0.99, stage["max_ms"]),
+                "max_ms": round(stage["max_ms"], 3),
+                "queries_mean": round(stage["queries"] / count, 2),
+                "histogram": dict(zip(labels, stage["buckets"])),
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+
+
+stage_histograms = StageHistograms()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.queries += 1
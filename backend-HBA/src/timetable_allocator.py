@@ -0,0 +1,374 @@
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from src import models
+from src.booking_index import booking_index
+from src.demand_histogram import demand_histogram
+from src.recurrence.recurrence_service import expand_occurrences
+
+WEEKDAY_CODES = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+# Local search stops after this many passes without reaching a fixed point
+ALLOCATOR_MAX_PASSES = int(os.getenv("ALLOCATOR_MAX_PASSES", "10"))
+# Local search relocates at most this many blocking sessions to free a room
+ALLOCATOR_MAX_BLOCKERS = int(os.getenv("ALLOCATOR_MAX_BLOCKERS", "2"))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TimetableSession:
+    """One weekly (or otherwise recurring) teaching session of a module."""
+    module_code: str
+    weekday: int  # 0 = Monday
+    start_time: str  # HH:MM
+    duration_minutes: int
+    recurrence: str = "FREQ=WEEKLY"
+    name: Optional[str] = None
+
+    @property
+    def end_time(self) -> str:
+        start = datetime.strptime(self.start_time, "%H:%M")
+        end = start + timedelta(minutes=self.duration_minutes)
+        if end.date() != start.date():
+            raise HTTPException(status_code=400, detail=f"Session of {self.module_code} must end on the day it starts")
+        return end.strftime("%H:%M")
+
+    @property
+    def rule(self) -> str:
+        if "BYDAY" in self.recurrence.upper():
+            return self.recurrence
+        return f"{self.recurrence};BYDAY={WEEKDAY_CODES[self.weekday]}"
+
+
+@dataclass
+class AllocationPlan:
+    sessions: List[TimetableSession]
+    students: List[Optional[int]]
+    occurrences: List[List[Tuple[int, int]]]
+    rooms: list
+    assignment: Dict[int, int] = field(default_factory=dict)  # session index -> room position
+    unallocated: Dict[int, str] = field(default_factory=dict)  # session index -> reason
+    greedy_allocated: int = 0
+    moves: int = 0
+
+    def wasted_seats(self) -> int:
+        return sum(self.rooms[r].capacity - self.students[i] for i, r in self.assignment.items())
+
+
+def _expand(sessions: List[TimetableSession], semester_start: str, semester_end: str) -> List[List[Tuple[int, int]]]:
+    # Sessions of a timetable share a handful of (rule, time) patterns
+    expanded: Dict[Tuple[str, str, str], List[Tuple[int, int]]] = {}
+    result = []
+    for session in sessions:
+        key = (session.rule, session.start_time, session.end_time)
+        if key not in expanded:
+            expanded[key] = expand_occurrences(session.rule, semester_start, semester_end, *key[1:])
+        result.append(expanded[key])
+    return result
+
+
+def _session_conflicts(occurrences: List[List[Tuple[int, int]]], candidates: List[int]) -> Dict[int, Set[int]]:
+    """Pairs of sessions with at least one overlapping occurrence, as adjacency sets."""
+    conflicts: Dict[int, Set[int]] = {i: set() for i in candidates}
+    owners = np.concatenate([np.full(len(occurrences[i]), i, dtype=np.int64) for i in candidates])
+    starts = np.concatenate([np.array([s for s, _ in occurrences[i]], dtype=np.int64) for i in candidates])
+    ends = np.concatenate([np.array([e for _, e in occurrences[i]], dtype=np.int64) for i in candidates])
+    order = np.argsort(starts, kind="stable")
+    owners, starts, ends = owners[order], starts[order], ends[order]
+    # Occurrence i overlaps every later-starting j with start_j < end_i
+    last = np.searchsorted(starts, ends, side="left")
+    counts = np.maximum(last - np.arange(len(starts)) - 1, 0)
+    first = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = first + 1 + offsets
+    pairs = np.stack([owners[first], owners[second]], axis=1)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    for a, b in np.unique(np.sort(pairs, axis=1), axis=0).tolist():
+        conflicts[a].add(b)
+        conflicts[b].add(a)
+    return conflicts
+
+
+def _blocked_by_existing(occurrences: List[List[Tuple[int, int]]], candidates: List[int], rooms: list,
+                         db: Session) -> np.ndarray:
+    """(sessions, rooms) mask of rooms already booked during any occurrence of a session."""
+    blocked = np.zeros((len(occurrences), len(rooms)), dtype=bool)
+    starts = np.array([s for i in candidates for s, _ in occurrences[i]], dtype=np.int64)
+    ends = np.array([e for i in candidates for _, e in occurrences[i]], dtype=np.int64)
+    offsets = np.cumsum([0] + [len(occurrences[i]) for i in candidates[:-1]])
+    position = {room.id: r for r, room in enumerate(rooms)}
+
+    existing = db.query(models.MRBSEntry.room_id, models.MRBSEntry.start_time, models.MRBSEntry.end_time).filter(
+        models.MRBSEntry.room_id.in_(list(position)),
+        models.MRBSEntry.start_time < int(ends.max()),
+        models.MRBSEntry.end_time > int(starts.min()),
+    ).all()
+    by_room: Dict[int, List[Tuple[int, int]]] = {}
+    for room_id, start_ts, end_ts in existing:
+        by_room.setdefault(room_id, []).append((start_ts, end_ts))
+
+    for room_id, intervals in by_room.items():
+        intervals.sort()
+        room_starts = np.array([s for s, _ in intervals], dtype=np.int64)
+        max_ends = np.maximum.accumulate(np.array([e for _, e in intervals], dtype=np.int64))
+        # Latest booking starting before each occurrence ends; it overlaps if
+        # any booking up to it ends after the occurrence starts
+        before = np.searchsorted(room_starts, ends, side="left")
+        hit = (before > 0) & (max_ends[np.maximum(before - 1, 0)] > starts)
+        blocked[candidates, position[room_id]] = np.logical_or.reduceat(hit, offsets)
+    return blocked
+
+
+def _free_room(i: int, rooms_for: np.ndarray, conflicts: Dict[int, Set[int]],
+               room_sessions: List[Set[int]], exclude: int = -1) -> Optional[int]:
+    """Smallest feasible room with no conflicting session assigned to it."""
+    for r in rooms_for:
+        if r != exclude and conflicts[i].isdisjoint(room_sessions[r]):
+            return int(r)
+    return None
+
+
+def plan_allocation(sessions: List[TimetableSession], semester_start: str, semester_end: str, db: Session,
+                    lock_rooms: bool = False, max_passes: int = ALLOCATOR_MAX_PASSES,
+                    max_blockers: int = ALLOCATOR_MAX_BLOCKERS) -> AllocationPlan:
+    """
+    Assign a room to every session for the whole semester.
+
+    Greedy best fit takes the most constrained sessions first and gives each
+    the smallest free room that seats the module; local search then places
+    leftover sessions by moving up to ALLOCATOR_MAX_BLOCKERS blocking sessions
+    elsewhere and shrinks rooms that became free. Nothing is written.
+    """
+    module_codes = {session.module_code for session in sessions}
+    students_by_code = dict(db.query(models.MRBSModule.module_code, models.MRBSModule.number_of_students).filter(
+        models.MRBSModule.module_code.in_(module_codes)
+    ).all())
+    query = db.query(models.MRBSRoom).filter(models.MRBSRoom.disabled == False)  # noqa: E712
+    if lock_rooms:
+        # Held until commit so nothing else books these rooms in between
+        query = query.with_for_update()
+    rooms = sorted(query.all(), key=lambda room: (room.capacity, room.id))
+
+    plan = AllocationPlan(
+        sessions=sessions,
+        students=[students_by_code.get(session.module_code) for session in sessions],
+        occurrences=_expand(sessions, semester_start, semester_end),
+        rooms=rooms,
+    )
+    candidates = []
+    for i, session in enumerate(sessions):
+        if plan.students[i] is None:
+            plan.unallocated[i] = f"Module '{session.module_code}' not found"
+        elif not plan.occurrences[i]:
+            plan.unallocated[i] = "Recurrence produces no dates in the semester"
+        else:
+            candidates.append(i)
+    if not candidates or not rooms:
+        for i in candidates:
+            plan.unallocated[i] = "No rooms available"
+        return plan
+
+    capacities = np.array([room.capacity for room in rooms], dtype=np.int64)
+    seats_ok = capacities[None, :] >= np.array([plan.students[i] or 0 for i in range(len(sessions))])[:, None]
+    feasible = seats_ok & ~_blocked_by_existing(plan.occurrences, candidates, rooms, db)
+    rooms_for = {i: np.flatnonzero(feasible[i]) for i in candidates}
+    conflicts = _session_conflicts(plan.occurrences, candidates)
+    room_sessions: List[Set[int]] = [set() for _ in rooms]
+
+    def place(i: int, r: int):
+        plan.assignment[i] = r
+        room_sessions[r].add(i)
+
+    def unplace(i: int):
+        room_sessions[plan.assignment.pop(i)].discard(i)
+
+    # Greedy best fit
+    order = sorted(candidates, key=lambda i: (len(rooms_for[i]), -plan.students[i], i))
+    for i in order:
+        r = _free_room(i, rooms_for[i], conflicts, room_sessions)
+        if r is not None:
+            place(i, r)
+    plan.greedy_allocated = len(plan.assignment)
+
+    # Local search
+    for _ in range(max_passes):
+        improved = False
+        for i in order:
+            if i in plan.assignment:
+                continue
+            for r in rooms_for[i]:
+                blockers = conflicts[i] & room_sessions[r]
+                if len(blockers) > max_blockers:
+                    continue
+                moved = []
+                for j in sorted(blockers):
+                    target = _free_room(j, rooms_for[j], conflicts, room_sessions, exclude=r)
+                    if target is None:
+                        break
+                    unplace(j)
+                    place(j, target)
+                    moved.append(j)
+                else:
+                    place(i, int(r))
+                    plan.moves += len(moved)
+                    improved = True
+                    break
+                # Put back the blockers already moved
+                for j in moved:
+                    unplace(j)
+                    place(j, int(r))
+        for i in sorted(plan.assignment, key=lambda i: plan.students[i] - capacities[plan.assignment[i]]):
+            current = plan.assignment[i]
+            smaller = rooms_for[i][capacities[rooms_for[i]] < capacities[current]]
+            r = _free_room(i, smaller, conflicts, room_sessions)
+            if r is not None:
+                unplace(i)
+                place(i, r)
+                plan.moves += 1
+                improved = True
+        if not improved:
+            break
+
+    for i in candidates:
+        if i in plan.assignment:
+            continue
+        if not seats_ok[i].any():
+            plan.unallocated[i] = f"No room seats {plan.students[i]} students"
+        elif not rooms_for[i].size:
+            plan.unallocated[i] = "Every large enough room is already booked"
+        else:
+            plan.unallocated[i] = "Clashes with other sessions in every suitable room"
+    return plan
+
+
+def _write_plan(plan: AllocationPlan, created_by: str, db: Session) -> Dict[int, int]:
+    """Insert a series per allocated session in one transaction; returns session index -> repeat id."""
+    current_datetime = datetime.now()
+    description = f"Booked by {created_by}"
+    allocated = sorted(plan.assignment)
+    try:
+        repeats = []
+        for i in allocated:
+            session, room = plan.sessions[i], plan.rooms[plan.assignment[i]]
+            first_start, first_end = plan.occurrences[i][0]
+            repeats.append(models.MRBSRepeat(
+                start_time=first_start,
+                end_time=first_end,
+                entry_type=0,
+                timestamp=current_datetime,
+                create_by=created_by,
+                modified_by=created_by,
+                name=session.name or session.module_code,
+                type='E',
+                description=description,
+                status=0,
+                ical_uid=f"{room.room_name}_{first_start}_{first_end}_series",
+                ical_sequence=0,
+            ))
+        db.add_all(repeats)
+        db.flush()
+
+        rows = []
+        for i, repeat in zip(allocated, repeats):
+            for start_ts, end_ts in plan.occurrences[i]:
+                rows.append({
+                    "start_time": start_ts,
+                    "end_time": end_ts,
+                    "entry_type": 1,
+                    "repeat_id": repeat.id,
+                    "room_id": plan.rooms[plan.assignment[i]].id,
+                    "timestamp": current_datetime,
+                    "create_by": created_by,
+                    "modified_by": created_by,
+                    "name": repeat.name,
+                    "type": 'E',
+                    "description": description,
+                    "status": 0,
+                    "ical_uid": repeat.ical_uid,
+                    "ical_sequence": 0,
+                    "ical_recur_id": datetime.fromtimestamp(start_ts, timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+                })
+        if rows:
+            db.execute(insert(models.MRBSEntry), rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database commit failed: {e}")
+
+    for room_id in {plan.rooms[r].id for r in plan.assignment.values()}:
+        booking_index.invalidate(room_id)
+    for row in rows:
+        demand_histogram.record(row["room_id"], row["start_time"], row["end_time"], created_by, row["name"])
+    return {i: repeat.id for i, repeat in zip(allocated, repeats)}
+
+
+def allocate_timetable(sessions: List[TimetableSession], semester_start: str, semester_end: str,
+                       created_by: str, db: Session, dry_run: bool = False):
+    """
+    Allocate rooms for a semester timetable and book them all at once.
+
+    With dry_run the plan is returned without booking anything.
+    """
+    if not sessions:
+        raise HTTPException(status_code=400, detail="Timetable has no sessions")
+    for session in sessions:
+        if not 0 <= session.weekday <= 6 or session.duration_minutes <= 0:
+            raise HTTPException(status_code=400, detail=f"Invalid weekday or duration for {session.module_code}")
+
+    started = time.perf_counter()
+    plan = plan_allocation(sessions, semester_start, semester_end, db, lock_rooms=not dry_run)
+    planned_ms = (time.perf_counter() - started) * 1000
+    logger.info("Planned %d/%d sessions in %.0f ms (%d local-search moves)",
+                len(plan.assignment), len(sessions), planned_ms, plan.moves)
+
+    if dry_run:
+        db.rollback()
+        repeat_ids = {}
+    else:
+        repeat_ids = _write_plan(plan, created_by, db)
+
+    allocated = []
+    for i, r in sorted(plan.assignment.items()):
+        session, room = plan.sessions[i], plan.rooms[r]
+        allocated.append({
+            "module_code": session.module_code,
+            "weekday": session.weekday,
+            "start_time": session.start_time,
+            "end_time": session.end_time,
+            "room": room.room_name,
+            "capacity": room.capacity,
+            "students": plan.students[i],
+            "occurrences": len(plan.occurrences[i]),
+            "repeat_id": repeat_ids.get(i),
+        })
+    unallocated = [
+        {
+            "module_code": plan.sessions[i].module_code,
+            "weekday": plan.sessions[i].weekday,
+            "start_time": plan.sessions[i].start_time,
+            "reason": reason,
+        }
+        for i, reason in sorted(plan.unallocated.items())
+    ]
+    return {
+        "status": "success" if not unallocated else "partial",
+        "message": f"{'Planned' if dry_run else 'Booked'} {len(allocated)} of {len(sessions)} sessions.",
+        "allocated": allocated,
+        "unallocated": unallocated,
+        "stats": {
+            "greedy_allocated": plan.greedy_allocated,
+            "local_search_moves": plan.moves,
+            "wasted_seats": plan.wasted_seats(),
+            "bookings_created": 0 if dry_run else sum(len(plan.occurrences[i]) for i in plan.assignment),
+            "planning_ms": round(planned_ms, 1),
+        },
+    }
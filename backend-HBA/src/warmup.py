@@ -0,0 +1,85 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class LazyComponent:
+    """
+    A heavy object (model, engine, NLP pipeline) built on first use.
+
+    Construction happens once, under a lock, no matter how many threads ask
+    for it at the same time. Load time and failures are recorded for the
+    readiness endpoint.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._instance = None
+        self._loaded = False
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> Any:
+        if self._loaded:
+            return self._instance
+        with self._lock:
+            if not self._loaded:
+                started = time.perf_counter()
+                try:
+                    self._instance = self._factory()
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                finally:
+                    self.load_seconds = round(time.perf_counter() - started, 3)
+                self.error = None
+                self._loaded = True
+        return self._instance
+
+    def status(self) -> Dict[str, Any]:
+        return {"loaded": self._loaded, "load_seconds": self.load_seconds, "error": self.error}
+
+
+_components: Dict[str, LazyComponent] = {}
+
+
+def lazy_component(name: str, factory: Callable[[], Any]) -> LazyComponent:
+    """Register a lazily built component so warmup() and readiness() can see it."""
+    component = LazyComponent(name, factory)
+    _components[name] = component
+    return component
+
+
+def warmup(names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Load the given components (default: all registered) and return their status."""
+    for name in (names or list(_components)):
+        component = _components.get(name)
+        if component is None:
+            continue
+        try:
+            component.get()
+            print(f"✅ Warmed up {name} in {component.load_seconds}s")
+        except Exception as e:
+            print(f"❌ Failed to warm up {name}: {e}")
+    return readiness()["components"]
+
+
+def warmup_in_background(names: Optional[Iterable[str]] = None) -> threading.Thread:
+    """Run warmup() on a daemon thread so the server can bind immediately."""
+    thread = threading.Thread(target=warmup, args=(names,), name="component-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness() -> Dict[str, Any]:
+    components = {name: component.status() for name, component in _components.items()}
+    return {
+        "ready": all(status["loaded"] for status in components.values()),
+        "components": components,
+    }
@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+# src.database builds its engine from DATABASE_URL at import time; tests use
+# their own per-test SQLite files, so point the module-level engine at a
+# throwaway database before anything imports it.
+_scratch = tempfile.mkdtemp(prefix="hba_tests_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_scratch}/default.db")
+os.environ.setdefault("DB_CHECK_ON_STARTUP", "false")
+os.environ.setdefault("WARMUP_ON_STARTUP", "false")
+os.environ.setdefault("CACHE_DB_PATH", f"{_scratch}/recommendations_cache.db")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from recommendtion.config.recommendation_config import RecommendationConfig
+from src import models  # noqa: F401  registers the tables on Base
+from src.booking_index import booking_index
+from src.database import Base
+from src.room_catalog import room_catalog
+
+RecommendationConfig.CACHE_DB_PATH = os.environ["CACHE_DB_PATH"]
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A session on a fresh MRBS schema; the in-process caches start empty."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'mrbs.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    booking_index.invalidate()
+    room_catalog.invalidate()
+    yield session
+    session.close()
+    engine.dispose()
+    booking_index.invalidate()
+    room_catalog.invalidate()
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from src import models
+
+
+def add_rooms(db, capacities, area_id=1, description="Lecture hall"):
+    """One enabled room per capacity, named R1, R2, ...; returns the rooms."""
+    if db.get(models.MRBSArea, area_id) is None:
+        db.add(models.MRBSArea(id=area_id, area_name=f"Area {area_id}"))
+    rooms = [
+        models.MRBSRoom(area_id=area_id, room_name=f"R{i + 1}", capacity=capacity, description=description)
+        for i, capacity in enumerate(capacities)
+    ]
+    db.add_all(rooms)
+    db.commit()
+    return rooms
+
+
+def add_entry(db, room_id, start, end, create_by="someone", name="Booking"):
+    """Commit one booking between two datetimes and return it."""
+    entry = models.MRBSEntry(
+        start_time=int(start.timestamp()), end_time=int(end.timestamp()), room_id=room_id,
+        timestamp=datetime.now(), create_by=create_by, modified_by=create_by, name=name,
+    )
+    db.add(entry)
+    db.commit()
+    return entry
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src import availability_logic
+from src.availability_logic import add_booking, check_availability, check_availability_async, update_booking
+from tests.factories import add_entry, add_rooms
+
+
+class _RecordingEngine:
+    def __init__(self):
+        self.threads = []
+
+    def get(self):
+        return self
+
+    def get_recommendations(self, request_data):
+        self.threads.append(threading.get_ident())
+        return [{"room_name": "R2"}]
+
+
+def test_add_booking_sees_bookings_the_index_has_not(db, monkeypatch):
+    monkeypatch.setattr(availability_logic, "get_room_recommendations", lambda *args: [])
+    room, = add_rooms(db, [30])
+    assert check_availability("R1", "2026-11-02", "09:00", "10:00", db)["status"] == "available"
+
+    # Written behind the index's back, as another worker or the MRBS web UI would
+    add_entry(db, room.id, datetime(2026, 11, 2, 12), datetime(2026, 11, 2, 13))
+
+    result = add_booking("R1", "Clash", "2026-11-02", "12:30", "13:30", "alice", db)
+    assert result["status"] == "unavailable"
+    assert check_availability("R1", "2026-11-02", "12:00", "12:30", db)["status"] == "unavailable"
+
+
+def test_update_booking_checks_the_target_slot(db, monkeypatch):
+    room, = add_rooms(db, [30])
+    add_entry(db, room.id, datetime(2026, 11, 2, 9), datetime(2026, 11, 2, 10))
+    add_entry(db, room.id, datetime(2026, 11, 2, 11), datetime(2026, 11, 2, 12))
+
+    moved = update_booking("R1", "2026-11-02", "09:00", "10:00", new_start_time="10:30", new_end_time="11:30", db=db)
+    assert moved["status"] == "unavailable"
+    moved = update_booking("R1", "2026-11-02", "09:00", "10:00", new_start_time="10:00", new_end_time="11:00", db=db)
+    assert moved["status"] == "success"
+
+
+def test_async_session_computes_recommendations_off_the_event_loop(db, tmp_path, monkeypatch):
+    room, = add_rooms(db, [30])
+    add_entry(db, room.id, datetime(2026, 11, 2, 9), datetime(2026, 11, 2, 10))
+    engine = _RecordingEngine()
+    monkeypatch.setattr(availability_logic, "enhanced_engine", engine)
+
+    async def run():
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'mrbs.db'}")
+        try:
+            async with AsyncSession(async_engine) as session:
+                return threading.get_ident(), await check_availability_async("R1", "2026-11-02", "09:00", "10:00", session)
+        finally:
+            await async_engine.dispose()
+
+    loop_thread, result = asyncio.run(run())
+    assert result["status"] == "unavailable"
+    assert result["recommendations"] == [{"room_name": "R2"}]
+    assert engine.threads and loop_thread not in engine.threads
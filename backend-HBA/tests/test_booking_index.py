@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from src.booking_index import BookingIntervalIndex
+from tests.factories import add_entry, add_rooms
+
+
+def _ts(hour, minute=0):
+    return int(datetime(2026, 11, 2, hour, minute).timestamp())
+
+
+def test_room_is_cached_until_invalidated(db):
+    index = BookingIntervalIndex()
+    room, = add_rooms(db, [30])
+    assert index.is_free(room.id, _ts(9), _ts(10), db)
+
+    entry = add_entry(db, room.id, datetime(2026, 11, 2, 9), datetime(2026, 11, 2, 10))
+    assert index.is_free(room.id, _ts(9), _ts(10), db)
+
+    index.invalidate(room.id)
+    assert index.conflicts(room.id, _ts(9, 30), _ts(11), db) == [(_ts(9), _ts(10), entry.id)]
+
+
+def test_add_and_remove_update_a_loaded_room(db):
+    index = BookingIntervalIndex()
+    room, = add_rooms(db, [30])
+    assert index.is_free(room.id, _ts(9), _ts(10), db)
+
+    index.add(room.id, 41, _ts(9), _ts(10))
+    assert not index.is_free(room.id, _ts(9, 30), _ts(9, 45))
+    assert index.free_gaps(room.id, _ts(8), _ts(11)) == [(_ts(8), _ts(9)), (_ts(10), _ts(11))]
+
+    index.remove(room.id, 41)
+    assert index.is_free(room.id, _ts(9), _ts(10))
+
+
+def test_load_that_races_with_a_write_is_not_cached(db, monkeypatch):
+    index = BookingIntervalIndex()
+    room, = add_rooms(db, [30])
+    load_room = index._load_room
+
+    def load_then_write(room_id, session):
+        intervals = load_room(room_id, session)
+        index.invalidate(room_id)
+        return intervals
+
+    monkeypatch.setattr(index, "_load_room", load_then_write)
+    index.is_free(room.id, _ts(9), _ts(10), db)
+    assert room.id not in index._rooms
+
+    monkeypatch.setattr(index, "_load_room", load_room)
+    index.is_free(room.id, _ts(9), _ts(10), db)
+    assert room.id in index._rooms
+
+    index.invalidate()
+    assert index._rooms == {}
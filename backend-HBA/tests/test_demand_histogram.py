@@ -0,0 +1,58 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from src.demand_histogram import DemandHistogram
+from tests.factories import add_entry, add_rooms
+
+
+def _yesterday(hour):
+    start = datetime.combine(datetime.now().date() - timedelta(days=1), datetime.min.time()) + timedelta(hours=hour)
+    return start, start + timedelta(hours=1)
+
+
+def test_concurrent_first_readers_share_one_rebuild(db):
+    room, = add_rooms(db, [30])
+    add_entry(db, room.id, *_yesterday(9))
+    histogram = DemandHistogram()
+    loads = []
+    load = histogram._load
+
+    def slow_load(session):
+        loads.append(session)
+        time.sleep(0.05)
+        return load(session)
+    histogram._load = slow_load
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(int(histogram.totals(db).sum()))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert results == [1, 1, 1, 1]
+
+
+def test_booking_recorded_during_a_rebuild_is_not_lost(db):
+    room, = add_rooms(db, [30])
+    add_entry(db, room.id, *_yesterday(9))
+    histogram = DemandHistogram(ttl_seconds=3600)
+    assert histogram.totals(db).sum() == 1
+    histogram.built_at -= 7200
+    load = histogram._load
+
+    def load_then_book(session):
+        rows = load(session)
+        # Committed and recorded after the rebuild's query has run
+        start, end = _yesterday(14)
+        entry = add_entry(db, room.id, start, end)
+        histogram.record(room.id, entry.start_time, entry.end_time)
+        return rows
+    histogram._load = load_then_book
+    assert histogram.totals(db).sum() == 1
+
+    histogram._load = load
+    assert histogram.totals(db).sum() == 2
+    assert histogram.totals(db).sum() == 2
@@ -0,0 +1,35 @@
+from datetime import date
+
+from src import extraction_cache as module
+from src.extraction_cache import ExtractionCache
+
+
+def _on(monkeypatch, day):
+    class _Date(date):
+        @classmethod
+        def today(cls):
+            return day
+    monkeypatch.setattr(module, "date", _Date)
+
+
+def test_relative_question_is_only_reused_on_the_same_day(monkeypatch):
+    cache = ExtractionCache(semantic=False)
+    answer = {"action": "book_room", "parameters": {"date": "2026-10-23"}}
+
+    _on(monkeypatch, date(2026, 10, 19))
+    cache.put("action", "Book R1 on Friday at 10", answer)
+    assert cache.get("action", "book r1 on friday at 10") == answer
+
+    _on(monkeypatch, date(2026, 10, 24))
+    assert cache.get("action", "book r1 on friday at 10") is None
+
+
+def test_absolute_question_survives_the_date_change(monkeypatch):
+    cache = ExtractionCache(semantic=False)
+    answer = {"action": "book_room", "parameters": {"date": "2026-10-23"}}
+
+    _on(monkeypatch, date(2026, 10, 19))
+    cache.put("action", "Book R1 on 2026-10-23 at 10", answer)
+
+    _on(monkeypatch, date(2026, 10, 24))
+    assert cache.get("action", "Book R1 on 2026-10-23 at 10") == answer
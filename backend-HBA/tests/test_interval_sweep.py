@@ -0,0 +1,26 @@
+from recommendtion.recommendations.utils.interval_sweep import (
+    common_free_windows, complement_intervals, normalize_intervals,
+)
+
+
+def test_normalize_merges_overlapping_and_touching_intervals():
+    assert normalize_intervals([(5, 7), (1, 3), (3, 4), (6, 9), (10, 10)]) == [(1, 4), (5, 9)]
+
+
+def test_complement_clips_to_the_window():
+    assert complement_intervals([(0, 2), (4, 6), (9, 12)], (1, 10)) == [(2, 4), (6, 9)]
+
+
+def test_common_free_windows_intersects_every_list():
+    free = [
+        [(0, 10), (20, 30)],
+        [(5, 25)],
+        [(0, 7), (8, 30)],
+    ]
+    assert common_free_windows(free) == [(5, 7), (8, 10), (20, 25)]
+    assert common_free_windows(free, min_length=3) == [(20, 25)]
+
+
+def test_touching_windows_do_not_overlap():
+    assert common_free_windows([[(0, 5)], [(5, 10)]]) == []
+    assert common_free_windows([[(0, 5)], []]) == []
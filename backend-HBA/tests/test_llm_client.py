@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from src.llm_client import LLMClient
+
+
+def test_retry_after_is_capped():
+    client = LLMClient(backoff_seconds=0.5, max_backoff_seconds=30)
+    response = httpx.Response(429, headers={"Retry-After": "3600"})
+    assert client._backoff(0, response) == 30
+    assert client._backoff(10, None) == 30
+    assert client._backoff(1, None) == 1.0
+
+
+def test_each_loop_gets_its_own_client_and_aclose_loop_closes_it():
+    client = LLMClient()
+
+    async def open_and_close():
+        pooled, _ = client._async("provider")
+        assert client._async("provider")[0] is pooled
+        await client.aclose_loop()
+        return pooled
+
+    first = asyncio.run(open_and_close())
+    second = asyncio.run(open_and_close())
+    assert first is not second
+    assert first.is_closed and second.is_closed
+    assert client._async_clients == {}
+
+
+URL = "http://llm.test/v1/chat/completions"
+OK = {"choices": [{"message": {"content": "hello"}}]}
+
+
+def _rate_limited_once():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "2"})
+        return httpx.Response(200, json=OK)
+    return calls, handler
+
+
+def _record_waits(client, monkeypatch):
+    waits = []
+    backoff = client._backoff
+
+    def instant(attempt, response):
+        waits.append(backoff(attempt, response))
+        return 0
+    monkeypatch.setattr(client, "_backoff", instant)
+    return waits
+
+
+def test_complete_retries_a_429_after_retry_after(monkeypatch):
+    calls, handler = _rate_limited_once()
+    client = LLMClient(transport=httpx.MockTransport(handler))
+    waits = _record_waits(client, monkeypatch)
+
+    assert client.complete("provider", URL, {}, {"model": "m"}) == "hello"
+    assert len(calls) == 2
+    assert waits == [2]
+
+
+def test_acomplete_retries_a_429_after_retry_after(monkeypatch):
+    calls, handler = _rate_limited_once()
+    client = LLMClient(transport=httpx.MockTransport(handler))
+    waits = _record_waits(client, monkeypatch)
+
+    async def run():
+        try:
+            return await client.acomplete("provider", URL, {}, {"model": "m"})
+        finally:
+            await client.aclose_loop()
+
+    assert asyncio.run(run()) == "hello"
+    assert len(calls) == 2
+    assert waits == [2]
+
+
+def test_complete_holds_each_provider_to_its_concurrency_limit():
+    lock = threading.Lock()
+    in_flight = {"now": 0, "peak": 0}
+
+    def handler(request):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        time.sleep(0.05)
+        with lock:
+            in_flight["now"] -= 1
+        return httpx.Response(200, json=OK)
+
+    client = LLMClient(max_concurrency=2, transport=httpx.MockTransport(handler))
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda _: client.complete("provider", URL, {}, {}), range(6)))
+
+    assert results == ["hello"] * 6
+    assert in_flight["peak"] == 2
+
+
+def test_acomplete_holds_each_provider_to_its_concurrency_limit():
+    in_flight = {"now": 0, "peak": 0}
+
+    async def handler(request):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.02)
+        in_flight["now"] -= 1
+        return httpx.Response(200, json=OK)
+
+    client = LLMClient(max_concurrency=2, transport=httpx.MockTransport(handler))
+
+    async def run():
+        try:
+            return await asyncio.gather(*(client.acomplete("provider", URL, {}, {}) for _ in range(6)))
+        finally:
+            await client.aclose_loop()
+
+    assert asyncio.run(run()) == ["hello"] * 6
+    assert in_flight["peak"] == 2
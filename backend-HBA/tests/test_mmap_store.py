@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+# The data package pulls in the model manager's dependencies on import
+mmap_store = pytest.importorskip("data.embeddings.mmap_store")
+MmapEmbeddingStore = mmap_store.MmapEmbeddingStore
+
+
+def _filled(path):
+    store = MmapEmbeddingStore(str(path))
+    store.append_many([1, 2, 3], np.arange(12, dtype=np.float32).reshape(3, 4))
+    store.append(2, np.full(4, 9, dtype=np.float32))
+    store.delete([3])
+    return store
+
+
+def test_compact_keeps_every_entity_with_its_vector(tmp_path):
+    store = _filled(tmp_path)
+    assert store.compact() == 2
+
+    reopened = MmapEmbeddingStore(str(tmp_path))
+    ids, vectors = reopened.matrix()
+    assert ids.tolist() == [1, 2]
+    assert vectors.tolist() == [[0, 1, 2, 3], [9, 9, 9, 9]]
+    assert sorted(f.name for f in tmp_path.iterdir()) == ["ids.1.txt", "meta.json", "tombstones.1.npy", "vectors.1.npy"]
+
+
+def test_crash_before_the_meta_write_leaves_the_old_generation(tmp_path, monkeypatch):
+    store = _filled(tmp_path)
+
+    def crash():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_write_meta", crash)
+    with pytest.raises(OSError):
+        store.compact()
+
+    reopened = MmapEmbeddingStore(str(tmp_path))
+    assert reopened.get(1).tolist() == [0, 1, 2, 3]
+    assert reopened.get(2).tolist() == [9, 9, 9, 9]
+    assert 3 not in reopened
+    assert not any(".1." in f.name for f in tmp_path.iterdir())
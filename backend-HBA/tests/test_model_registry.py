@@ -0,0 +1,47 @@
+import threading
+import time
+
+from recommendtion.recommendations.models import model_registry
+
+
+def test_failed_load_is_retried_after_the_backoff(monkeypatch):
+    monkeypatch.setattr(model_registry, "MODEL_LOAD_RETRY_SECONDS", 0.05)
+    models, calls = {}, []
+
+    def flaky(name):
+        calls.append(name)
+        if len(calls) == 1:
+            raise OSError("download failed")
+        return f"model:{name}"
+
+    assert model_registry._get_model(models, "test model", "flaky", flaky) is None
+    assert model_registry._get_model(models, "test model", "flaky", flaky) is None
+    assert len(calls) == 1
+
+    time.sleep(0.06)
+    assert model_registry._get_model(models, "test model", "flaky", flaky) == "model:flaky"
+    assert model_registry._get_model(models, "test model", "flaky", flaky) == "model:flaky"
+    assert len(calls) == 2
+
+
+def test_a_slow_load_does_not_block_loaded_models():
+    models = {"ready": "model:ready"}
+    loading, release = threading.Event(), threading.Event()
+
+    def slow(name):
+        loading.set()
+        release.wait(5)
+        return f"model:{name}"
+
+    worker = threading.Thread(target=model_registry._get_model, args=(models, "test model", "slow", slow))
+    worker.start()
+    assert loading.wait(5)
+    try:
+        started = time.perf_counter()
+        assert model_registry._get_model(models, "test model", "ready", slow) == "model:ready"
+        assert model_registry._get_model(models, "test model", "other", lambda name: "model:other") == "model:other"
+        assert time.perf_counter() - started < 1
+    finally:
+        release.set()
+        worker.join()
+    assert models["slow"] == "model:slow"
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from recommendtion.recommendations.core.preference_learner import LearningStrategy, PreferenceLearner
+from recommendtion.recommendations.data.cache_manager import CacheConfig, CacheManager
+from tests.factories import add_entry, add_rooms
+
+
+@pytest.fixture
+def learner(db, tmp_path):
+    cache = CacheManager(CacheConfig(database_path=str(tmp_path / "cache.db")))
+    return PreferenceLearner(db, embedding_model=object(), cache_manager=cache)
+
+
+def _book(db, room, days_ago, hour, user="alice"):
+    start = datetime.combine(datetime.now().date() - timedelta(days=days_ago), datetime.min.time()) + timedelta(hours=hour)
+    return add_entry(db, room.id, start, start + timedelta(hours=1), create_by=user)
+
+
+def _counted(method, calls, name):
+    def wrapper(*args, **kwargs):
+        calls[name] += 1
+        return method(*args, **kwargs)
+    return wrapper
+
+
+def test_second_call_catches_up_instead_of_rebuilding(db, learner, monkeypatch):
+    room, = add_rooms(db, [20])
+    for day in range(6):
+        _book(db, room, days_ago=day + 1, hour=10)
+
+    first = learner.learn_user_preferences("alice")
+    assert first.learning_state.bookings == 6
+
+    calls = {"_build_state": 0, "_catch_up_profile": 0}
+    for name in calls:
+        monkeypatch.setattr(learner, name, _counted(getattr(learner, name), calls, name))
+
+    _book(db, room, days_ago=0, hour=14)
+    second = learner.learn_user_preferences("alice")
+
+    assert calls == {"_build_state": 0, "_catch_up_profile": 1}
+    assert second.learning_state.bookings == 7
+    assert learner._get_cached_profile("alice").learning_state.bookings == 7
+
+
+def test_observe_booking_updates_the_cached_profile(db, learner):
+    room, = add_rooms(db, [20])
+    for day in range(6):
+        _book(db, room, days_ago=day + 1, hour=9)
+    learner.learn_user_preferences("alice")
+
+    learner.observe_booking("alice", _book(db, room, days_ago=0, hour=16))
+    cached = learner._get_cached_profile("alice")
+    assert cached.learning_state.bookings == 7
+    assert 16 in cached.learning_state.hours
+
+    # Catch-up does not fold the observed booking in a second time
+    assert learner.learn_user_preferences("alice").learning_state.bookings == 7
+
+
+def test_strategy_change_rebuilds(db, learner):
+    room, = add_rooms(db, [20])
+    for day in range(6):
+        _book(db, room, days_ago=day + 1, hour=11)
+    learner.learn_user_preferences("alice", LearningStrategy.HYBRID)
+    profile = learner.learn_user_preferences("alice", LearningStrategy.IMPLICIT)
+    assert profile.learning_state.strategy == LearningStrategy.IMPLICIT.value
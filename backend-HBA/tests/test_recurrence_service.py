@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from src import models
+from src.recurrence.recurrence_service import create_recurring_booking, expand_occurrences
+from tests.factories import add_entry, add_rooms
+
+
+def _mondays():
+    return expand_occurrences("FREQ=WEEKLY;BYDAY=MO", "2026-11-02", "2026-11-23", "10:00", "11:00")
+
+
+def test_every_conflict_is_reported_and_nothing_is_written(db):
+    room, = add_rooms(db, [30])
+    first = add_entry(db, room.id, datetime(2026, 11, 9, 10, 30), datetime(2026, 11, 9, 11, 30))
+    second = add_entry(db, room.id, datetime(2026, 11, 23, 9), datetime(2026, 11, 23, 10, 15))
+
+    result = create_recurring_booking("R1", "Seminar", _mondays(), "alice", db)
+
+    assert result["status"] == "unavailable"
+    assert [(c["date"], c["conflicting_booking_ids"]) for c in result["conflicts"]] == [
+        ("2026-11-09", [first.id]),
+        ("2026-11-23", [second.id]),
+    ]
+    assert db.query(models.MRBSEntry).count() == 2
+    assert db.query(models.MRBSRepeat).count() == 0
+
+
+def test_free_series_is_booked_in_full(db):
+    add_rooms(db, [30])
+    # Touching bookings do not conflict
+    add_entry(db, 1, datetime(2026, 11, 2, 9), datetime(2026, 11, 2, 10))
+
+    result = create_recurring_booking("R1", "Seminar", _mondays(), "alice", db)
+
+    assert result["status"] == "success"
+    assert [booking["date"] for booking in result["bookings"]] == [
+        "2026-11-02", "2026-11-09", "2026-11-16", "2026-11-23",
+    ]
+    assert db.query(models.MRBSEntry).filter(models.MRBSEntry.repeat_id == result["repeat_id"]).count() == 4
@@ -0,0 +1,37 @@
+from src.room_catalog import room_catalog
+from tests.factories import add_rooms
+
+
+def test_room_change_invalidates_only_after_commit(db):
+    room, = add_rooms(db, [20])
+    assert room_catalog.by_name("R1", db).capacity == 20
+
+    room.capacity = 40
+    db.flush()
+    assert room_catalog.by_name("R1").capacity == 20
+
+    db.commit()
+    assert room_catalog.by_name("R1", db).capacity == 40
+
+
+def test_rolled_back_room_change_keeps_the_catalog(db):
+    room, = add_rooms(db, [20])
+    room_catalog.rooms(db)
+    version = room_catalog.version
+
+    room.capacity = 40
+    db.flush()
+    db.rollback()
+    db.commit()
+    assert room_catalog.version == version
+
+
+def test_nearest_capacity_walks_out_from_the_requested_size(db):
+    rooms = add_rooms(db, [10, 20, 30, 40, 60])
+    names = lambda found: [room.room_name for room in found]
+
+    assert names(room_catalog.nearest_capacity(25, 3, db)) == ["R2", "R3", "R1"]
+    assert names(room_catalog.nearest_capacity(35, 2, db, min_seats=35)) == ["R4", "R5"]
+    assert names(room_catalog.nearest_capacity(30, 2, db, exclude=[rooms[2].id])) == ["R2", "R4"]
+    assert names(room_catalog.nearest_capacity(100, 2, db)) == ["R5", "R4"]
+    assert room_catalog.nearest_capacity(30, 0, db) == []
@@ -0,0 +1,62 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from recommendtion.recommendations.core.similarity_engine import SimilarityEngine
+from recommendtion.recommendations.data.cache_manager import CacheConfig, CacheKeyType, CacheManager
+from tests.factories import add_entry, add_rooms
+
+
+@pytest.fixture
+def engine(db, tmp_path):
+    return SimilarityEngine(db, CacheManager(CacheConfig(database_path=str(tmp_path / "cache.db"))))
+
+
+@pytest.fixture
+def london(monkeypatch):
+    monkeypatch.setenv("TZ", "Europe/London")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_usage_hours_are_local_on_both_sides_of_dst(db, london):
+    room, = add_rooms(db, [20])
+    # 10:00 local in summer (UTC+1) and in winter (UTC+0)
+    summer = add_entry(db, room.id, datetime(2026, 10, 20, 10), datetime(2026, 10, 20, 11))
+    winter = add_entry(db, room.id, datetime(2026, 11, 3, 10), datetime(2026, 11, 3, 11))
+
+    engine = SimilarityEngine(db, cache_manager=None)
+    engine._aggregate_room_usage(0, 0, max(summer.id, winter.id))
+
+    hours = engine._room_stats[room.id].hour_counts
+    assert hours[10] == 2
+    assert sum(hours) == 2
+
+
+def test_room_profiles_are_served_from_the_engine(db, engine):
+    rooms = add_rooms(db, [20, 40])
+    add_entry(db, rooms[0].id, datetime(2026, 10, 12, 9), datetime(2026, 10, 12, 11))
+
+    profile = engine._get_room_profile(rooms[0].id)
+    assert profile.capacity == 20
+    assert profile.common_users == {"someone"}
+    assert engine._get_room_profile(rooms[1].id).capacity == 40
+
+
+def test_similarities_with_the_real_cache_manager(db, engine):
+    a, b, c = add_rooms(db, [20, 24, 200])
+    for room in (a, b, c):
+        add_entry(db, room.id, datetime(2026, 10, 12, 9), datetime(2026, 10, 12, 11))
+
+    matrix = engine.get_room_similarity_matrix([a.id, b.id, c.id])
+    assert matrix[(a.id, b.id)] > matrix[(a.id, c.id)] > 0
+
+    score = engine.calculate_room_similarity(b.id, a.id)
+    assert score.similarity_score > 0
+    assert engine.cache_manager.get(CacheKeyType.ROOM_SIMILARITIES, None, a.id, b.id).similarity_score == score.similarity_score
+
+    engine.clear_similarity_cache()
+    assert engine.cache_manager.get(CacheKeyType.ROOM_SIMILARITIES, None, a.id, b.id) is None
@@ -0,0 +1,29 @@
+from src import stage_timing
+from src.stage_timing import StageHistograms, is_trusted_caller, span, trace_request
+
+
+def test_tracing_is_off_by_default():
+    with trace_request() as trace:
+        with span("stage"):
+            pass
+    assert trace is None
+
+
+def test_spans_are_recorded_inside_an_enabled_trace(monkeypatch):
+    histograms = StageHistograms([1, 10])
+    monkeypatch.setattr(stage_timing, "STAGE_TIMING_ENABLED", True)
+    monkeypatch.setattr(stage_timing, "stage_histograms", histograms)
+    with trace_request() as trace:
+        with span("stage"):
+            pass
+    assert [name for name, _, _ in trace.spans] == ["stage"]
+    assert trace.server_timing().startswith('stage;dur=')
+    assert histograms.snapshot()["stage"]["count"] == 1
+
+
+def test_only_the_configured_token_is_trusted(monkeypatch):
+    assert not is_trusted_caller("anything")
+    monkeypatch.setattr(stage_timing, "STAGE_TIMING_ADMIN_TOKEN", "s3cret")
+    assert is_trusted_caller("s3cret")
+    assert not is_trusted_caller("wrong")
+    assert not is_trusted_caller(None)
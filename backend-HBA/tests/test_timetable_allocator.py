@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from src import models
+from src.timetable_allocator import TimetableSession, plan_allocation
+from tests.factories import add_entry, add_rooms
+
+
+def _modules(db, **students):
+    db.add_all(models.MRBSModule(module_code=code, number_of_students=count, lecture_id=1)
+               for code, count in students.items())
+    db.commit()
+
+
+def _plan(db, *sessions):
+    return plan_allocation(list(sessions), "2026-11-02", "2026-11-30", db)
+
+
+def test_sessions_get_the_smallest_room_that_fits(db):
+    small, large = add_rooms(db, [20, 100])
+    _modules(db, CS101=80, CS102=15)
+
+    plan = _plan(db, TimetableSession("CS101", 0, "10:00", 60), TimetableSession("CS102", 0, "10:00", 60))
+
+    assert plan.unallocated == {}
+    assert {i: plan.rooms[r].id for i, r in plan.assignment.items()} == {0: large.id, 1: small.id}
+
+
+def test_clashing_sessions_never_share_a_room(db):
+    add_rooms(db, [30, 30])
+    _modules(db, CS101=20, CS102=20, CS103=20)
+
+    plan = _plan(db, *(TimetableSession(code, 1, "09:00", 120) for code in ("CS101", "CS102", "CS103")))
+
+    assert len(plan.assignment) == 2
+    assert len(set(plan.assignment.values())) == 2
+    assert list(plan.unallocated.values()) == ["Clashes with other sessions in every suitable room"]
+
+
+def test_local_search_moves_a_blocker_out_of_the_way(db):
+    r1, r2, r3 = add_rooms(db, [30, 40, 50])
+    _modules(db, A=25, B=24, C=23)
+    # A cannot use R2, B and C cannot use R3
+    add_entry(db, r2.id, datetime(2026, 11, 9, 9, 30), datetime(2026, 11, 9, 10, 15))
+    add_entry(db, r3.id, datetime(2026, 11, 9, 11, 20), datetime(2026, 11, 9, 11, 25))
+
+    plan = _plan(db, TimetableSession("A", 0, "10:00", 60), TimetableSession("B", 0, "10:30", 60),
+                 TimetableSession("C", 0, "10:45", 60))
+
+    # Greedy gives A the smallest room, which leaves C nowhere to go
+    assert plan.greedy_allocated == 2
+    assert plan.unallocated == {}
+    assert {i: plan.rooms[r].id for i, r in plan.assignment.items()} == {0: r3.id, 1: r2.id, 2: r1.id}
+
+
+def test_unallocated_sessions_say_why(db):
+    room, = add_rooms(db, [30])
+    _modules(db, BIG=200, BOOKED=10)
+    add_entry(db, room.id, datetime(2026, 11, 4, 14), datetime(2026, 11, 4, 15))
+
+    plan = _plan(db, TimetableSession("BIG", 0, "10:00", 60), TimetableSession("BOOKED", 2, "14:00", 60),
+                 TimetableSession("MISSING", 0, "10:00", 60))
+
+    assert plan.assignment == {}
+    assert plan.unallocated == {
+        0: "No room seats 200 students",
+        1: "Every large enough room is already booked",
+        2: "Module 'MISSING' not found",
+    }
+
+
+def test_local_search_moves_two_blockers_out_of_the_way(db):
+    r40, r50, r60, r70 = add_rooms(db, [40, 50, 60, 70])
+    _modules(db, B=35, C=35, X=35, D=65)
+    # B cannot use R60 and C cannot use R50; X can only use R40 or R70, where D sits
+    add_entry(db, r50.id, datetime(2026, 11, 9, 10, 15), datetime(2026, 11, 9, 10, 25))
+    add_entry(db, r60.id, datetime(2026, 11, 9, 9, 35), datetime(2026, 11, 9, 9, 45))
+    add_entry(db, r70.id, datetime(2026, 11, 9, 9), datetime(2026, 11, 9, 9, 15))
+    add_entry(db, r70.id, datetime(2026, 11, 9, 10, 45), datetime(2026, 11, 9, 11))
+
+    plan = _plan(db, TimetableSession("B", 0, "09:00", 60), TimetableSession("C", 0, "10:00", 60),
+                 TimetableSession("X", 0, "09:30", 60), TimetableSession("D", 0, "09:20", 80))
+
+    # Greedy puts B and C back to back in R40, the only room left for X
+    assert plan.greedy_allocated == 3
+    assert plan.unallocated == {}
+    assert plan.moves == 2
+    assert {i: plan.rooms[r].id for i, r in plan.assignment.items()} == {0: r50.id, 1: r60.id, 2: r40.id, 3: r70.id}
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from recommendtion.recommendations.core import similarity_engine as engine_module
+from recommendtion.recommendations.core.similarity_engine import SimilarityEngine
+from recommendtion.recommendations.core.user_similarity_index import UserSimilarityIndex
+from tests.factories import add_entry, add_rooms
+
+
+def _book(db, room, user, days_ago, hour, hours=1):
+    start = datetime.combine(datetime.now().date() - timedelta(days=days_ago), datetime.min.time()) + timedelta(hours=hour)
+    return add_entry(db, room.id, start, start + timedelta(hours=hours), create_by=user)
+
+
+@pytest.fixture
+def rooms(db):
+    return add_rooms(db, [20, 40, 80])
+
+
+def _ids(results):
+    return [result["user_id"] for result in results]
+
+
+def test_top_k_is_ordered_by_similarity(db, rooms):
+    small, medium, large = rooms
+    for day in range(1, 4):
+        _book(db, small, "alice", day, 9)
+        _book(db, small, "bob", day, 9)         # same room, same hours
+        _book(db, small, "carol", day, 15)      # same room, other hours
+        _book(db, large, "dave", day, 15, 3)    # nothing in common
+    index = UserSimilarityIndex(refresh_seconds=0)
+
+    ranked = index.most_similar("alice", k=3, db=db)
+    assert _ids(ranked) == ["bob", "carol"]
+    assert ranked[0]["similarity_score"] > ranked[1]["similarity_score"] > 0
+    assert _ids(index.most_similar("alice", k=1, db=db)) == ["bob"]
+    assert index.similarity("alice", "bob") == pytest.approx(1.0)
+
+
+def test_refresh_folds_in_only_new_bookings(db, rooms):
+    small, medium, _ = rooms
+    _book(db, small, "alice", 2, 9)
+    _book(db, medium, "bob", 2, 9)
+    index = UserSimilarityIndex(refresh_seconds=0)
+    assert index.refresh(db) == 2
+    before = index.similarity("alice", "bob")
+
+    _book(db, small, "bob", 1, 9)
+    assert index.refresh(db) == 1
+    assert index.refresh(db) == 0
+    assert index.booking_count("bob") == 2
+    assert index.similarity("alice", "bob") > before
+
+
+def test_full_rebuild_drops_deleted_bookings(db, rooms):
+    small, _, _ = rooms
+    _book(db, small, "alice", 2, 9)
+    gone = _book(db, small, "bob", 2, 9)
+    index = UserSimilarityIndex(refresh_seconds=0, rebuild_seconds=3600)
+    index.refresh(db)
+    assert index.booking_count("bob") == 1
+
+    db.delete(gone)
+    db.commit()
+    index.refresh(db)
+    assert index.booking_count("bob") == 1   # incremental refresh cannot see deletions
+
+    index.refresh(db, force=True)
+    assert index.booking_count("bob") == 0
+    assert index.most_similar("alice", db=db) == []
+
+
+def test_engine_user_similarity_comes_from_the_index(db, rooms, monkeypatch):
+    small, _, _ = rooms
+    for day in range(1, 3):
+        _book(db, small, "alice", day, 9)
+        _book(db, small, "bob", day, 9)
+    index = UserSimilarityIndex(refresh_seconds=0)
+    monkeypatch.setattr(engine_module, "user_similarity_index", index)
+    engine = SimilarityEngine(db, cache_manager=None)
+
+    score = engine.calculate_user_booking_similarity("alice", "bob")
+
+    assert score.similarity_score == pytest.approx(index.similarity("alice", "bob"))
+    assert score.contributing_factors == {
+        "room_preferences": pytest.approx(1.0), "time_preferences": pytest.approx(1.0),
+        "duration_patterns": pytest.approx(1.0),
+    }
+    assert score.confidence == pytest.approx(0.1)
+    assert engine.calculate_user_booking_similarity("alice", "nobody").similarity_score == 0.0
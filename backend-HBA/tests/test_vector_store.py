@@ -0,0 +1,75 @@
+import sqlite3
+import threading
+
+import numpy as np
+
+from recommendtion.recommendations.utils import vector_store as module
+from recommendtion.recommendations.utils.vector_store import VectorStore
+
+
+def _room(store, room_id, seed):
+    vector = np.random.default_rng(seed).normal(size=8)
+    store.add_room_vector({"id": room_id, "name": f"R{room_id}", "capacity": 10, "features": []}, vector)
+
+
+def test_searches_reuse_one_connection_and_see_outside_writes(tmp_path, monkeypatch):
+    path = str(tmp_path / "vectors.db")
+    store = VectorStore(path)
+    _room(store, "1", 1)
+
+    connects = []
+    real_connect = sqlite3.connect
+    monkeypatch.setattr(module.sqlite3, "connect", lambda *a, **k: connects.append(a) or real_connect(*a, **k))
+
+    for _ in range(5):
+        assert store._refresh_cache().ids == ["1"]
+    assert len(connects) == 1
+
+    other = real_connect(path)
+    other.execute("DELETE FROM room_vectors WHERE room_id = '1'")
+    other.commit()
+    other.close()
+    assert store._refresh_cache().ids == []
+    assert len(connects) == 1
+    store.close()
+
+
+def test_a_reload_never_changes_a_snapshot_in_use(tmp_path):
+    store = VectorStore(str(tmp_path / "vectors.db"))
+    _room(store, "1", 1)
+    before = store._refresh_cache()
+
+    _room(store, "2", 2)
+    after = store._refresh_cache()
+
+    assert before.ids == ["1"] and before.matrices[8][0].shape == (1, 8)
+    assert sorted(after.ids) == ["1", "2"] and after.matrices[8][0].shape == (2, 8)
+
+
+def test_concurrent_searches_see_consistent_rooms(tmp_path, monkeypatch):
+    store = VectorStore(str(tmp_path / "vectors.db"))
+    query = np.random.default_rng(0).normal(size=8)
+    monkeypatch.setattr(store, "_generate_query_embedding", lambda text: query)
+    for i in range(20):
+        _room(store, str(i), i)
+
+    mismatches, done = [], threading.Event()
+
+    def search():
+        while not done.is_set():
+            for result in store.search_similar_rooms("any", top_k=5):
+                if result["room_data"]["id"] != result["room_id"]:
+                    mismatches.append(result)
+
+    threads = [threading.Thread(target=search) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for i in range(20, 60):
+        _room(store, str(i), i)
+        store.remove_room_vector(str(i - 20))
+    done.set()
+    for thread in threads:
+        thread.join()
+
+    assert mismatches == []
+    assert sorted(store._refresh_cache().ids, key=int) == [str(i) for i in range(40, 60)]